@@ -3,20 +3,29 @@ Flask Application - SmartCrop
 ===============================================
 Complete web application with authentication and ML predictions
 """
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import sys
+import io
+import json
+import threading
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 # Ajouter le chemin src et app au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.models.predictor import CropPredictor
+from src.models.registry import ModelRegistry
+from src.models.forest import DISPERSION_FIELDS
+from src.models.results import check_probability_format, shape_probabilities
+from src.serving import InferenceClient
+from src.data.streaming import detect_format, iter_record_chunks, StreamFormatError
+from src.data.schema import ValidationError
 from src.utils.logger import setup_logger
 from translations import translations, get_translation, get_all_translations
 
@@ -54,8 +63,16 @@ login_manager.login_message = 'Please log in to access this page.'
 # Logger
 logger = setup_logger('FlaskApp')
 
- # ML Model
-predictor = CropPredictor()
+ # ML Models (config/config.yaml, section registry): routed traffic + shadow models
+registry = ModelRegistry.from_config()
+predictor = registry.get()
+# Input schema (config section validation), shared with the predictors
+input_schema = predictor.schema
+# Shared inference server (config section serving), falls back to the in-process registry
+inference = InferenceClient.from_config(predictor.config, fallback=registry.predict)
+# Readiness state, set by init_ml() (gunicorn master or each worker)
+ml_state = {'ready': False, 'error': None, 'loaded_at': None, 'warmup_ms': None}
+ml_lock = threading.Lock()
 
 
 # ============================================================================
@@ -148,6 +165,11 @@ class Prediction(db.Model):
     prediction_name = db.Column(db.String(255), nullable=True)
     predicted_crop = db.Column(db.String(50), nullable=False)
     confidence = db.Column(db.Float, nullable=False)
+    # Vote dispersion of the forest (NULL when the cascade answered)
+    entropy = db.Column(db.Float, nullable=True)
+    vote_margin = db.Column(db.Float, nullable=True)
+    half_agreement = db.Column(db.Float, nullable=True)
+    low_certainty = db.Column(db.Boolean, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -166,6 +188,10 @@ class Prediction(db.Model):
             'prediction_name': self.prediction_name,
             'predicted_crop': self.predicted_crop,
             'confidence': self.confidence,
+            'entropy': self.entropy,
+            'vote_margin': self.vote_margin,
+            'half_agreement': self.half_agreement,
+            'low_certainty': self.low_certainty,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
@@ -800,22 +826,14 @@ def predict():
     """Prediction page"""
     if request.method == 'POST':
         try:
-            # Get form data
-            features = [
-                float(request.form.get('N')),
-                float(request.form.get('P')),
-                float(request.form.get('K')),
-                float(request.form.get('temperature')),
-                float(request.form.get('humidity')),
-                float(request.form.get('ph')),
-                float(request.form.get('rainfall'))
-            ]
+            # Get and validate form data (rejected before any model or LIME work)
+            features = input_schema.validate_record(request.form)
             
-            # Prediction
-            result = predictor.predict(features)
+            # Prediction (model chosen by the registry routing, on the inference server if running)
+            result = inference.predict(features, key=current_user.id)
             
-            # Explication LIME (XAI)
-            explanation = predictor.explain_prediction(features)
+            # Explication LIME (XAI), by the model that answered
+            explanation = registry.get(result['model']).explain_prediction(features)
             result['explanation'] = explanation
             
             # Save to database
@@ -841,7 +859,8 @@ def predict():
                 longitude=request.form.get('longitude', type=float),
                 prediction_name=pred_name,
                 predicted_crop=result['crop'],
-                confidence=result['confidence']
+                confidence=result['confidence'],
+                **uncertainty_columns(result.get('uncertainty'))
             )
             db.session.add(prediction)
             db.session.commit()
@@ -873,8 +892,18 @@ def predict():
             
             logger.info(f"Prediction made by {current_user.username}: {result['crop']}")
             
+            if (result.get('ood') or {}).get('flagged'):
+                flash('These soil values are far from the training data: the recommendation may not apply.',
+                      'warning')
+            elif (result.get('uncertainty') or {}).get('low_certainty'):
+                flash('The trees of the model disagree on this soil: treat the recommendation with caution.',
+                      'warning')
+            
             return render_template('predict.html', result=result, features=features)
         
+        except ValidationError as e:
+            for error in e.errors:
+                flash(error['message'], 'danger')
         except Exception as e:
             logger.error(f"Error during prediction: {str(e)}")
             flash(f'Error during prediction: {str(e)}', 'danger')
@@ -900,30 +929,54 @@ def history():
  # API ENDPOINTS
  # ============================================================================
 
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: 200 once the model is loaded and warm, 503 otherwise"""
+    status = {
+        'ready': ml_state['ready'],
+        'model_version': predictor.model_version,
+        'backend': predictor.backend,
+        'warm': predictor.is_warm,
+        'loaded_at': ml_state['loaded_at'],
+        'warmup_ms': ml_state['warmup_ms'],
+        'cache': predictor.cache_stats(),
+        'pid': os.getpid()
+    }
+    if ml_state['error']:
+        status['error'] = ml_state['error']
+    return jsonify(status), (200 if ml_state['ready'] else 503)
+
+
+def requested_probability_format():
+    """Shape of all_probabilities requested by the API client (?probabilities=full|sparse|none)"""
+    default = predictor.config.get('api.all_probabilities', 'full')
+    return check_probability_format(request.args.get('probabilities', default))
+
+
 @app.route('/api/predict', methods=['POST'])
 @login_required
 def api_predict():
     """Prediction API"""
     try:
         data = request.get_json()
+        if not isinstance(data, dict):
+            raise ValueError("JSON object expected")
         
-        features = [
-            float(data['N']),
-            float(data['P']),
-            float(data['K']),
-            float(data['temperature']),
-            float(data['humidity']),
-            float(data['ph']),
-            float(data['rainfall'])
-        ]
-        
-        result = predictor.predict(features)
+        probability_format = requested_probability_format()
+        features = input_schema.validate_record(data)
+        result = shape_probabilities(inference.predict(features, key=current_user.id), probability_format)
         
         return jsonify({
             'success': True,
             'data': result
         })
     
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'errors': e.errors
+        }), 400
     except Exception as e:
         logger.error(f"API error: {str(e)}")
         return jsonify({
@@ -932,6 +985,115 @@ def api_predict():
         }), 400
 
 
+def uncertainty_columns(uncertainty):
+    """Prediction column values from a result's 'uncertainty' field (None: no votes)"""
+    if uncertainty is None:
+        return {}
+    return {name: uncertainty[name] for name in DISPERSION_FIELDS + ('low_certainty',)}
+
+
+def persist_batch_predictions(user_id, chunk, results):
+    """Bulk insert the scored rows of a batch chunk into the Prediction table"""
+    scored = np.flatnonzero(results.valid)
+    if not len(scored):
+        return
+    rows = chunk.iloc[scored]
+    columns = {name: pd.to_numeric(rows[name], errors='coerce') for name in predictor.feature_names}
+    for name in ('latitude', 'longitude'):
+        values = pd.to_numeric(rows[name], errors='coerce') if name in rows else pd.Series(index=rows.index, dtype=float)
+        columns[name] = values.astype(object).where(values.notna(), None)
+    if 'prediction_name' in rows:
+        names = rows['prediction_name']
+        columns['prediction_name'] = names.astype(str).str.slice(0, 255).where(names.notna(), None)
+    columns['user_id'] = user_id
+    columns['predicted_crop'] = results.crops[scored]
+    columns['confidence'] = results.confidence[scored]
+    if results.uncertainty is not None:
+        dispersion = results.uncertainty[scored]
+        for i, name in enumerate(DISPERSION_FIELDS):
+            values = pd.Series(dispersion[:, i], index=rows.index)
+            columns[name] = values.astype(object).where(values.notna(), None)
+        # Rows answered by the cascade have no votes
+        columns['low_certainty'] = np.where(np.isnan(dispersion[:, 0]), None, results.low_certainty[scored])
+    records = pd.DataFrame(columns).to_dict('records')
+    db.session.execute(db.insert(Prediction), records)
+    db.session.commit()
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+@login_required
+def api_predict_batch():
+    """
+    Batch prediction API
+
+    Accepts a JSON array, NDJSON or CSV (request body or 'file' upload) and
+    streams one NDJSON result per row while scoring, chunk by chunk, followed
+    by a summary line. ?persist=true also stores the rows in Prediction;
+    ?top_k= and ?probabilities=full|sparse|none shape each result line.
+    """
+    upload = request.files.get('file')
+    try:
+        probability_format = requested_probability_format()
+        if upload is not None:
+            fmt = detect_format(upload.mimetype, upload.filename)
+            # Flask closes uploaded files when the view returns, before the
+            # response is streamed: keep the spooled file for the generator
+            stream, upload.stream = upload.stream, io.BytesIO()
+        else:
+            fmt = detect_format(request.mimetype)
+            stream = request.stream
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    persist = request.args.get('persist', 'false').lower() in ('1', 'true', 'yes')
+    top_k = min(max(request.args.get('top_k', predictor.top_k, type=int), 1), len(predictor.class_names))
+    chunk_size = predictor.config.get('api.batch.chunk_size', 5000)
+    max_rows = predictor.config.get('api.batch.max_rows', 500000)
+    user_id = current_user.id
+    # Same model for the whole batch (registry routing on the user)
+    name = registry.route(user_id)
+    model = registry.get(name)
+    version = registry.version(name)
+
+    def generate():
+        summary = {'rows': 0, 'errors': 0, 'persisted': 0, 'model': name, 'model_version': version}
+        try:
+            for chunk in iter_record_chunks(stream, fmt, model.feature_names, chunk_size, max_rows):
+                results = model.predict_batch(chunk, top_k=top_k, neighbors=0,
+                                              all_probabilities=probability_format)
+                if persist:
+                    persist_batch_predictions(user_id, chunk, results)
+                summary['rows'] += len(results)
+                summary['errors'] += results.n_errors
+                if persist:
+                    summary['persisted'] += len(results) - results.n_errors
+                yield results.to_ndjson()
+        except StreamFormatError as e:
+            summary['error'] = str(e)
+        except Exception as e:
+            logger.error(f"Batch API error: {str(e)}")
+            db.session.rollback()
+            summary['error'] = str(e)
+        finally:
+            if upload is not None:
+                stream.close()
+        yield json.dumps({'summary': summary}, separators=(',', ':')) + '\n'
+        logger.info(f"Batch prediction: {summary['rows']} rows, {summary['errors']} errors "
+                    f"({fmt}, model {name})")
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/models')
+@login_required
+def api_models():
+    """Model registry API: routing, latency and shadow agreement per model"""
+    return jsonify({
+        'success': True,
+        'data': registry.stats()
+    })
+
+
 @app.route('/api/history')
 @login_required
 def api_history():
@@ -1007,13 +1169,56 @@ def init_db():
         logger.info("Database initialized")
 
 
-def init_ml():
-    """Initialize the ML model"""
+def load_prediction_history():
+    """Add past predictions to the reference samples (nearest neighbours) of each model"""
+    min_confidence = predictor.config.get('inference.neighbors.history_min_confidence', 0.8)
+    limit = predictor.config.get('inference.neighbors.history_limit', 50000)
     try:
-        predictor.load_model()
-        logger.info("ML model loaded successfully")
+        with app.app_context():
+            rows = db.session.query(
+                Prediction.N, Prediction.P, Prediction.K, Prediction.temperature,
+                Prediction.humidity, Prediction.ph, Prediction.rainfall, Prediction.predicted_crop
+            ).filter(Prediction.confidence >= min_confidence)\
+                .order_by(Prediction.created_at.desc()).limit(limit).all()
+            db.session.remove()
+            # Called in the gunicorn master before fork: no pooled connection
+            # may be inherited by the workers
+            db.engine.dispose()
     except Exception as e:
-        logger.error(f"Error loading model: {e}")
+        logger.warning(f"Prediction history not loaded: {e}")
+        return
+    
+    if rows:
+        features = np.array([row[:7] for row in rows], dtype=np.float64)
+        crops = [row[7] for row in rows]
+        for model in registry.models.values():
+            model.add_reference_samples(features, crops, source='history')
+    logger.info(f"{len(rows)} past predictions added to the reference samples")
+
+
+def init_ml():
+    """Load and warm up the ML model (idempotent: no-op once ready)"""
+    with ml_lock:
+        if ml_state['ready']:
+            return
+        try:
+            registry.load_all()
+            if predictor.config.get('inference.neighbors.include_history', True):
+                load_prediction_history()
+            if predictor.config.get('inference.warmup.enabled', True):
+                warmup_seconds = 0.0
+                for model in registry.models.values():
+                    timings = model.warmup(
+                        n_samples=predictor.config.get('inference.warmup.samples', 32),
+                        explain=predictor.config.get('inference.warmup.explain', True)
+                    )
+                    warmup_seconds += sum(timings.values())
+                ml_state['warmup_ms'] = round(warmup_seconds * 1000, 1)
+            ml_state.update(ready=True, error=None, loaded_at=datetime.utcnow().isoformat(timespec='seconds'))
+            logger.info(f"ML model ready (version {predictor.model_version})")
+        except Exception as e:
+            ml_state['error'] = str(e)
+            logger.error(f"Error loading model: {e}")
 
 
 if __name__ == '__main__':
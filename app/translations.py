@@ -237,6 +237,7 @@ translations = {
         'predict_xai_interpretation': 'Interpretation',
         'predict_xai_reason': 'The factors with the largest green bars are the main reasons why',
         'predict_xai_recommended_for': 'is recommended for your field conditions.',
+        'predict_xai_unavailable_ood': 'Explanation unavailable: these conditions are outside the range of the training data, so treat this recommendation with caution.',
         'predict_how_to_use': 'How to Use',
         'predict_soil_analysis': 'Soil Analysis:',
         'predict_soil_analysis_desc': 'For best results, use recent soil test results for Nitrogen (N), Phosphorus (P), Potassium (K), and soil pH. You can get these values from a local lab or agricultural service.',
@@ -821,6 +822,7 @@ translations = {
         'predict_xai_interpretation': 'Interprétation',
         'predict_xai_reason': 'Les facteurs avec les plus grandes barres vertes sont les principales raisons pour lesquelles',
         'predict_xai_recommended_for': 'est recommandé pour les conditions de votre terrain.',
+        'predict_xai_unavailable_ood': 'Explication indisponible : ces conditions sortent des données d\'entraînement, cette recommandation est donc à prendre avec prudence.',
         'predict_how_to_use': 'Comment utiliser',
         'predict_soil_analysis': 'Analyse du sol :',
         'predict_soil_analysis_desc': 'Pour de meilleurs résultats, utilisez des résultats récents d\'analyse de sol pour l\'Azote (N), le Phosphore (P), le Potassium (K) et le pH du sol. Vous pouvez obtenir ces valeurs auprès d\'un laboratoire local ou d\'un service agricole.',
@@ -1405,6 +1407,7 @@ translations = {
         'predict_xai_interpretation': 'التفسير',
         'predict_xai_reason': 'العوامل ذات الأشرطة الخضراء الأكبر هي الأسباب الرئيسية التي تجعل',
         'predict_xai_recommended_for': 'موصى به لظروف حقلك.',
+        'predict_xai_unavailable_ood': 'التفسير غير متاح: هذه الظروف خارج نطاق بيانات التدريب، لذا تعامل مع هذه التوصية بحذر.',
         'predict_how_to_use': 'كيفية الاستخدام',
         'predict_soil_analysis': 'تحليل التربة:',
         'predict_soil_analysis_desc': 'للحصول على أفضل النتائج، استخدم نتائج تحليل التربة الحديثة للنيتروجين (N) والفسفور (P) والبوتاسيوم (K) ودرجة حموضة التربة. يمكنك الحصول على هذه القيم من مختبر محلي أو خدمة زراعية.',
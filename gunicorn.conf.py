@@ -0,0 +1,41 @@
+"""
+Configuration gunicorn - SmartCrop
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+timeout = 120
+
+# Le nombre de workers vient de WEB_CONCURRENCY (défaut gunicorn), aussi lu
+# par la politique de parallélisme de l'inférence
+
+# Workers gthread: les requêtes concurrentes d'un worker sont regroupées
+# par le micro-batching de l'inférence (inference.batching)
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# L'application et le modèle sont chargés une seule fois dans le master
+# avant le fork: les workers partagent la forêt et les données LIME
+# (tableaux projetés en mémoire + pages copy-on-write)
+preload_app = True
+
+
+def when_ready(server):
+    """Charge et chauffe le modèle dans le master, avant la création des workers"""
+    if not server.cfg.preload_app:
+        return
+    from app.app import init_ml
+    init_ml()
+
+    # Les objets chargés ne changeront plus: les sortir du suivi du GC évite
+    # que les collections dans les workers n'écrivent dans leurs pages
+    # (ce qui les dupliquerait dans chaque worker)
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Charge et chauffe le modèle dans le worker (sans effet s'il est déjà prêt)"""
+    # Sans preload_app, chaque worker charge son modèle avant d'accepter
+    # des requêtes: /readyz ne répond 200 qu'une fois la chauffe terminée
+    from app.app import init_ml
+    init_ml()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'évaluation anytime de la forêt (arrêt anticipé par blocs d'arbres)
+Usage: python scripts/benchmark_anytime.py [--repeat 20] [--block-sizes 5 10 20]
+"""
+import sys
+from pathlib import Path
+import argparse
+import time
+
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.forest import CompiledForest
+from src.models.predictor import CropPredictor
+
+
+def time_call(fn, repeat: int) -> float:
+    """Temps moyen d'un appel en secondes (après un appel de chauffe)"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'évaluation anytime de la forêt")
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Nombre de répétitions par mesure')
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=[5, 10, 20],
+                        help="Nombre d'arbres par bloc")
+    parser.add_argument('--delta', type=float, default=0.01,
+                        help='Risque de la borne de Hoeffding')
+    args = parser.parse_args()
+
+    predictor = CropPredictor(backend='compiled', cache_size=0, batching=False)
+    predictor.load_model()
+    forest = predictor.forest
+
+    X_test = predictor.scaler.inverse_transform(np.load('data/X_test_scaled.npy'))
+    y_test = np.load('data/y_test.npy')
+    full = forest.predict_proba(X_test)
+    full_time = time_call(lambda: forest.predict_proba(X_test), args.repeat)
+
+    print("\n" + "=" * 80)
+    print(f"BENCHMARK ANYTIME ({len(X_test)} lignes de test, {forest.n_trees} arbres)")
+    print("=" * 80)
+    print(f"{'Borne':<10} {'Bloc':>5} {'Arbres moyens':>14} {'Temps':>10} {'Gain':>6} "
+          f"{'Même classe':>12} {'Accuracy':>9}")
+    print(f"{'complète':<10} {'-':>5} {forest.n_trees:>14.1f} {full_time * 1e3:>7.2f} ms {1:>5.2f}x "
+          f"{1:>12.2%} {np.mean(full.argmax(axis=1) == y_test):>9.2%}")
+
+    for bound in CompiledForest.ANYTIME_BOUNDS:
+        for block_size in args.block_sizes:
+            def run():
+                return forest.predict_proba_anytime(X_test, block_size, bound, args.delta)
+
+            proba, used = run()
+            elapsed = time_call(run, args.repeat)
+            same = np.mean(proba.argmax(axis=1) == full.argmax(axis=1))
+            accuracy = np.mean(proba.argmax(axis=1) == y_test)
+            print(f"{bound:<10} {block_size:>5} {used.mean():>14.1f} {elapsed * 1e3:>7.2f} ms "
+                  f"{full_time / elapsed:>5.2f}x {same:>12.2%} {accuracy:>9.2%}")
+
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
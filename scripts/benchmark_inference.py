@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark des moteurs d'inférence
+Usage: python scripts/benchmark_inference.py [--repeat 500] [--batch-size 10000]
+"""
+import sys
+from pathlib import Path
+import argparse
+import time
+
+import numpy as np
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.predictor import CropPredictor
+
+
+def time_call(fn, repeat: int) -> float:
+    """Temps moyen d'un appel en secondes (après un appel de chauffe)"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def model_nbytes(predictor: CropPredictor) -> int:
+    """Mémoire occupée par les tableaux du modèle (octets)"""
+    if predictor.forest is not None:
+        return predictor.forest.nbytes
+    return sum(
+        estimator.tree_.value.nbytes + estimator.tree_.__getstate__()['nodes'].nbytes
+        for estimator in predictor.model.estimators_
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des moteurs d\'inférence')
+    parser.add_argument('--repeat', type=int, default=500,
+                        help='Nombre de répétitions pour la latence unitaire')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='Taille du batch pour le débit')
+    parser.add_argument('--model-path', type=str,
+                        default='models/tuned/random_forest_best.pkl',
+                        help='Chemin vers le modèle')
+    args = parser.parse_args()
+
+    X_test = np.load('data/X_test_scaled.npy')
+    y_test = np.load('data/y_test.npy')
+
+    reference = CropPredictor(model_path=args.model_path)
+    reference.load_model()
+
+    # Les prédicteurs prennent des features brutes
+    raw_test = reference.scaler.inverse_transform(X_test)
+    batch = np.resize(raw_test, (args.batch_size, raw_test.shape[1]))
+    reference_proba = reference.predict_proba(raw_test)
+
+    print("\n" + "=" * 80)
+    print("BENCHMARK INFÉRENCE")
+    print("=" * 80)
+    print(f"{'Backend':<20} {'Latence (1 ligne)':>18} {'predict()':>11} {'Débit (lignes/s)':>17} {'Mémoire':>9} "
+          f"{'Accuracy':>9} {'Forêt':>6} {'Identique':>10}")
+
+    for backend in CropPredictor.BACKENDS:
+        for cascade in (False, True):
+            # Cache et micro-batching désactivés: coût complet d'un appel
+            predictor = CropPredictor(model_path=args.model_path, backend=backend, cascade=cascade,
+                                      cache_size=0, batching=False)
+            predictor.load_model()
+
+            latency = time_call(lambda: predictor.predict_proba(raw_test[:1]), args.repeat)
+            # predict(): validation, hors distribution, incertitude et résultat formaté
+            sample = raw_test[0].tolist()
+            call_latency = time_call(lambda: predictor.predict(sample, neighbors=0), args.repeat)
+            batch_time = time_call(lambda: predictor.predict_proba(batch), 1)
+
+            proba, escalated = predictor.predict_proba(raw_test, return_stages=True)
+            accuracy = float(np.mean(proba.argmax(axis=1) == y_test))
+            identical = np.array_equal(proba, reference_proba)
+
+            # Forêt: part des lignes évaluées par la forêt
+            name = backend + (" + cascade" if cascade else "")
+            print(f"{name:<20} {latency * 1e6:>15.1f} µs {call_latency * 1e6:>8.1f} µs "
+                  f"{len(batch) / batch_time:>17,.0f} "
+                  f"{model_nbytes(predictor) / 1024:>6.0f} Ko {accuracy:>9.4f} {escalated.mean():>6.1%} "
+                  f"{str(identical):>10}")
+
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
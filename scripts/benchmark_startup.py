@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Benchmark du temps de démarrage de la CLI (import + chargement + prédiction)
+Usage: python scripts/benchmark_startup.py [--repeat 5]
+"""
+import sys
+from pathlib import Path
+import argparse
+import statistics
+import subprocess
+import time
+
+ROOT = Path(__file__).parent.parent
+CLI = str(ROOT / 'scripts' / 'predict_cli.py')
+SAMPLE = ['--N', '90', '--P', '42', '--K', '43', '--temperature', '20.8',
+          '--humidity', '82', '--ph', '6.5', '--rainfall', '202.9', '--json', '--no-daemon']
+
+# Imports seuls, mesurés dans un processus neuf
+IMPORTS = {
+    'runtime (NumPy)': 'import src.models.runtime',
+    'predictor (pandas)': 'import src.models.predictor',
+    'predictor + sklearn + lime': 'import src.models.predictor, sklearn.ensemble, lime.lime_tabular',
+}
+
+# Appels complets de la CLI
+MODES = {
+    'runtime minimal (défaut)': [],
+    'CropPredictor + LIME (--explain)': ['--explain'],
+    'CropPredictor sklearn': ['--backend', 'sklearn'],
+}
+
+
+def wall_time(command, repeat: int) -> float:
+    """Médiane du temps d'exécution d'une commande (secondes)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du démarrage de la CLI')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Nombre de lancements par mesure (médiane)')
+    args = parser.parse_args()
+
+    python = sys.executable
+    baseline = wall_time([python, '-c', 'pass'], args.repeat)
+
+    print("\n" + "=" * 60)
+    print("⏱️  DÉMARRAGE DE LA CLI (médiane sur %d lancements)" % args.repeat)
+    print("=" * 60)
+    print(f"\n{'Interpréteur seul':<32} {baseline * 1000:>8.0f} ms")
+
+    print(f"\n📦 Imports")
+    for name, code in IMPORTS.items():
+        print(f"   {name:<29} {wall_time([python, '-c', code], args.repeat) * 1000:>8.0f} ms")
+
+    print(f"\n🌾 Import + chargement + prédiction")
+    for name, extra in MODES.items():
+        try:
+            elapsed = wall_time([python, CLI, *SAMPLE, *extra], args.repeat)
+        except subprocess.CalledProcessError:
+            print(f"   {name:<29} {'erreur':>8}")
+            continue
+        print(f"   {name:<29} {elapsed * 1000:>8.0f} ms")
+    print("\n" + "=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Export du modèle dans un bundle (fichier unique projetable en mémoire)
+Usage: python scripts/export_model.py [--model-path models/tuned/random_forest_best.pkl] [--output models/model.bundle]
+"""
+import sys
+from pathlib import Path
+import argparse
+import time
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.bundle import export_bundle, load_bundle
+from src.utils.logger import setup_logger
+
+logger = setup_logger('ExportModel')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export du modèle dans un bundle')
+    parser.add_argument('--model-path', type=str,
+                        default='models/tuned/random_forest_best.pkl',
+                        help='Chemin vers le modèle')
+    parser.add_argument('--output', type=str, default='models/model.bundle',
+                        help='Fichier du bundle')
+    parser.add_argument('--training-data', type=str, default='data/X_train_scaled.npy',
+                        help='Données d\'entraînement standardisées (LIME)')
+    parser.add_argument('--leaf-storage', type=str, default='auto',
+                        help='Stockage des feuilles (auto, counts, float16, float32, float64)')
+    parser.add_argument('--cascade-model', type=str,
+                        default='models/tuned/naive_bayes_best.pkl',
+                        help='Naive Bayes du premier étage de la cascade')
+    parser.add_argument('--no-cascade', action='store_true',
+                        help='Ne pas inclure le Naive Bayes de la cascade')
+    args = parser.parse_args()
+
+    try:
+        version = export_bundle(args.model_path, args.output,
+                                training_data_path=args.training_data,
+                                leaf_storage=args.leaf_storage,
+                                cascade_model_path=None if args.no_cascade else args.cascade_model)
+
+        start = time.perf_counter()
+        bundle = load_bundle(args.output)
+        load_time = time.perf_counter() - start
+
+        logger.info(f"Export terminé: version {version}, {bundle.forest.n_trees} arbres, "
+                    f"{Path(args.output).stat().st_size / 1024:.0f} Ko, "
+                    f"{len(bundle.training_data)} échantillons LIME, chargement en {load_time * 1000:.1f} ms")
+        return 0
+    except FileNotFoundError as e:
+        logger.error(f"Fichier non trouvé: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Serveur d'inférence partagé par les workers web (socket Unix)
+Usage: python scripts/inference_server.py [--socket /tmp/smartcrop-inference.sock] [--no-warmup]
+"""
+import sys
+from pathlib import Path
+import argparse
+import signal
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.serving import InferenceServer
+from src.utils.config import Config
+from src.utils.logger import setup_logger
+
+logger = setup_logger('InferenceServer')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur d'inférence partagé")
+    parser.add_argument('--config', type=str, default='config/config.yaml',
+                        help='Fichier de configuration')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Chemin du socket Unix (défaut: serving.socket_path)')
+    parser.add_argument('--no-warmup', action='store_true',
+                        help='Ne pas chauffer les modèles au démarrage')
+    args = parser.parse_args()
+
+    try:
+        server = InferenceServer.from_config(Config(args.config), socket_path=args.socket)
+        server.load(warmup=not args.no_warmup)
+    except Exception as e:
+        logger.error(f"❌ Erreur lors du chargement des modèles: {e}")
+        sys.exit(1)
+
+    def shutdown(signum, frame):
+        logger.info(f"Signal {signum} reçu, arrêt du serveur")
+        server.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,14 @@ ALTER TABLE "user" ADD COLUMN IF NOT EXISTS last_name VARCHAR(50);
 ALTER TABLE "user" ADD COLUMN IF NOT EXISTS phone VARCHAR(20);
 ALTER TABLE "user" ADD COLUMN IF NOT EXISTS location VARCHAR(50);
 
+-- ============================================================================
+-- Add vote-dispersion uncertainty columns to Prediction table
+-- ============================================================================
+ALTER TABLE prediction ADD COLUMN IF NOT EXISTS entropy DOUBLE PRECISION;
+ALTER TABLE prediction ADD COLUMN IF NOT EXISTS vote_margin DOUBLE PRECISION;
+ALTER TABLE prediction ADD COLUMN IF NOT EXISTS half_agreement DOUBLE PRECISION;
+ALTER TABLE prediction ADD COLUMN IF NOT EXISTS low_certainty BOOLEAN;
+
 -- ============================================================================
 -- Create Notification table
 -- ============================================================================
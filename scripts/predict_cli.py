@@ -2,20 +2,30 @@
 """
 Script CLI pour faire des prédictions de cultures
 Usage: python scripts/predict_cli.py --N 90 --P 42 --K 43 --temperature 20.8 --humidity 82 --ph 6.5 --rainfall 202.9
+       python scripts/predict_cli.py --stdin < samples.jsonl
+       python scripts/predict_cli.py --daemon start
 """
 import sys
 from pathlib import Path
 import argparse
+import csv
 import json
+import logging
+import os
+import signal
+import subprocess
+import time
 
 # Ajouter le chemin src au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.models.predictor import CropPredictor
+from src.utils.config import Config
 from src.utils.logger import setup_logger
 
 logger = setup_logger('PredictCLI')
 
+FEATURE_NAMES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
 
 def print_result(result: dict, verbose: bool = False):
     """Affiche les résultats de prédiction"""
@@ -42,9 +52,142 @@ def print_result(result: dict, verbose: bool = False):
             bar = "█" * int(prob * 50)
             print(f"   {crop:<15} {prob*100:>6.2f}% {bar}")
     
+    explanation = result.get('explanation')
+    if explanation and 'contributions' in explanation:
+        print(f"\n🔍 Explication (LIME):")
+        for contribution in explanation['contributions']:
+            sign = "+" if contribution['weight'] > 0 else "-"
+            print(f"   {sign} {contribution['description']:<30} {contribution['weight']:>+.4f}")
+    
     print("\n" + "="*60)
 
 
+def parse_stdin_rows(lines, input_format: str = 'auto'):
+    """
+    Lit des échantillons ligne par ligne (JSON lines ou CSV)
+
+    Une ligne JSON est un objet (clés = noms des features) ou une liste de
+    7 valeurs; une ligne CSV contient les 7 valeurs dans l'ordre des
+    features (ligne d'en-tête facultative, reconnue à ses noms de colonnes).
+
+    Args:
+        lines: Itérable de lignes (ex: sys.stdin)
+        input_format: 'jsonl', 'csv' ou 'auto' (selon le premier caractère)
+
+    Yields:
+        (numéro de ligne, liste des features ou None, message d'erreur ou None)
+    """
+    header = None
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        fmt = input_format if input_format != 'auto' else ('jsonl' if line[0] in '{[' else 'csv')
+        try:
+            if fmt == 'jsonl':
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    record = [record[name] for name in FEATURE_NAMES]
+            else:
+                record = next(csv.reader([line]))
+                if header is None and set(FEATURE_NAMES) <= {field.strip() for field in record}:
+                    header = [field.strip() for field in record]
+                    continue
+                if header is not None:
+                    record = [dict(zip(header, record))[name] for name in FEATURE_NAMES]
+            if len(record) != len(FEATURE_NAMES):
+                raise ValueError(f"Attendu {len(FEATURE_NAMES)} features, reçu {len(record)}")
+            yield line_number, [float(value) for value in record], None
+        except (ValueError, KeyError, TypeError) as e:
+            message = f"Feature manquante: {e}" if isinstance(e, KeyError) else str(e)
+            yield line_number, None, message
+
+
+def run_stdin(predict, input_format: str) -> int:
+    """Prédit chaque ligne de stdin et écrit un résultat JSON par ligne sur stdout"""
+    n_errors = 0
+    for line_number, features, error in parse_stdin_rows(sys.stdin, input_format):
+        details = None
+        if error is None:
+            try:
+                result = predict(features)
+            except ValueError as e:
+                error = str(e)
+                # ValidationError: détail par feature
+                details = getattr(e, 'errors', None)
+        if error is not None:
+            n_errors += 1
+            result = {'line': line_number, 'error': error}
+            if details:
+                result['errors'] = details
+        sys.stdout.write(json.dumps(result, separators=(',', ':')) + '\n')
+        sys.stdout.flush()
+    return 1 if n_errors else 0
+
+
+def daemon_command(action: str, socket_path: str, config_path: str) -> int:
+    """
+    Gère le démon d'inférence (scripts/inference_server.py) en arrière-plan
+
+    Args:
+        action: 'start', 'stop' ou 'status'
+        socket_path: Chemin du socket Unix
+        config_path: Fichier de configuration du serveur
+    """
+    pid_path = Path(socket_path + '.pid')
+
+    if action == 'status':
+        if not os.path.exists(socket_path):
+            print(f"Démon arrêté ({socket_path} absent)")
+            return 1
+        from src.serving.client import InferenceClient
+        info = InferenceClient(socket_path, enabled=True).info()
+        print(json.dumps({'socket': socket_path, 'pid': info['pid'], 'default': info['default'],
+                          'models': {name: model['version'] for name, model in info['models'].items()}},
+                         indent=2))
+        return 0
+
+    if action == 'stop':
+        if not pid_path.exists():
+            print("Aucun démon en cours")
+            return 1
+        try:
+            os.kill(int(pid_path.read_text()), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        for _ in range(100):
+            if not os.path.exists(socket_path):
+                break
+            time.sleep(0.1)
+        pid_path.unlink(missing_ok=True)
+        print("Démon arrêté")
+        return 0
+
+    if os.path.exists(socket_path):
+        print(f"Démon déjà démarré ({socket_path})")
+        return 0
+    script = Path(__file__).parent / 'inference_server.py'
+    log_path = Path('logs') / 'inference_daemon.log'
+    log_path.parent.mkdir(exist_ok=True)
+    with open(log_path, 'ab') as log_file:
+        process = subprocess.Popen(
+            [sys.executable, str(script), '--socket', socket_path, '--config', config_path],
+            stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True
+        )
+    pid_path.write_text(str(process.pid))
+    # Attendre le chargement du modèle (socket créé)
+    for _ in range(600):
+        if os.path.exists(socket_path):
+            print(f"Démon démarré (pid {process.pid}, socket {socket_path})")
+            return 0
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    pid_path.unlink(missing_ok=True)
+    print(f"\n❌ Erreur: le démon n'a pas démarré, voir {log_path}")
+    return 1
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='🌾 Crop Recommendation CLI - Prédiction de cultures',
@@ -53,23 +196,25 @@ def main():
 Exemples d'utilisation:
   %(prog)s --N 90 --P 42 --K 43 --temperature 20.8 --humidity 82 --ph 6.5 --rainfall 202.9
   %(prog)s --N 20 --P 10 --K 15 --temperature 25.5 --humidity 70 --ph 5.8 --rainfall 150 --verbose
+  %(prog)s --stdin < samples.jsonl          (une ligne JSON ou CSV par échantillon)
+  %(prog)s --daemon start                   (modèle résident: les appels suivants passent par le socket)
         """
     )
     
     # Arguments de features
-    parser.add_argument('--N', type=float, required=True,
+    parser.add_argument('--N', type=float,
                        help='Azote (N) - Range: 0-140')
-    parser.add_argument('--P', type=float, required=True,
+    parser.add_argument('--P', type=float,
                        help='Phosphore (P) - Range: 5-145')
-    parser.add_argument('--K', type=float, required=True,
+    parser.add_argument('--K', type=float,
                        help='Potassium (K) - Range: 5-205')
-    parser.add_argument('--temperature', type=float, required=True,
+    parser.add_argument('--temperature', type=float,
                        help='Température (°C) - Range: 8-44')
-    parser.add_argument('--humidity', type=float, required=True,
+    parser.add_argument('--humidity', type=float,
                        help='Humidité (%) - Range: 14-100')
-    parser.add_argument('--ph', type=float, required=True,
+    parser.add_argument('--ph', type=float,
                        help='pH du sol - Range: 3.5-10')
-    parser.add_argument('--rainfall', type=float, required=True,
+    parser.add_argument('--rainfall', type=float,
                        help='Précipitations (mm) - Range: 20-300')
     
     # Options
@@ -77,30 +222,92 @@ Exemples d'utilisation:
                        help='Afficher toutes les probabilités')
     parser.add_argument('--json', action='store_true',
                        help='Sortie en format JSON')
+    parser.add_argument('--explain', action='store_true',
+                       help='Expliquer la prédiction avec LIME (charge pandas, scikit-learn et lime)')
     parser.add_argument('--model-path', type=str,
                        default='models/tuned/random_forest_best.pkl',
                        help='Chemin vers le modèle')
+    parser.add_argument('--backend', type=str, default='compiled', choices=['sklearn', 'compiled'],
+                       help="Moteur d'inférence local (compiled: bundle projeté en mémoire)")
+    parser.add_argument('--config', type=str, default='config/config.yaml',
+                       help='Fichier de configuration')
+    
+    # Modèle résident
+    parser.add_argument('--stdin', action='store_true',
+                       help='Lire un échantillon par ligne sur stdin (JSON lines ou CSV), '
+                            'un résultat JSON par ligne sur stdout')
+    parser.add_argument('--input-format', type=str, default='auto', choices=['auto', 'jsonl', 'csv'],
+                       help='Format des lignes de stdin')
+    parser.add_argument('--daemon', type=str, choices=['start', 'stop', 'status'],
+                       help="Démarrer, arrêter ou interroger le démon d'inférence")
+    parser.add_argument('--socket', type=str, default=None,
+                       help='Socket du démon (défaut: serving.socket_path)')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='Toujours charger le modèle dans ce processus')
     
     args = parser.parse_args()
+    config = Config(args.config)
+    socket_path = args.socket or config.get('serving.socket_path', "/tmp/smartcrop-inference.sock")
+    
+    if args.daemon:
+        return daemon_command(args.daemon, socket_path, args.config)
+    
+    feature_args = [args.N, args.P, args.K, args.temperature, args.humidity, args.ph, args.rainfall]
+    if not args.stdin and None in feature_args:
+        parser.error("les 7 features (--N ... --rainfall) sont requises, sauf avec --stdin ou --daemon")
+    if args.stdin or args.json:
+        # stdout est réservé aux résultats
+        for handler in logger.handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(sys.stderr)
     
     try:
-        # Créer les features
-        features = [
-            args.N,
-            args.P,
-            args.K,
-            args.temperature,
-            args.humidity,
-            args.ph,
-            args.rainfall
-        ]
+        local = {}
+        
+        def load_local():
+            """Modèle chargé dans ce processus (runtime NumPy seul, sauf --explain)"""
+            if args.backend == 'compiled' and not args.explain:
+                from src.models.bundle import BundleError
+                from src.models.runtime import RuntimePredictor
+                runtime = RuntimePredictor.from_config(config, model_path=args.model_path)
+                try:
+                    runtime.load_model()
+                    return runtime
+                except (FileNotFoundError, BundleError) as e:
+                    logger.warning(f"Runtime minimal indisponible ({e}), chargement complet")
+            from src.models.predictor import CropPredictor
+            predictor = CropPredictor(model_path=args.model_path, backend=args.backend, config=config)
+            predictor.load_model()
+            return predictor
+        
+        def predict_local(features, key=None, model=None, neighbors=None):
+            """Prédiction dans ce processus (modèle chargé au premier appel)"""
+            if 'predictor' not in local:
+                logger.info("Chargement du modèle...")
+                local['predictor'] = load_local()
+            return local['predictor'].predict(features, neighbors=neighbors)
+        
+        # Démon démarré: le modèle n'est pas chargé dans ce processus
+        predict = predict_local
+        if not (args.no_daemon or args.explain) and os.path.exists(socket_path):
+            from src.serving.client import InferenceClient
+            client = InferenceClient(socket_path, enabled=True, fallback=predict_local,
+                                     neighbors_k=config.get('inference.neighbors.k', 5)
+                                     if config.get('inference.neighbors.enabled', True) else 0)
+            try:
+                client.info()
+                predict = client.predict
+                logger.info(f"Démon d'inférence: {socket_path}")
+            except OSError as e:
+                logger.warning(f"Démon injoignable ({e}), chargement local du modèle")
         
-        logger.info("Chargement du modèle...")
-        predictor = CropPredictor(model_path=args.model_path)
-        predictor.load_model()
+        if args.stdin:
+            return run_stdin(predict, args.input_format)
         
         logger.info("Prédiction en cours...")
-        result = predictor.predict(features)
+        result = predict(feature_args)
+        if args.explain:
+            result['explanation'] = local['predictor'].explain_prediction(feature_args)
         
         if args.json:
             print(json.dumps(result, indent=2))
@@ -109,8 +109,30 @@ def run_migration():
         except Exception as e:
             print("   ! Index error: {}".format(e))
         
+        # Add uncertainty columns to Prediction table
+        print("\n4. Adding uncertainty columns to Prediction table...")
+        
+        prediction_columns = [
+            ("entropy", "DOUBLE PRECISION"),
+            ("vote_margin", "DOUBLE PRECISION"),
+            ("half_agreement", "DOUBLE PRECISION"),
+            ("low_certainty", "BOOLEAN")
+        ]
+        
+        for col_name, col_type in prediction_columns:
+            try:
+                cur.execute('ALTER TABLE prediction ADD COLUMN {} {}'.format(col_name, col_type))
+                print("   + Added column: {}".format(col_name))
+            except psycopg2.errors.DuplicateColumn:
+                print("   - Column {} already exists".format(col_name))
+                conn.rollback()
+                conn = psycopg2.connect(**DB_CONFIG)
+                conn.set_client_encoding('UTF8')
+                conn.autocommit = True
+                cur = conn.cursor()
+        
         # Verify tables
-        print("\n4. Verifying database structure...")
+        print("\n5. Verifying database structure...")
         
         cur.execute("""
             SELECT table_name FROM information_schema.tables 
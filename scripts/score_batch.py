@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Scoring hors ligne d'un gros fichier (CSV, NDJSON ou Parquet) sur plusieurs coeurs
+Usage: python scripts/score_batch.py data/survey.csv --output-dir predictions/survey [--workers 4]
+"""
+import sys
+from pathlib import Path
+import argparse
+import json
+
+# Ajouter le chemin src au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.offline import OfflineScorer
+from src.utils.logger import setup_logger
+
+logger = setup_logger('ScoreBatch')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scoring hors ligne par blocs, réparti sur un pool de processus')
+    parser.add_argument('input', type=str,
+                        help='Fichier à évaluer (CSV avec en-tête, NDJSON ou Parquet)')
+    parser.add_argument('--output-dir', type=str, required=True,
+                        help='Répertoire des fichiers part-* et du fichier de reprise')
+    parser.add_argument('--model-path', type=str,
+                        default='models/tuned/random_forest_best.pkl',
+                        help='Chemin vers le modèle')
+    parser.add_argument('--config', type=str, default='config/config.yaml',
+                        help='Fichier de configuration')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Nombre de processus (défaut: nombre de coeurs)')
+    parser.add_argument('--chunk-size', type=int, default=50000,
+                        help='Lignes par bloc et par fichier de sortie')
+    parser.add_argument('--top-k', type=int, default=3,
+                        help='Nombre de cultures classées par ligne')
+    parser.add_argument('--format', type=str, default='csv', choices=['csv', 'parquet'],
+                        help='Format des fichiers de sortie')
+    parser.add_argument('--backend', type=str, default='sklearn', choices=['sklearn', 'compiled'],
+                        help="Moteur d'inférence: sklearn (le plus rapide sur de gros blocs) ou compiled "
+                             "(bundle partagé entre les workers, colonnes de dispersion des votes)")
+    parser.add_argument('--cascade', action=argparse.BooleanOptionalAction, default=None,
+                        help='Cascade Naive Bayes -> forêt (défaut: inference.cascade.enabled)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignorer le fichier de reprise et recommencer')
+    args = parser.parse_args()
+
+    try:
+        scorer = OfflineScorer(args.output_dir, model_path=args.model_path, workers=args.workers,
+                               chunk_size=args.chunk_size, top_k=args.top_k, output_format=args.format,
+                               config_path=args.config, cascade=args.cascade, backend=args.backend)
+        stats = scorer.run(args.input, resume=not args.restart)
+    except (FileNotFoundError, ValueError, ImportError) as e:
+        logger.error(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        logger.warning("Interrompu: relancer la même commande pour reprendre")
+        return 130
+
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,23 @@
 """Module de gestion des données"""
-from .loader import DataLoader
-from .preprocessing import DataPreprocessor
+import importlib
 
-__all__ = ['DataLoader', 'DataPreprocessor']
+# Import à la demande (PEP 562): ``src.data.schema`` n'importe ni pandas ni scikit-learn
+_EXPORTS = {
+    'DataLoader': '.loader',
+    'DataPreprocessor': '.preprocessing',
+    'InputSchema': '.schema'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
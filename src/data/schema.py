@@ -0,0 +1,282 @@
+"""
+Schéma des entrées: validation vectorisée des features avant toute prédiction
+"""
+import logging
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+# Plages agronomiques (celles du jeu d'entraînement, documentées par la CLI)
+FEATURE_RANGES: Dict[str, Tuple[float, float]] = {
+    'N': (0, 140),
+    'P': (5, 145),
+    'K': (5, 205),
+    'temperature': (8, 44),
+    'humidity': (14, 100),
+    'ph': (3.5, 10),
+    'rainfall': (20, 300)
+}
+
+# Codes d'erreur par valeur (0: valeur valide)
+OK = 0
+MISSING = 1
+NON_NUMERIC = 2
+NOT_FINITE = 3
+BELOW_MIN = 4
+ABOVE_MAX = 5
+
+CODE_NAMES = {
+    MISSING: 'missing',
+    NON_NUMERIC: 'non_numeric',
+    NOT_FINITE: 'not_finite',
+    BELOW_MIN: 'below_min',
+    ABOVE_MAX: 'above_max'
+}
+
+# Politiques appliquées aux valeurs hors plage (les valeurs manquantes, non
+# numériques ou infinies sont toujours rejetées)
+POLICIES = ('reject', 'clip', 'flag')
+
+
+class ValidationError(ValueError):
+    """Entrée rejetée par le schéma (``errors``: détail par feature)"""
+
+    def __init__(self, errors: List[Dict]):
+        self.errors = errors
+        super().__init__("; ".join(error['message'] for error in errors))
+
+
+class ValidationResult:
+    """
+    Résultat de la validation d'un batch
+
+    Attributes:
+        values: Features en float64 (n_samples, n_features), bornées si
+                la politique est 'clip', NaN pour les valeurs illisibles
+        valid: Masque des lignes acceptées
+        codes: Code d'erreur de chaque valeur (n_samples, n_features)
+    """
+
+    def __init__(self, values: np.ndarray, valid: np.ndarray, codes: np.ndarray, raw: np.ndarray,
+                 schema: "InputSchema"):
+        self.values = values
+        self.valid = valid
+        self.codes = codes
+        self._raw = raw
+        self._schema = schema
+
+    @property
+    def flagged(self) -> np.ndarray:
+        """Masque des lignes acceptées malgré des valeurs hors plage (politiques clip et flag)"""
+        return self.valid & self.codes.any(axis=1)
+
+    def issues(self, row: int) -> List[Dict]:
+        """
+        Détail des valeurs en erreur d'une ligne
+
+        Returns:
+            Liste de {'feature', 'code', 'value', 'message'}
+        """
+        issues = []
+        for col in np.flatnonzero(self.codes[row]).tolist():
+            name = self._schema.feature_names[col]
+            code = int(self.codes[row, col])
+            value = self._raw[row, col]
+            issues.append({
+                'feature': name,
+                'code': CODE_NAMES[code],
+                'value': _json_value(value),
+                'message': self._schema.describe(name, code, value)
+            })
+        return issues
+
+    def raise_for_row(self, row: int = 0):
+        """Lève ValidationError si la ligne est rejetée"""
+        if not self.valid[row]:
+            raise ValidationError(self.issues(row))
+
+
+class InputSchema:
+    """
+    Validation vectorisée des features (un seul passage NumPy par batch)
+
+    Chaque valeur reçoit un code: manquante, non numérique, infinie, sous le
+    minimum ou au-dessus du maximum de sa plage agronomique. Les lignes
+    contenant une valeur manquante, non numérique ou infinie sont toujours
+    rejetées; les valeurs hors plage sont traitées selon la politique:
+
+    - ``reject``: la ligne est rejetée
+    - ``clip``: la valeur est ramenée dans la plage, la ligne est signalée
+    - ``flag``: la valeur est gardée telle quelle, la ligne est signalée
+    """
+
+    def __init__(self, feature_names: Sequence[str] = FEATURE_NAMES,
+                 ranges: Optional[Mapping[str, Sequence[float]]] = None, policy: str = 'flag'):
+        """
+        Initialise le schéma
+
+        Args:
+            feature_names: Ordre des features
+            ranges: Plage (min, max) par feature (défaut: FEATURE_RANGES);
+                    une feature absente n'est pas bornée
+            policy: 'reject', 'clip' ou 'flag' pour les valeurs hors plage
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Politique de validation inconnue: {policy} (attendu: {', '.join(POLICIES)})")
+        ranges = FEATURE_RANGES if ranges is None else ranges
+        self.feature_names = list(feature_names)
+        self.policy = policy
+        self.ranges = {name: tuple(ranges[name]) for name in self.feature_names if name in ranges}
+        self.low = np.array([self.ranges.get(name, (-np.inf, np.inf))[0] for name in self.feature_names],
+                            dtype=np.float64)
+        self.high = np.array([self.ranges.get(name, (-np.inf, np.inf))[1] for name in self.feature_names],
+                             dtype=np.float64)
+
+    @classmethod
+    def from_config(cls, config, feature_names: Sequence[str] = FEATURE_NAMES) -> "InputSchema":
+        """
+        Construit le schéma depuis la section ``validation`` de la configuration
+
+        Args:
+            config: Instance de Config
+            feature_names: Ordre des features
+        """
+        ranges = dict(FEATURE_RANGES)
+        ranges.update(config.get('validation.ranges') or {})
+        return cls(feature_names, ranges=ranges, policy=config.get('validation.policy', 'flag'))
+
+    def validate(self, features) -> ValidationResult:
+        """
+        Valide un batch
+
+        Args:
+            features: Liste (une ligne), liste de lignes, array 1D/2D ou
+                      DataFrame (colonnes nommées comme les features)
+
+        Returns:
+            ValidationResult
+        """
+        raw = self._as_matrix(features)
+        if raw.shape[1] != len(self.feature_names):
+            raise ValueError(f"Attendu {len(self.feature_names)} features, reçu {raw.shape[1]}")
+
+        codes = np.zeros(raw.shape, dtype=np.uint8)
+        if raw.dtype == object:
+            values, missing, non_numeric = _to_float(raw)
+            codes[missing] = MISSING
+            codes[non_numeric] = NON_NUMERIC
+        else:
+            values = raw.astype(np.float64)
+            codes[np.isnan(values)] = MISSING
+
+        with np.errstate(invalid='ignore'):
+            codes[np.isinf(values)] = NOT_FINITE
+            below = values < self.low
+            above = values > self.high
+        codes[below & (codes == OK)] = BELOW_MIN
+        codes[above & (codes == OK)] = ABOVE_MAX
+
+        unreadable = (codes == MISSING) | (codes == NON_NUMERIC) | (codes == NOT_FINITE)
+        valid = ~unreadable.any(axis=1)
+        if self.policy == 'reject':
+            valid &= ~codes.any(axis=1)
+        elif self.policy == 'clip':
+            values = np.where(valid[:, None], np.clip(values, self.low, self.high), values)
+
+        return ValidationResult(values, valid, codes, raw, self)
+
+    def validate_record(self, record: Mapping) -> List[float]:
+        """
+        Valide un enregistrement unique (formulaire, JSON) et retourne ses features
+
+        Args:
+            record: Mapping nom -> valeur (chaînes acceptées)
+
+        Returns:
+            Liste des features (bornées selon la politique)
+
+        Raises:
+            ValidationError: Enregistrement rejeté
+        """
+        result = self.validate([[record.get(name) for name in self.feature_names]])
+        result.raise_for_row(0)
+        return result.values[0].tolist()
+
+    def describe(self, name: str, code: int, value) -> str:
+        """Message lisible pour une valeur en erreur"""
+        if code == MISSING:
+            return f"{name}: valeur manquante"
+        if code == NON_NUMERIC:
+            return f"{name}: valeur non numérique ({value!r})"
+        if code == NOT_FINITE:
+            return f"{name}: valeur infinie"
+        low, high = self.ranges[name]
+        if code == BELOW_MIN:
+            return f"{name}={_json_value(value)} sous le minimum {low:g} (plage {low:g}-{high:g})"
+        return f"{name}={_json_value(value)} au-dessus du maximum {high:g} (plage {low:g}-{high:g})"
+
+    def _as_matrix(self, features) -> np.ndarray:
+        """Convertit l'entrée en matrice 2D (object si des valeurs ne sont pas des nombres)"""
+        if hasattr(features, 'columns'):
+            # DataFrame: colonnes par nom si présentes, sinon par position
+            if set(self.feature_names).issubset(features.columns):
+                features = features[self.feature_names]
+            features = features.to_numpy()
+        matrix = np.asarray(features)
+        # Les booléens (convertis en 0/1 par NumPy) sont traités comme non numériques
+        if matrix.dtype.kind not in 'fiu' or (not isinstance(features, np.ndarray) and _contains_bool(features)):
+            matrix = np.asarray(features, dtype=object)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        return matrix
+
+
+def _is_bool(value) -> bool:
+    """Booléen Python ou NumPy (accepté par float() mais pas une mesure)"""
+    return isinstance(value, (bool, np.bool_))
+
+
+def _contains_bool(features) -> bool:
+    """La séquence (ligne ou liste de lignes) contient au moins un booléen"""
+    return any(_is_bool(value) for value in np.asarray(features, dtype=object).flat)
+
+
+def _to_float(raw: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Conversion d'une matrice object en float64 (valeurs, masque manquantes, masque illisibles)"""
+    if not any(_is_bool(value) for value in raw.flat):
+        try:
+            # Cas courant (nombres, chaînes numériques): conversion en un seul appel
+            values = raw.astype(np.float64)
+            return values, np.isnan(values), np.zeros(raw.shape, dtype=bool)
+        except (TypeError, ValueError):
+            pass
+    values = np.full(raw.shape, np.nan)
+    missing = np.zeros(raw.shape, dtype=bool)
+    non_numeric = np.zeros(raw.shape, dtype=bool)
+    for index, value in np.ndenumerate(raw):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            missing[index] = True
+            continue
+        if _is_bool(value):
+            non_numeric[index] = True
+            continue
+        try:
+            values[index] = float(value)
+        except (TypeError, ValueError):
+            non_numeric[index] = True
+    missing |= np.isnan(values) & ~non_numeric
+    return values, missing, non_numeric
+
+
+def _json_value(value):
+    """Valeur sérialisable en JSON pour les messages d'erreur"""
+    if isinstance(value, (np.floating, float)):
+        value = float(value)
+        return value if np.isfinite(value) else str(value)
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    return value
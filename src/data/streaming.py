@@ -0,0 +1,185 @@
+"""
+Lecture incrémentale de lots d'échantillons (tableau JSON, NDJSON, CSV)
+"""
+import io
+import json
+import logging
+from typing import IO, Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+_CONTENT_TYPES = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv'
+}
+_EXTENSIONS = {'json': 'json', 'ndjson': 'ndjson', 'jsonl': 'ndjson', 'csv': 'csv'}
+
+_READ_SIZE = 1 << 16
+# Taille maximale d'un enregistrement du tableau JSON (protège la mémoire)
+_MAX_RECORD_SIZE = 1 << 20
+
+
+class StreamFormatError(ValueError):
+    """Entrée mal formée ou trop volumineuse"""
+
+
+def detect_format(content_type: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """
+    Détermine le format d'un lot (extension du fichier, puis type de contenu)
+
+    Args:
+        content_type: Type MIME (ex: 'text/csv; charset=utf-8')
+        filename: Nom du fichier envoyé
+
+    Returns:
+        'json', 'ndjson' ou 'csv'
+    """
+    if filename and '.' in filename:
+        fmt = _EXTENSIONS.get(filename.rsplit('.', 1)[1].lower())
+        if fmt is not None:
+            return fmt
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in _CONTENT_TYPES:
+        return _CONTENT_TYPES[mimetype]
+    raise StreamFormatError(f"Format non supporté: {content_type or filename!r} "
+                            f"(attendu: {', '.join(FORMATS)})")
+
+
+def iter_record_chunks(stream: IO[bytes], fmt: str, feature_names: List[str], chunk_size: int = 5000,
+                       max_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lit un lot par blocs, sans charger toute l'entrée en mémoire
+
+    Les enregistrements sont des objets (clés = noms des features, colonnes
+    supplémentaires conservées) ou des listes de valeurs dans l'ordre de
+    ``feature_names``. Le CSV doit avoir une ligne d'en-tête.
+
+    Args:
+        stream: Flux binaire (corps de requête, fichier)
+        fmt: 'json', 'ndjson' ou 'csv'
+        feature_names: Noms des features (ordre des listes)
+        chunk_size: Nombre de lignes par bloc
+        max_rows: Nombre maximal de lignes (StreamFormatError au-delà)
+
+    Yields:
+        DataFrame par bloc, indexé par le numéro de ligne dans le lot
+    """
+    if fmt not in FORMATS:
+        raise StreamFormatError(f"Format non supporté: {fmt!r}")
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    n_rows = 0
+    try:
+        if fmt == 'csv':
+            chunks = pd.read_csv(text, chunksize=chunk_size)
+        else:
+            records = _iter_json_array(text) if fmt == 'json' else _iter_ndjson(text)
+            chunks = _chunk_records(records, feature_names, chunk_size)
+        for chunk in chunks:
+            chunk.index = pd.RangeIndex(n_rows, n_rows + len(chunk))
+            n_rows += len(chunk)
+            if max_rows is not None and n_rows > max_rows:
+                raise StreamFormatError(f"Au plus {max_rows} lignes par lot")
+            yield chunk
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise StreamFormatError(f"Entrée invalide après {n_rows} lignes: {e}") from e
+    finally:
+        # Ne pas fermer le flux de l'appelant avec l'enveloppe texte
+        text.detach()
+
+
+def _chunk_records(records: Iterator, feature_names: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Regroupe des enregistrements (objets ou listes) en DataFrames"""
+    batch = []
+    for record in records:
+        if isinstance(record, list):
+            record = dict(zip(feature_names, record))
+        elif not isinstance(record, dict):
+            raise StreamFormatError(f"Enregistrement invalide (objet ou liste attendu): {record!r}")
+        batch.append(record)
+        if len(batch) == chunk_size:
+            yield pd.DataFrame.from_records(batch, columns=_columns(batch, feature_names))
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=_columns(batch, feature_names))
+
+
+def _columns(batch: List[dict], feature_names: List[str]) -> List[str]:
+    """Features d'abord (même absentes), puis les colonnes supplémentaires"""
+    extra = dict.fromkeys(key for record in batch for key in record if key not in feature_names)
+    return list(feature_names) + list(extra)
+
+
+def _iter_ndjson(text: IO[str]) -> Iterator:
+    """Un document JSON par ligne (lignes vides ignorées)"""
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise StreamFormatError(f"JSON invalide ligne {line_number}: {e}") from e
+
+
+def _iter_json_array(text: IO[str]) -> Iterator:
+    """Éléments d'un tableau JSON, décodés au fil de la lecture"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        block = text.read(_READ_SIZE)
+        eof = not block
+        buffer = buffer[pos:] + block
+        pos = 0
+
+    def skip(chars: str) -> Optional[str]:
+        """Saute les caractères ``chars``; renvoie le caractère suivant (None en fin)"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                return None
+            fill()
+
+    if skip(' \t\r\n') != '[':
+        raise StreamFormatError("Tableau JSON attendu")
+    pos += 1
+    expect_value = True
+    while True:
+        char = skip(' \t\r\n')
+        if char is None:
+            raise StreamFormatError("Tableau JSON non terminé")
+        if char == ']':
+            return
+        if char == ',' and not expect_value:
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise StreamFormatError(f"',' attendu dans le tableau JSON, reçu {char!r}")
+        # Les éléments sont des objets ou des listes: un élément coupé par la
+        # fin du tampon échoue au décodage et est relu après remplissage
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError as e:
+                if eof or len(buffer) - pos > _MAX_RECORD_SIZE:
+                    raise StreamFormatError(f"JSON invalide: {e}") from e
+                fill()
+        pos = end
+        expect_value = False
+        yield value
@@ -1,4 +1,23 @@
 """Module de modèles ML"""
-from .predictor import CropPredictor
+import importlib
 
-__all__ = ['CropPredictor']
+# Import à la demande (PEP 562): ``from src.models.results import ...`` ne
+# charge pas pandas et scikit-learn via le prédicteur
+_EXPORTS = {
+    'CropPredictor': '.predictor',
+    'ModelRegistry': '.registry'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,320 @@
+"""
+Bundle de modèle: un seul fichier versionné, chargeable sans scikit-learn
+
+Format (little-endian)::
+
+    MAGIC (8 octets) | version (uint32) | taille du manifeste (uint64)
+    manifeste JSON (UTF-8) | bourrage jusqu'à un multiple de 64
+    données: tableaux bruts, chacun aligné sur 64 octets
+
+Le manifeste décrit chaque tableau (dtype, shape, offset, SHA-256) et les
+métadonnées (noms des classes et des features, version du modèle, source).
+Les tableaux sont projetés en mémoire en lecture seule: les processus qui
+ouvrent le même bundle partagent une seule copie physique (page cache).
+"""
+import hashlib
+import json
+import logging
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .forest import CompiledForest
+from .naive_bayes import CompiledGaussianNB
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SCBUNDLE"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_HEADER = struct.Struct('<8sIQ')
+
+
+class BundleError(ValueError):
+    """Bundle invalide, corrompu ou de version non supportée"""
+
+
+def file_sha256(path: Path) -> str:
+    """Empreinte SHA-256 d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _align(offset: int) -> int:
+    """Arrondit au multiple de ALIGNMENT supérieur"""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_bundle(path: str, arrays: Dict[str, np.ndarray], meta: Dict) -> str:
+    """
+    Écrit un bundle
+
+    Args:
+        path: Fichier de sortie
+        arrays: Tableaux à sauvegarder, par nom (types numériques ou chaînes)
+        meta: Métadonnées JSON-sérialisables
+
+    Returns:
+        Version du modèle (empreinte du contenu)
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise BundleError(f"Tableau {name}: les objets Python ne sont pas supportés")
+        offset = _align(offset)
+        entries[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': array.nbytes,
+            'sha256': hashlib.sha256(array.tobytes()).hexdigest()
+        }
+        offset += array.nbytes
+
+    # La version du modèle ne dépend que du contenu (pas de la date d'export)
+    content = json.dumps({'arrays': entries, 'meta': meta}, sort_keys=True).encode('utf-8')
+    model_version = hashlib.sha256(content).hexdigest()[:12]
+
+    manifest = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'model_version': model_version,
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'meta': meta,
+        'arrays': entries
+    }).encode('utf-8')
+    data_start = _align(_HEADER.size + len(manifest))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest)))
+        f.write(manifest)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]['offset'])
+            f.write(array.tobytes())
+    # Remplacement atomique: un worker ne voit jamais un bundle partiel
+    tmp_path.replace(path)
+
+    logger.info(f"Bundle {path} écrit (version {model_version}, {len(arrays)} tableaux)")
+    return model_version
+
+
+def read_bundle(path: str, mmap: bool = True, verify: bool = True) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Lit un bundle
+
+    Args:
+        path: Fichier du bundle
+        mmap: Projeter les tableaux en mémoire (sinon lecture complète)
+        verify: Vérifier l'empreinte SHA-256 de chaque tableau
+
+    Returns:
+        (tableaux par nom, manifeste)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise BundleError(f"{path}: fichier tronqué")
+        magic, version, manifest_size = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise BundleError(f"{path}: ce n'est pas un bundle de modèle")
+        if version != FORMAT_VERSION:
+            raise BundleError(f"{path}: version de format non supportée ({version})")
+        manifest = json.loads(f.read(manifest_size).decode('utf-8'))
+        data_start = _align(_HEADER.size + manifest_size)
+        if not mmap:
+            f.seek(data_start)
+            data = np.frombuffer(f.read(), dtype=np.uint8)
+
+    if mmap:
+        # np.asarray retire la sous-classe memmap (coûteuse à chaque
+        # indexation) tout en gardant la projection mémoire comme base
+        data = np.asarray(np.memmap(path, dtype=np.uint8, mode='r', offset=data_start))
+
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        end = entry['offset'] + entry['nbytes']
+        if end > len(data):
+            raise BundleError(f"{path}: tableau {name} tronqué")
+        raw = data[entry['offset']:end]
+        if verify and hashlib.sha256(raw).hexdigest() != entry['sha256']:
+            raise BundleError(f"{path}: empreinte invalide pour {name}")
+        arrays[name] = raw.view(np.dtype(entry['dtype'])).reshape(entry['shape'])
+
+    return arrays, manifest
+
+
+class BundleScaler:
+    """Standardisation (moyenne, écart-type) au format de StandardScaler"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X) -> np.ndarray:
+        """Standardise les features"""
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+    def inverse_transform(self, X) -> np.ndarray:
+        """Revient aux unités d'origine"""
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.mean_
+
+
+class BundleLabelEncoder:
+    """Table des classes au format de LabelEncoder"""
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = classes
+
+    def inverse_transform(self, y) -> np.ndarray:
+        """Noms des classes à partir des indices"""
+        return self.classes_.take(np.asarray(y, dtype=np.intp))
+
+
+class ModelBundle:
+    """Contenu d'un bundle chargé"""
+
+    def __init__(self, forest: CompiledForest, scaler: BundleScaler, label_encoder: BundleLabelEncoder,
+                 feature_names: List[str], training_data: np.ndarray, training_stats: Dict[str, np.ndarray],
+                 manifest: Dict, cascade: Optional[CompiledGaussianNB] = None,
+                 training_labels: Optional[np.ndarray] = None):
+        self.forest = forest
+        self.training_labels = training_labels
+        self.cascade = cascade
+        self.scaler = scaler
+        self.label_encoder = label_encoder
+        self.feature_names = feature_names
+        self.training_data = training_data
+        self.training_stats = training_stats
+        self.manifest = manifest
+
+    @property
+    def model_version(self) -> str:
+        """Version du modèle (empreinte du contenu)"""
+        return self.manifest['model_version']
+
+    @property
+    def source_sha256(self) -> Optional[str]:
+        """Empreinte du modèle picklé d'origine"""
+        return self.manifest['meta'].get('source_sha256')
+
+
+def export_bundle(model_path: str, output_path: str,
+                  training_data_path: str = "data/X_train_scaled.npy",
+                  training_labels_path: Optional[str] = "data/y_train.npy",
+                  leaf_storage: str = 'auto',
+                  feature_names: Optional[List[str]] = None,
+                  cascade_model_path: Optional[str] = None) -> str:
+    """
+    Exporte le modèle picklé et ses préprocesseurs dans un bundle
+
+    La forêt est compilée et travaille dans l'espace brut (scaler replié
+    dans les seuils); les paramètres du scaler restent inclus pour LIME.
+
+    Args:
+        model_path: Modèle scikit-learn picklé (scaler et label encoder
+                    cherchés dans le même répertoire que pour CropPredictor)
+        output_path: Fichier du bundle
+        training_data_path: Données d'entraînement standardisées pour LIME
+        training_labels_path: Classes des données d'entraînement (index des
+                              voisins de référence, optionnel)
+        leaf_storage: Stockage des feuilles (voir CompiledForest.from_sklearn)
+        feature_names: Noms des features (par défaut ceux du scaler)
+        cascade_model_path: GaussianNB picklé du premier étage de la cascade
+                            (optionnel, replié dans l'espace brut)
+
+    Returns:
+        Version du modèle
+    """
+    import joblib
+
+    model_path = Path(model_path)
+    model = joblib.load(model_path)
+    model_dir = model_path.parent.parent
+    scaler = joblib.load(model_dir / "scaler.pkl")
+    label_encoder = joblib.load(model_dir / "label_encoder.pkl")
+    if feature_names is None:
+        feature_names = [str(name) for name in scaler.feature_names_in_]
+
+    forest = CompiledForest.from_sklearn(model, leaf_storage=leaf_storage).fold_scaler(
+        scaler.mean_, scaler.scale_
+    )
+    forest_arrays, forest_meta = forest.to_arrays()
+    arrays = {f"forest.{name}": array for name, array in forest_arrays.items()}
+
+    training_data = np.load(training_data_path)
+    raw_training = training_data * scaler.scale_ + scaler.mean_
+    arrays.update({
+        'scaler.mean': np.asarray(scaler.mean_, dtype=np.float64),
+        'scaler.scale': np.asarray(scaler.scale_, dtype=np.float64),
+        'classes': np.asarray(label_encoder.classes_).astype(str),
+        'training_data': training_data,
+        'stats.mean': raw_training.mean(axis=0),
+        'stats.std': raw_training.std(axis=0),
+        'stats.min': raw_training.min(axis=0),
+        'stats.max': raw_training.max(axis=0)
+    })
+
+    if training_labels_path is not None and Path(training_labels_path).exists():
+        arrays['training_labels'] = np.load(training_labels_path)
+
+    if cascade_model_path is not None:
+        cascade = CompiledGaussianNB.from_sklearn(joblib.load(cascade_model_path)).fold_scaler(
+            scaler.mean_, scaler.scale_
+        )
+        arrays.update({f"cascade.{name}": array for name, array in cascade.to_arrays().items()})
+
+    return write_bundle(output_path, arrays, {
+        'forest': forest_meta,
+        'feature_names': list(feature_names),
+        'n_training_samples': int(len(training_data)),
+        'source_model': str(model_path),
+        'source_sha256': file_sha256(model_path),
+        'cascade_model': None if cascade_model_path is None else str(cascade_model_path)
+    })
+
+
+def load_bundle(path: str, mmap: bool = True, verify: bool = True) -> ModelBundle:
+    """
+    Charge un bundle exporté par export_bundle (sans importer scikit-learn)
+
+    Args:
+        path: Fichier du bundle
+        mmap: Projeter les tableaux en mémoire en lecture seule
+        verify: Vérifier les empreintes des tableaux
+
+    Returns:
+        Contenu du bundle
+    """
+    arrays, manifest = read_bundle(path, mmap=mmap, verify=verify)
+    meta = manifest['meta']
+
+    forest_arrays = _prefixed(arrays, "forest.")
+    cascade_arrays = _prefixed(arrays, "cascade.")
+
+    return ModelBundle(
+        forest=CompiledForest.from_arrays(forest_arrays, meta['forest']),
+        scaler=BundleScaler(arrays['scaler.mean'], arrays['scaler.scale']),
+        label_encoder=BundleLabelEncoder(arrays['classes']),
+        feature_names=meta['feature_names'],
+        training_data=arrays['training_data'],
+        training_stats=_prefixed(arrays, "stats."),
+        manifest=manifest,
+        cascade=CompiledGaussianNB.from_arrays(cascade_arrays) if cascade_arrays else None,
+        training_labels=arrays.get('training_labels')
+    )
+
+
+def _prefixed(arrays: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    """Tableaux dont le nom commence par ``prefix`` (préfixe retiré)"""
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
@@ -0,0 +1,177 @@
+"""
+Cache des prédictions (LRU + TTL, dédoublonnage des calculs concurrents)
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Calcul en cours pour une clé, attendu par les requêtes identiques"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PredictionCache:
+    """
+    Cache borné des résultats de prédiction
+
+    Les entrées sont évincées par ancienneté d'utilisation (LRU) au-delà de
+    ``max_size`` et expirent ``ttl`` secondes après leur calcul. Les
+    requêtes identiques concurrentes ne déclenchent qu'un seul calcul: les
+    suivantes attendent le résultat du premier (single-flight).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600,
+                 copy: Optional[Callable] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialise le cache
+
+        Args:
+            max_size: Nombre maximal d'entrées (0 pour désactiver)
+            ttl: Durée de vie d'une entrée en secondes (None: illimitée)
+            copy: Copie appliquée aux valeurs stockées et retournées (les
+                  appelants peuvent modifier les résultats)
+            clock: Horloge (secondes), remplaçable pour les tests
+        """
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self._copy = copy or (lambda value: value)
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('hits', 'misses', 'coalesced', 'evictions', 'expirations'), 0)
+
+    @property
+    def enabled(self) -> bool:
+        """Indique si le cache stocke des résultats"""
+        return self.max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        """
+        Retourne une copie de la valeur en cache, ou None
+
+        Args:
+            key: Clé de la prédiction
+        """
+        with self._lock:
+            value = self._lookup(key)
+            self._counters['hits' if value is not None else 'misses'] += 1
+        return None if value is None else self._copy(value)
+
+    def put(self, key: Hashable, value):
+        """
+        Ajoute une valeur au cache (éviction LRU)
+
+        Args:
+            key: Clé de la prédiction
+            value: Résultat à stocker
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(key, self._copy(value))
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]):
+        """
+        Retourne la valeur en cache ou la calcule une seule fois
+
+        Si un autre thread calcule déjà la même clé, attend son résultat
+        (ou son exception) au lieu de refaire le calcul.
+
+        Args:
+            key: Clé de la prédiction
+            compute: Fonction sans argument produisant la valeur
+
+        Returns:
+            Copie de la valeur
+        """
+        if not self.enabled:
+            return compute()
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self._counters['hits'] += 1
+                return self._copy(value)
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters['misses'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self._copy(flight.value)
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._store(key, self._copy(flight.value))
+            return self._copy(flight.value)
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs du cache pour la supervision"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats.update(
+            max_size=self.max_size,
+            ttl=self.ttl,
+            hit_rate=(stats['hits'] + stats['coalesced']) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def _lookup(self, key: Hashable):
+        """Valeur non expirée pour la clé (verrou tenu par l'appelant)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and self._clock() >= expires_at:
+            del self._entries[key]
+            self._counters['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value):
+        """Stocke une valeur et applique la borne de taille (verrou tenu)"""
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
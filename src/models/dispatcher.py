@@ -0,0 +1,159 @@
+"""
+Micro-batching des requêtes unitaires concurrentes
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from .metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+
+class BatchDispatcher:
+    """
+    Regroupe les requêtes unitaires concurrentes en un seul appel vectorisé
+
+    Chaque appelant dépose sa ligne et reçoit un ``Future``. Un thread
+    collecteur vide la file et appelle ``fn`` sur le batch dès qu'il est
+    plein (``max_batch``) ou que la fenêtre ``max_wait_ms`` ouverte par la
+    première ligne expire. La fenêtre n'est attendue que si d'autres
+    appelants sont en cours: une requête isolée est évaluée immédiatement.
+    """
+
+    def __init__(self, fn: Callable[[np.ndarray], Tuple[np.ndarray, ...]], max_batch: int = 64,
+                 max_wait_ms: float = 2.0, latency_window: int = 1024):
+        """
+        Initialise le dispatcher
+
+        Args:
+            fn: Fonction vectorisée (n_samples, n_features) -> tuple de
+                tableaux dont la première dimension est n_samples
+            max_batch: Taille maximale d'un batch
+            max_wait_ms: Attente maximale d'une ligne avant évaluation (ms)
+            latency_window: Nombre de temps d'attente récents gardés
+        """
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+        self._wait = LatencyStats(latency_window)
+        self._batches = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._sizes = np.zeros(self.max_batch + 1, dtype=np.int64)
+
+    def submit(self, row: np.ndarray) -> Future:
+        """
+        Dépose une ligne à évaluer
+
+        Args:
+            row: Ligne de shape (1, n_features)
+
+        Returns:
+            Future dont le résultat est le tuple de tableaux de ``fn``
+            restreints à la ligne (première dimension 1)
+        """
+        self._ensure_worker()
+        future = Future()
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put((np.asarray(row, dtype=np.float64).reshape(1, -1), future, time.perf_counter()))
+        return future
+
+    def __call__(self, row: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Évalue une ligne via le batch courant (bloquant)"""
+        return self.submit(row).result()
+
+    def _ensure_worker(self):
+        """Démarre le collecteur (une fois par processus, y compris après fork)"""
+        pid = os.getpid()
+        if self._worker_pid == pid:
+            return
+        with self._worker_lock:
+            if self._worker_pid == pid:
+                return
+            if self._worker_pid is not None:
+                # Processus fils: la file et les verrous hérités sont abandonnés
+                self._queue = queue.Queue()
+                self._pending = 0
+                self._pending_lock = threading.Lock()
+            thread = threading.Thread(target=self._collect_loop, name='batch-dispatcher', daemon=True)
+            thread.start()
+            self._worker_pid = pid
+
+    def _collect_loop(self):
+        """Collecte les lignes en batches et les évalue"""
+        requests = self._queue
+        while True:
+            batch = [requests.get()]
+            deadline = batch[0][2] + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(requests.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                # Tous les appelants en cours sont dans le batch: inutile d'attendre
+                with self._pending_lock:
+                    if self._pending <= len(batch):
+                        break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        """Évalue un batch et distribue les résultats"""
+        start = time.perf_counter()
+        with self._pending_lock:
+            self._pending -= len(batch)
+        for _, _, submitted in batch:
+            self._wait.record(start - submitted)
+        self._batches += 1
+        self._rows += len(batch)
+        self._max_batch_seen = max(self._max_batch_seen, len(batch))
+        self._sizes[len(batch)] += 1
+
+        try:
+            outputs = self.fn(np.concatenate([row for row, _, _ in batch]))
+            if not isinstance(outputs, tuple):
+                outputs = (outputs,)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'évaluation d'un batch de {len(batch)} lignes: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(tuple(output[i:i + 1] for output in outputs))
+
+    def stats(self) -> Dict:
+        """Tailles des batches et temps d'attente dans la file (supervision)"""
+        sizes = np.flatnonzero(self._sizes)
+        return {
+            'batches': self._batches,
+            'rows': self._rows,
+            'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+            'max_batch_size': self._max_batch_seen,
+            'batch_sizes': {int(size): int(self._sizes[size]) for size in sizes},
+            'wait': self._wait.summary(),
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000
+        }
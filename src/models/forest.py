@@ -0,0 +1,645 @@
+"""
+Moteur d'inférence NumPy pour les forêts aléatoires
+"""
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+class CompiledForest:
+    """
+    Forêt aplatie en tableaux contigus et compacts
+
+    Tous les arbres d'un ``RandomForestClassifier`` sont concaténés dans des
+    tableaux uniques. Un batch est évalué en parcourant tous les arbres
+    simultanément, niveau par niveau, avec des opérations NumPy vectorisées.
+    Les probabilités sont identiques bit à bit à celles de scikit-learn.
+
+    Chaque feature n'étant comparée qu'à un ensemble fini de seuils, les
+    entrées sont encodées en codes de bin uint16 (rang parmi les seuils
+    triés). Deux entrées de mêmes codes ont exactement les mêmes
+    probabilités, et le parcours se fait par comparaisons entières.
+
+    Format compact (par noeud): feature en uint8, rang du seuil en uint16,
+    enfants en int32. Les noeuds sont renumérotés pour que les feuilles
+    occupent les indices ``[0, n_leaves)``; seules les feuilles stockent une
+    distribution, sous forme d'effectifs entiers (uint8/uint16) et de leur
+    total lorsque la reconstruction ``effectif / total`` est exacte.
+    """
+
+    # Rang attribué aux feuilles: toute entrée y est "inférieure ou égale"
+    LEAF_RANK = np.iinfo(np.uint16).max
+
+    # Au-delà de ce nombre de lignes, les feuilles sont accumulées arbre par
+    # arbre pour éviter un tableau (n_samples, n_trees, n_classes)
+    GATHER_MAX_ROWS = 32
+
+    LEAF_STORAGES = ('auto', 'counts', 'float16', 'float32', 'float64')
+
+    # Bornes d'arrêt de predict_proba_anytime
+    ANYTIME_BOUNDS = ('exact', 'hoeffding')
+
+    def __init__(self, feature: np.ndarray, rank: np.ndarray, children: np.ndarray,
+                 roots: np.ndarray, bin_edges: List[np.ndarray], leaf_values: np.ndarray,
+                 leaf_totals: Optional[np.ndarray], max_depth: int, classes: np.ndarray,
+                 feature_importances: Optional[np.ndarray] = None, cast_float32: bool = True):
+        """
+        Initialise la forêt compilée
+
+        Args:
+            feature: Feature testée par chaque noeud (0 pour les feuilles)
+            rank: Rang du seuil de chaque noeud dans ``bin_edges[feature]``
+            children: Successeurs entrelacés [droite, gauche] de chaque noeud
+            roots: Indice de la racine de chaque arbre
+            bin_edges: Seuils triés de chaque feature
+            leaf_values: Distribution des classes des feuilles (effectifs
+                         entiers ou fractions)
+            leaf_totals: Total des effectifs de chaque feuille (None si
+                         ``leaf_values`` contient des fractions)
+            max_depth: Profondeur maximale des arbres
+            classes: Classes du modèle d'origine
+            feature_importances: Importance des features du modèle d'origine
+            cast_float32: Convertir les entrées en float32 comme scikit-learn
+        """
+        self.feature = feature
+        self.rank = rank
+        self.children = children
+        self.roots = roots
+        self.bin_edges = bin_edges
+        self.leaf_values = leaf_values
+        self.leaf_totals = leaf_totals
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.feature_importances_ = feature_importances
+        self.cast_float32 = cast_float32
+        self._leaf_class = None
+
+    @property
+    def n_trees(self) -> int:
+        """Nombre d'arbres"""
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        """Nombre total de noeuds"""
+        return len(self.feature)
+
+    @property
+    def n_leaves(self) -> int:
+        """Nombre total de feuilles"""
+        return len(self.leaf_values)
+
+    @property
+    def n_features(self) -> int:
+        """Nombre de features en entrée"""
+        return len(self.bin_edges)
+
+    @property
+    def leaf_storage(self) -> str:
+        """Format de stockage des distributions des feuilles"""
+        return 'counts' if self.leaf_totals is not None else self.leaf_values.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire occupée par les tableaux de la forêt (octets)"""
+        arrays = [self.feature, self.rank, self.children, self.roots, self.leaf_values]
+        arrays += self.bin_edges
+        if self.leaf_totals is not None:
+            arrays.append(self.leaf_totals)
+        return int(sum(a.nbytes for a in arrays))
+
+    @classmethod
+    def from_sklearn(cls, model, n_features: Optional[int] = None,
+                     leaf_storage: str = 'auto') -> "CompiledForest":
+        """
+        Compile une forêt scikit-learn entraînée
+
+        Args:
+            model: RandomForestClassifier (mono-sortie)
+            n_features: Nombre de features en entrée (par défaut n_features_in_)
+            leaf_storage: Stockage des feuilles: 'counts' (effectifs entiers,
+                          exact), 'float16'/'float32' (fractions quantifiées),
+                          'float64' ou 'auto' (effectifs si exact, sinon float64)
+
+        Returns:
+            Forêt compilée équivalente
+        """
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Seules les forêts mono-sortie sont supportées")
+        if leaf_storage not in cls.LEAF_STORAGES:
+            raise ValueError(f"Stockage inconnu: {leaf_storage}")
+
+        n_features = n_features or model.n_features_in_
+        if n_features > np.iinfo(np.uint8).max:
+            raise ValueError(f"Trop de features pour le format compact: {n_features}")
+        n_classes = len(model.classes_)
+
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        is_leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        # Renumérotation: feuilles d'abord, puis noeuds internes
+        n_leaves = int(is_leaf.sum())
+        new_id = np.empty(len(is_leaf), dtype=np.int64)
+        new_id[is_leaf] = np.arange(n_leaves)
+        new_id[~is_leaf] = np.arange(n_leaves, len(is_leaf))
+
+        feature = np.concatenate([tree.feature for tree in trees])
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        left = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)])
+        value = np.concatenate([tree.value[:, 0, :n_classes] for tree in trees])
+        weight = np.concatenate([tree.weighted_n_node_samples for tree in trees])
+
+        # Les feuilles bouclent sur elles-mêmes: le parcours peut donc
+        # s'exécuter un nombre fixe de niveaux sans test de terminaison
+        order = np.argsort(new_id)
+        node_ids = new_id[order]
+        leaf_mask = is_leaf[order]
+        children = np.empty((len(order), 2), dtype=np.int32)
+        children[:, 0] = np.where(leaf_mask, node_ids, new_id[np.where(leaf_mask, 0, right[order])])
+        children[:, 1] = np.where(leaf_mask, node_ids, new_id[np.where(leaf_mask, 0, left[order])])
+
+        node_feature = np.where(leaf_mask, 0, feature[order])
+        node_threshold = np.where(leaf_mask, np.nan, threshold[order])
+        bin_edges, rank = _build_bins(node_feature, node_threshold, n_features)
+
+        leaf_values, leaf_totals = _quantize_leaves(
+            value[order][:n_leaves], weight[order][:n_leaves], leaf_storage
+        )
+
+        return cls(
+            feature=node_feature.astype(np.uint8),
+            rank=rank,
+            children=children.ravel(),
+            roots=new_id[offsets[:-1]].astype(np.int32),
+            bin_edges=bin_edges,
+            leaf_values=leaf_values,
+            leaf_totals=leaf_totals,
+            max_depth=max(tree.max_depth for tree in trees),
+            classes=np.asarray(model.classes_),
+            feature_importances=getattr(model, 'feature_importances_', None),
+            cast_float32=True
+        )
+
+    def fold_scaler(self, mean: np.ndarray, scale: np.ndarray) -> "CompiledForest":
+        """
+        Replie une standardisation dans les seuils des noeuds
+
+        Chaque seuil ``t`` appris sur des features standardisées est remplacé
+        par le plus grand float64 ``r`` tel que
+        ``float32((r - mean) / scale) <= t``. La forêt obtenue prend les
+        features brutes en entrée et reste identique bit à bit au pipeline
+        StandardScaler + forêt scikit-learn. La transformation étant
+        croissante, les rangs des noeuds sont inchangés.
+
+        Args:
+            mean: Moyenne du scaler par feature
+            scale: Écart-type du scaler par feature
+
+        Returns:
+            Forêt compilée travaillant dans l'espace brut
+        """
+        if not self.cast_float32:
+            raise ValueError("La forêt travaille déjà dans l'espace brut")
+
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        bin_edges = [
+            _raw_thresholds(edges, np.full(len(edges), mean[f]), np.full(len(edges), scale[f]))
+            for f, edges in enumerate(self.bin_edges)
+        ]
+
+        return CompiledForest(
+            feature=self.feature,
+            rank=self.rank,
+            children=self.children,
+            roots=self.roots,
+            bin_edges=bin_edges,
+            leaf_values=self.leaf_values,
+            leaf_totals=self.leaf_totals,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            feature_importances=self.feature_importances_,
+            cast_float32=False
+        )
+
+    def to_arrays(self):
+        """
+        Représentation à plat de la forêt (pour la sérialisation)
+
+        Returns:
+            (tableaux par nom, métadonnées JSON-sérialisables)
+        """
+        arrays = {
+            'feature': self.feature,
+            'rank': self.rank,
+            'children': self.children,
+            'roots': self.roots,
+            'bin_edges': np.concatenate(self.bin_edges),
+            'bin_offsets': np.cumsum([0] + [len(edges) for edges in self.bin_edges]).astype(np.int64),
+            'leaf_values': self.leaf_values,
+            'classes': self.classes_
+        }
+        if self.leaf_totals is not None:
+            arrays['leaf_totals'] = self.leaf_totals
+        if self.feature_importances_ is not None:
+            arrays['feature_importances'] = np.asarray(self.feature_importances_, dtype=np.float64)
+
+        meta = {'max_depth': self.max_depth, 'cast_float32': self.cast_float32}
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, meta) -> "CompiledForest":
+        """
+        Reconstruit une forêt à partir de to_arrays (sans copie des tableaux)
+
+        Args:
+            arrays: Tableaux par nom (éventuellement projetés en mémoire)
+            meta: Métadonnées
+
+        Returns:
+            Forêt compilée
+        """
+        offsets = arrays['bin_offsets']
+        bin_edges = [arrays['bin_edges'][offsets[f]:offsets[f + 1]] for f in range(len(offsets) - 1)]
+
+        return cls(
+            feature=arrays['feature'],
+            rank=arrays['rank'],
+            children=arrays['children'],
+            roots=arrays['roots'],
+            bin_edges=bin_edges,
+            leaf_values=arrays['leaf_values'],
+            leaf_totals=arrays.get('leaf_totals'),
+            max_depth=meta['max_depth'],
+            classes=arrays['classes'],
+            feature_importances=arrays.get('feature_importances'),
+            cast_float32=meta['cast_float32']
+        )
+
+    def _prepare(self, X) -> np.ndarray:
+        """Convertit les entrées au format attendu par l'encodage"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.cast_float32:
+            X = X.astype(np.float32)
+        return np.asarray(X, dtype=np.float64)
+
+    def encode(self, X) -> np.ndarray:
+        """
+        Encode les entrées en codes de bin
+
+        Le code d'une valeur est le nombre de seuils strictement inférieurs:
+        ``x <= seuil`` équivaut donc à ``code <= rang du seuil``.
+
+        Args:
+            X: Features de shape (n_samples, n_features)
+
+        Returns:
+            Codes uint16 de shape (n_samples, n_features)
+        """
+        X = self._prepare(X)
+        codes = np.empty(X.shape, dtype=np.uint16)
+        for f, edges in enumerate(self.bin_edges):
+            codes[:, f] = np.searchsorted(edges, X[:, f], side='left')
+        return codes
+
+    def apply_codes(self, codes: np.ndarray, trees: Optional[slice] = None) -> np.ndarray:
+        """
+        Retourne la feuille atteinte dans chaque arbre à partir des codes
+
+        Args:
+            codes: Codes de bin de shape (n_samples, n_features)
+            trees: Arbres à parcourir (None: tous)
+
+        Returns:
+            Indices globaux des feuilles, shape (n_samples, n_trees)
+        """
+        codes = np.ascontiguousarray(codes, dtype=np.uint16)
+        n_samples, n_features = codes.shape
+        flat = codes.ravel()
+
+        roots = self.roots if trees is None else self.roots[trees]
+        if n_samples == 1:
+            # Requête unitaire: pas de décalage par ligne (un gather de moins par niveau)
+            nodes = roots.astype(np.intp)
+            for _ in range(self.max_depth):
+                go_left = flat[self.feature[nodes]] <= self.rank[nodes]
+                nodes = self.children[2 * nodes + go_left].astype(np.intp)
+            return nodes[None, :]
+
+        nodes = np.tile(roots.astype(np.intp), (n_samples, 1))
+        offsets = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+
+        # Les indices sont repassés en intp à chaque niveau: NumPy convertit
+        # sinon les index int32 à chaque accès, ce qui coûte plus cher
+        for _ in range(self.max_depth):
+            go_left = flat[offsets + self.feature[nodes]] <= self.rank[nodes]
+            nodes = self.children[2 * nodes + go_left].astype(np.intp)
+
+        return nodes
+
+    def apply(self, X) -> np.ndarray:
+        """
+        Retourne la feuille atteinte dans chaque arbre
+
+        Args:
+            X: Features de shape (n_samples, n_features)
+
+        Returns:
+            Indices globaux des feuilles, shape (n_samples, n_trees)
+        """
+        return self.apply_codes(self.encode(X))
+
+    def leaf_proba(self, leaves: np.ndarray) -> np.ndarray:
+        """
+        Distribution des classes (float64) des feuilles données
+
+        Args:
+            leaves: Indices de feuilles de shape quelconque
+
+        Returns:
+            Probabilités de shape ``leaves.shape + (n_classes,)``
+        """
+        if self.leaf_totals is not None:
+            return self.leaf_values[leaves] / self.leaf_totals[leaves][..., None]
+        return self.leaf_values[leaves].astype(np.float64)
+
+    @property
+    def leaf_class(self) -> np.ndarray:
+        """Vote de chaque feuille (classe majoritaire), calculé à la première demande"""
+        if self._leaf_class is None:
+            self._leaf_class = self.leaf_values.argmax(axis=1).astype(np.int16)
+        return self._leaf_class
+
+    def predict_proba(self, X, return_votes: bool = False):
+        """
+        Probabilités des classes (moyenne des arbres, comme scikit-learn)
+
+        Args:
+            X: Features de shape (n_samples, n_features)
+            return_votes: Retourner aussi le vote de chaque arbre
+
+        Returns:
+            Probabilités de shape (n_samples, n_classes), et votes
+            (n_samples, n_trees) si ``return_votes``
+        """
+        return self.predict_proba_codes(self.encode(X), return_votes=return_votes)
+
+    def predict_proba_codes(self, codes: np.ndarray, return_votes: bool = False):
+        """
+        Probabilités des classes à partir des codes de bin
+
+        Args:
+            codes: Codes de bin de shape (n_samples, n_features)
+            return_votes: Retourner aussi le vote de chaque arbre
+
+        Returns:
+            Probabilités de shape (n_samples, n_classes), et votes
+            (n_samples, n_trees) si ``return_votes``
+        """
+        leaves = self.apply_codes(codes)
+
+        # Les sommes sont faites dans l'ordre des arbres pour reproduire
+        # exactement l'accumulation séquentielle de scikit-learn
+        if len(leaves) <= self.GATHER_MAX_ROWS:
+            proba = self.leaf_proba(leaves).sum(axis=1)
+        else:
+            proba = np.zeros((len(leaves), self.leaf_values.shape[1]), dtype=np.float64)
+            for t in range(self.n_trees):
+                proba += self.leaf_proba(leaves[:, t])
+
+        proba /= self.n_trees
+        if return_votes:
+            return proba, self.leaf_class[leaves]
+        return proba
+
+    def predict_proba_anytime(self, X, block_size: int = 10, bound: str = 'exact',
+                              delta: float = 0.01, return_votes: bool = False) -> Tuple[np.ndarray, ...]:
+        """
+        Probabilités avec arrêt anticipé: arbres évalués par blocs
+
+        Après chaque bloc, les lignes dont la classe en tête est acquise ne
+        sont plus évaluées. Chaque arbre apporte une distribution de somme 1,
+        donc les ``r`` arbres restants ajoutent au plus ``r`` à l'écart entre
+        deux classes:
+
+        - ``exact``: arrêt quand l'écart des sommes entre la première et la
+          deuxième classe dépasse le nombre d'arbres restants; la classe
+          prédite est alors celle de la forêt complète
+        - ``hoeffding``: arrêt quand l'écart moyen par arbre dépasse
+          ``sqrt(2 ln(1/delta) / t)`` (borne de Hoeffding sur t arbres, vus
+          comme un échantillon): la classe peut différer avec une
+          probabilité de l'ordre de ``delta``
+
+        Les probabilités d'une ligne arrêtée sont la moyenne des arbres
+        évalués; celles d'une ligne allée au bout sont identiques à
+        ``predict_proba``.
+
+        Args:
+            X: Features de shape (n_samples, n_features)
+            block_size: Nombre d'arbres par bloc
+            bound: 'exact' ou 'hoeffding'
+            delta: Risque de la borne de Hoeffding
+            return_votes: Retourner aussi le vote de chaque arbre (-1 pour
+                          les arbres non évalués)
+
+        Returns:
+            (probabilités (n_samples, n_classes), nombre d'arbres évalués par
+            ligne), plus les votes (n_samples, n_trees) si ``return_votes``
+        """
+        if bound not in self.ANYTIME_BOUNDS:
+            raise ValueError(f"Borne inconnue: {bound} (attendu: {', '.join(self.ANYTIME_BOUNDS)})")
+        codes = self.encode(X)
+        n_trees = self.n_trees
+        sums = np.zeros((len(codes), self.leaf_values.shape[1]), dtype=np.float64)
+        used = np.zeros(len(codes), dtype=np.intp)
+        active = np.arange(len(codes))
+        votes = np.full((len(codes), n_trees), -1, dtype=np.int16) if return_votes else None
+        threshold = np.sqrt(2 * np.log(1 / delta))
+
+        # Borne exacte: l'écart après t arbres vaut au plus t, aucun arrêt
+        # n'est possible avant la majorité des arbres
+        block_size = max(1, block_size)
+        first = max(block_size, n_trees // 2 + 1) if bound == 'exact' else block_size
+        stops = list(range(first, n_trees, block_size)) + [n_trees]
+
+        start = 0
+        for stop in stops:
+            leaves = self.apply_codes(codes[active], trees=slice(start, stop))
+            # Accumulation arbre par arbre, dans l'ordre (comme predict_proba)
+            block = sums[active]
+            for t in range(stop - start):
+                block += self.leaf_proba(leaves[:, t])
+            sums[active] = block
+            used[active] = stop
+            if return_votes:
+                votes[active, start:stop] = self.leaf_class[leaves]
+            start = stop
+            if stop == n_trees:
+                break
+
+            top_two = np.partition(block, -2, axis=1)[:, -2:]
+            margin = top_two[:, 1] - top_two[:, 0]
+            if bound == 'exact':
+                # Marge relative pour les erreurs d'arrondi des sommes
+                decided = margin > (n_trees - stop) * (1 + 1e-9) + 1e-9
+            else:
+                decided = margin / stop > threshold / np.sqrt(stop)
+            active = active[~decided]
+            if not len(active):
+                break
+
+        sums /= used[:, None]
+        if return_votes:
+            return sums, used, votes
+        return sums, used
+
+    def predict(self, X) -> np.ndarray:
+        """Classe prédite pour chaque échantillon"""
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+
+# Colonnes retournées par vote_dispersion
+DISPERSION_FIELDS = ('entropy', 'vote_margin', 'half_agreement')
+
+
+def vote_dispersion(votes: np.ndarray, n_classes: int) -> np.ndarray:
+    """
+    Dispersion des votes des arbres, indicateur d'incertitude sans coût
+    d'évaluation supplémentaire
+
+    Pour chaque ligne, à partir des votes des arbres évalués:
+
+    - ``entropy``: entropie de la distribution des votes, normalisée par
+      ``ln(n_classes)`` (0: vote unanime, 1: votes uniformes)
+    - ``vote_margin``: écart entre les parts de voix de la première et de
+      la deuxième classe
+    - ``half_agreement``: accord entre les votes de la première et de la
+      seconde moitié des arbres évalués (1 moins la distance en variation
+      totale entre les deux distributions; 1: moitiés identiques)
+
+    Args:
+        votes: Votes de shape (n_samples, n_trees), -1 pour un arbre non
+               évalué (les arbres évalués sont en tête de ligne)
+        n_classes: Nombre de classes
+
+    Returns:
+        Tableau (n_samples, 3) dans l'ordre de ``DISPERSION_FIELDS``
+        (NaN pour ``half_agreement`` si moins de 2 arbres)
+    """
+    votes = np.asarray(votes)
+    n_samples, n_trees = votes.shape
+    evaluated = votes >= 0
+    used = evaluated.sum(axis=1)
+    n_first = used // 2
+    first = evaluated & (np.arange(n_trees) < n_first[:, None])
+
+    # Comptage des votes par (ligne, classe) en un seul bincount
+    cells = np.arange(n_samples)[:, None] * n_classes + np.maximum(votes, 0)
+    size = n_samples * n_classes
+    counts = np.bincount(cells[evaluated], minlength=size).reshape(n_samples, n_classes)
+    first_counts = np.bincount(cells[first], minlength=size).reshape(n_samples, n_classes)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = counts / used[:, None]
+        entropy = (shares * np.log(1 / np.where(shares > 0, shares, 1))).sum(axis=1) / np.log(n_classes)
+        top_two = np.partition(shares, -2, axis=1)[:, -2:]
+        margin = top_two[:, 1] - top_two[:, 0]
+        distance = np.abs(first_counts / n_first[:, None]
+                          - (counts - first_counts) / (used - n_first)[:, None]).sum(axis=1) / 2
+    return np.column_stack([entropy, margin, 1 - distance])
+
+
+def _build_bins(feature: np.ndarray, threshold: np.ndarray, n_features: int):
+    """Seuils triés par feature et rang de chaque noeud (NaN pour les feuilles)"""
+    internal = ~np.isnan(threshold)
+    bin_edges = []
+    rank = np.full(len(feature), CompiledForest.LEAF_RANK, dtype=np.uint16)
+
+    for f in range(n_features):
+        mask = internal & (feature == f)
+        edges = np.unique(threshold[mask])
+        if len(edges) >= CompiledForest.LEAF_RANK:
+            raise ValueError(f"Trop de seuils pour la feature {f}: {len(edges)}")
+        bin_edges.append(edges)
+        rank[mask] = np.searchsorted(edges, threshold[mask])
+
+    return bin_edges, rank
+
+
+def _smallest_uint(max_value: float):
+    """Plus petit type entier non signé pouvant contenir max_value"""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def _quantize_leaves(value: np.ndarray, weight: np.ndarray, leaf_storage: str):
+    """
+    Stockage compact des distributions des feuilles
+
+    Avec bootstrap et sans poids de classe, scikit-learn stocke des fractions
+    ``effectif / total`` d'entiers: les effectifs entiers suffisent alors à
+    reconstruire exactement les mêmes float64.
+    """
+    if leaf_storage in ('auto', 'counts'):
+        counts = np.round(value * weight[:, None])
+        if np.array_equal(counts / weight[:, None], value):
+            return (counts.astype(_smallest_uint(counts.max())),
+                    weight.astype(_smallest_uint(weight.max())))
+        if leaf_storage == 'counts':
+            raise ValueError("Les distributions des feuilles ne sont pas des effectifs entiers")
+        leaf_storage = 'float64'
+
+    return np.ascontiguousarray(value, dtype=leaf_storage), None
+
+
+def _ordered_keys(values: np.ndarray) -> np.ndarray:
+    """Entiers int64 ordonnés comme les float64 correspondants (involution)"""
+    bits = values.view(np.int64)
+    return bits ^ ((bits >> 63) & np.int64(0x7FFFFFFFFFFFFFFF))
+
+
+def _from_ordered_keys(keys: np.ndarray) -> np.ndarray:
+    """Inverse de _ordered_keys"""
+    return _ordered_keys(keys.view(np.float64)).view(np.float64)
+
+
+def _raw_thresholds(threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Seuils équivalents dans l'espace brut
+
+    ``x -> float32((x - mean) / scale)`` est croissante: l'ensemble des ``x``
+    qui vont à gauche est un intervalle ``]-inf, r]``. La borne ``r`` est
+    trouvée par dichotomie sur la représentation binaire des float64.
+    """
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    guess = threshold * scale + mean
+    delta = np.maximum(np.abs(guess), scale) * 1e-4
+
+    # Encadrement [lo, hi] avec goes_left(lo) vrai et goes_left(hi) faux
+    lo, hi = guess - delta, guess + delta
+    while True:
+        bad_lo, bad_hi = ~goes_left(lo), goes_left(hi)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        delta = delta * 2
+        lo = np.where(bad_lo, guess - delta, lo)
+        hi = np.where(bad_hi, guess + delta, hi)
+
+    lo_key, hi_key = _ordered_keys(lo), _ordered_keys(hi)
+    while True:
+        open_ = hi_key - lo_key > 1
+        if not open_.any():
+            break
+        mid_key = lo_key + (hi_key - lo_key) // 2
+        left = goes_left(_from_ordered_keys(mid_key))
+        lo_key = np.where(open_ & left, mid_key, lo_key)
+        hi_key = np.where(open_ & ~left, mid_key, hi_key)
+
+    return _from_ordered_keys(lo_key)
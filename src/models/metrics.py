@@ -0,0 +1,43 @@
+"""
+Métriques d'inférence
+"""
+import threading
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+
+class LatencyStats:
+    """Latences récentes d'un modèle (fenêtre glissante)"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Enregistre la durée d'une prédiction"""
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self._recent.append(seconds)
+
+    def record_error(self):
+        """Enregistre une prédiction en erreur"""
+        with self._lock:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        """Nombre d'appels et latences (ms) moyenne, p50, p95, p99"""
+        with self._lock:
+            recent = np.array(self._recent)
+            summary = {'count': self.count, 'errors': self.errors}
+            mean = self.total / self.count if self.count else 0.0
+        summary['mean_ms'] = round(mean * 1000, 3)
+        if len(recent):
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000
+            summary.update(p50_ms=round(p50, 3), p95_ms=round(p95, 3), p99_ms=round(p99, 3))
+        return summary
@@ -0,0 +1,146 @@
+"""
+Naive Bayes gaussien vectorisé (premier étage de la cascade)
+"""
+import numpy as np
+from typing import Dict
+
+
+class CompiledGaussianNB:
+    """
+    ``GaussianNB`` évalué en forme fermée avec NumPy
+
+    La log-vraisemblance jointe de chaque classe est une forme quadratique
+    des features; elle se calcule pour tout un batch avec deux produits
+    matriciels::
+
+        log p(c) - 1/2 Σ log(2π σ²) - 1/2 (x² · 1/σ² - 2 x · θ/σ² + Σ θ²/σ²)
+
+    Le scaler peut être replié dans les paramètres (voir ``fold_scaler``)
+    pour travailler directement sur les features brutes.
+    """
+
+    def __init__(self, theta: np.ndarray, var: np.ndarray, class_log_prior: np.ndarray,
+                 classes: np.ndarray):
+        """
+        Initialise le modèle
+
+        Args:
+            theta: Moyenne de chaque feature par classe (n_classes, n_features)
+            var: Variance de chaque feature par classe (lissage inclus)
+            class_log_prior: Log-probabilité a priori de chaque classe
+            classes: Classes du modèle d'origine
+        """
+        self.theta = np.asarray(theta, dtype=np.float64)
+        self.var = np.asarray(var, dtype=np.float64)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.classes_ = classes
+
+        # Termes précalculés de la forme quadratique
+        self._precision = 1.0 / self.var
+        self._weights = self.theta * self._precision
+        self._bias = (self.class_log_prior
+                      - 0.5 * np.log(2.0 * np.pi * self.var).sum(axis=1)
+                      - 0.5 * (self.theta ** 2 * self._precision).sum(axis=1))
+
+    @property
+    def n_classes(self) -> int:
+        """Nombre de classes"""
+        return len(self.classes_)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledGaussianNB":
+        """
+        Compile un ``GaussianNB`` entraîné
+
+        Args:
+            model: GaussianNB de scikit-learn
+
+        Returns:
+            Modèle équivalent
+        """
+        return cls(
+            theta=model.theta_,
+            var=model.var_,
+            class_log_prior=np.log(model.class_prior_),
+            classes=np.asarray(model.classes_)
+        )
+
+    def fold_scaler(self, mean: np.ndarray, scale: np.ndarray) -> "CompiledGaussianNB":
+        """
+        Replie une standardisation ``(x - mean) / scale`` dans les paramètres
+
+        Une gaussienne N(θ, σ²) sur la feature standardisée correspond à
+        N(mean + scale·θ, scale²·σ²) sur la feature brute; le terme de
+        normalisation ne change que d'une constante commune à toutes les
+        classes, sans effet sur les probabilités a posteriori.
+
+        Args:
+            mean: Moyenne du scaler
+            scale: Écart-type du scaler
+
+        Returns:
+            Nouveau modèle travaillant sur les features brutes
+        """
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        return CompiledGaussianNB(
+            theta=mean + scale * self.theta,
+            var=self.var * scale ** 2,
+            class_log_prior=self.class_log_prior,
+            classes=self.classes_
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Tableaux nécessaires pour reconstruire le modèle (voir bundle)"""
+        return {
+            'theta': self.theta,
+            'var': self.var,
+            'class_log_prior': self.class_log_prior,
+            'classes': np.asarray(self.classes_)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CompiledGaussianNB":
+        """Reconstruit le modèle depuis ``to_arrays``"""
+        return cls(arrays['theta'], arrays['var'], arrays['class_log_prior'], arrays['classes'])
+
+    def joint_log_likelihood(self, X) -> np.ndarray:
+        """
+        Log-vraisemblance jointe de chaque classe
+
+        Args:
+            X: Features de shape (n_samples, n_features)
+
+        Returns:
+            Tableau (n_samples, n_classes)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        return self._bias + X @ self._weights.T - 0.5 * ((X * X) @ self._precision.T)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilités a posteriori (softmax stable de la log-vraisemblance)"""
+        jll = self.joint_log_likelihood(X)
+        jll -= jll.max(axis=1, keepdims=True)
+        proba = np.exp(jll)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        """Classes prédites"""
+        return self.classes_[self.joint_log_likelihood(X).argmax(axis=1)]
+
+
+def confidence_gate(proba: np.ndarray, min_probability: float, min_margin: float) -> np.ndarray:
+    """
+    Sélectionne les lignes dont la prédiction est assez sûre
+
+    Args:
+        proba: Probabilités (n_samples, n_classes)
+        min_probability: Probabilité minimale de la classe en tête
+        min_margin: Écart minimal entre les deux premières classes
+
+    Returns:
+        Masque des lignes acceptées
+    """
+    top_two = np.partition(proba, -2, axis=1)[:, -2:]
+    return (top_two[:, 1] >= min_probability) & (top_two[:, 1] - top_two[:, 0] >= min_margin)
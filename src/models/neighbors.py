@@ -0,0 +1,169 @@
+"""
+Index des échantillons de référence (plus proches voisins)
+"""
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceIndex:
+    """
+    KD-tree des échantillons de référence dans l'espace standardisé
+
+    Pour chaque prédiction, l'index retourne les échantillons connus les
+    plus proches (jeu d'entraînement, puis historique des prédictions) avec
+    leur culture: une justification directe, sans le coût de LIME. Les
+    distances sont euclidiennes sur les features standardisées, pour que
+    chaque feature pèse autant quel que soit son unité.
+    """
+
+    def __init__(self, points: np.ndarray, labels: np.ndarray, mean: np.ndarray, scale: np.ndarray,
+                 class_names: Sequence[str], feature_names: Sequence[str], source: str = 'training',
+                 leafsize: int = 16):
+        """
+        Construit l'index
+
+        Args:
+            points: Échantillons standardisés (n_samples, n_features)
+            labels: Indice de classe de chaque échantillon
+            mean: Moyenne du scaler
+            scale: Écart-type du scaler
+            class_names: Nom de chaque classe
+            feature_names: Nom de chaque feature
+            source: Origine des échantillons (retournée avec chaque voisin)
+            leafsize: Taille des feuilles du KD-tree
+        """
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.class_names = [str(name) for name in class_names]
+        self.feature_names = list(feature_names)
+        self.leafsize = leafsize
+        self.sources = [source]
+
+        self._points = np.asarray(points, dtype=np.float64)
+        self._labels = np.asarray(labels, dtype=np.intp)
+        self._source_ids = np.zeros(len(self._points), dtype=np.uint8)
+        self._lock = threading.Lock()
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._state[2])
+
+    def _build(self):
+        """(Re)construit le KD-tree et la table des features brutes"""
+        # Import différé: scipy.spatial coûte ~0.5 s au démarrage
+        from scipy.spatial import cKDTree
+
+        tree = cKDTree(self._points, leafsize=self.leafsize)
+        raw = np.round(self._points * self.scale + self.mean, 4).tolist()
+        # Remplacement atomique: les requêtes en cours gardent l'état précédent
+        self._state = (tree, raw, self._labels, self._source_ids)
+
+    def add(self, features: np.ndarray, crops: Sequence[str], source: str = 'history') -> int:
+        """
+        Ajoute des échantillons et reconstruit l'index
+
+        Args:
+            features: Features brutes (n_samples, n_features)
+            crops: Nom de la culture de chaque échantillon
+            source: Origine des échantillons
+
+        Returns:
+            Nombre d'échantillons ajoutés (cultures inconnues ignorées)
+        """
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(self.feature_names))
+        class_index = {name: idx for idx, name in enumerate(self.class_names)}
+        labels = np.array([class_index.get(str(crop), -1) for crop in crops], dtype=np.intp)
+        keep = (labels >= 0) & np.isfinite(features).all(axis=1)
+        if not keep.any():
+            return 0
+
+        with self._lock:
+            if source not in self.sources:
+                self.sources.append(source)
+            source_id = self.sources.index(source)
+            self._points = np.concatenate([self._points, (features[keep] - self.mean) / self.scale])
+            self._labels = np.concatenate([self._labels, labels[keep]])
+            self._source_ids = np.concatenate([
+                self._source_ids, np.full(int(keep.sum()), source_id, dtype=np.uint8)
+            ])
+            self._build()
+
+        n_added = int(keep.sum())
+        logger.info(f"{n_added} échantillons de référence ajoutés ({source}), {len(self)} au total")
+        return n_added
+
+    def query(self, features: np.ndarray, k: int = 5):
+        """
+        Plus proches voisins (indices et distances)
+
+        Args:
+            features: Features brutes (n_samples, n_features)
+            k: Nombre de voisins
+
+        Returns:
+            (distances, indices) de shape (n_samples, k)
+        """
+        return self._query(self._state[0], features, k)
+
+    def _query(self, tree, features: np.ndarray, k: int):
+        """Requête sur un KD-tree donné"""
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(self.feature_names))
+        k = min(k, tree.n)
+        distances, indices = tree.query((features - self.mean) / self.scale, k=k)
+        return distances.reshape(len(features), k), indices.reshape(len(features), k)
+
+    def neighbors(self, features: np.ndarray, k: int = 5) -> List[List[Dict]]:
+        """
+        Plus proches échantillons de référence de chaque ligne
+
+        Args:
+            features: Features brutes (n_samples, n_features)
+            k: Nombre de voisins
+
+        Returns:
+            Pour chaque ligne, liste de dictionnaires (culture, distance,
+            features brutes, origine) triés par distance croissante
+        """
+        tree, raw, labels, source_ids = self._state
+        distances, indices = self._query(tree, features, k)
+
+        return [
+            [
+                {
+                    'crop': self.class_names[labels[idx]],
+                    'distance': round(distance, 4),
+                    'features': dict(zip(self.feature_names, raw[idx])),
+                    'source': self.sources[source_ids[idx]]
+                }
+                for distance, idx in zip(row_distances, row_indices)
+            ]
+            for row_distances, row_indices in zip(distances.tolist(), indices.tolist())
+        ]
+
+    def describe(self) -> Dict[str, int]:
+        """Nombre d'échantillons par origine"""
+        counts = np.bincount(self._state[3], minlength=len(self.sources))
+        return {source: int(count) for source, count in zip(self.sources, counts)}
+
+
+def build_reference_index(training_data: Optional[np.ndarray], labels: Optional[np.ndarray], scaler,
+                          class_names: Sequence[str], feature_names: Sequence[str]) -> Optional[ReferenceIndex]:
+    """
+    Index des données d'entraînement, ou None si elles sont indisponibles
+
+    Args:
+        training_data: Données d'entraînement standardisées
+        labels: Indice de classe de chaque ligne
+        scaler: Scaler (mean_, scale_)
+        class_names: Nom de chaque classe
+        feature_names: Nom de chaque feature
+    """
+    if training_data is None or labels is None or len(training_data) != len(labels):
+        logger.warning("Index des voisins non construit: données d'entraînement ou labels indisponibles")
+        return None
+    return ReferenceIndex(training_data, labels, scaler.mean_, scaler.scale_, class_names, feature_names)
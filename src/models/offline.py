@@ -0,0 +1,394 @@
+"""
+Scoring hors ligne de gros fichiers (CSV, NDJSON, Parquet) sur plusieurs coeurs
+"""
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from .forest import DISPERSION_FIELDS
+from .parallel import ParallelismPolicy, available_cpus
+from .predictor import CropPredictor
+from .results import top_k_indices
+from ..utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = '_checkpoint.json'
+OUTPUT_FORMATS = ('csv', 'parquet')
+BACKENDS = ('sklearn', 'compiled')
+
+# Prédicteur du processus worker (chargé une fois par ``_init_worker``)
+_worker_predictor: Optional[CropPredictor] = None
+
+
+def _require_pyarrow():
+    """Vérifie que pyarrow (fichiers Parquet) est installé"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Le format Parquet nécessite pyarrow (pip install pyarrow)") from e
+
+
+def input_format(path: Path) -> str:
+    """Format d'un fichier d'entrée d'après son extension"""
+    suffix = path.suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    if suffix in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if suffix in ('.csv', '.txt', '.gz'):
+        return 'csv'
+    raise ValueError(f"Format d'entrée non supporté: {path.name} (CSV, NDJSON ou Parquet)")
+
+
+def count_rows(path: Path) -> Optional[int]:
+    """Nombre de lignes si connu sans lire le fichier (métadonnées Parquet)"""
+    if input_format(path) != 'parquet':
+        return None
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def iter_input_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Lit un fichier par blocs de ``chunk_size`` lignes
+
+    Args:
+        path: Fichier CSV (en-tête obligatoire), NDJSON ou Parquet
+        chunk_size: Nombre de lignes par bloc
+
+    Yields:
+        DataFrame par bloc
+    """
+    fmt = input_format(path)
+    if fmt == 'parquet':
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif fmt == 'ndjson':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def score_frame(predictor: CropPredictor, frame: pd.DataFrame, top_k: int = 3) -> pd.DataFrame:
+    """
+    Évalue un bloc et ajoute les colonnes de prédiction
+
+    Colonnes ajoutées: crop, confidence, top_<i>/top_<i>_probability,
+    stage, error (lignes rejetées par le schéma d'entrée), warning
+    (lignes acceptées malgré des valeurs hors plage), n_trees_used
+    (évaluation anytime seulement), entropy/vote_margin/half_agreement/
+    low_certainty (dispersion des votes, forêt compilée avec inference.uncertainty)
+    et ood_distance/ood (détection hors distribution, si inference.ood est
+    actif; probabilités dégradées selon sa politique).
+
+    Args:
+        predictor: Prédicteur chargé
+        frame: Bloc d'entrée contenant les colonnes des features
+        top_k: Nombre de cultures classées retournées
+
+    Returns:
+        Bloc d'entrée complété
+    """
+    missing = [name for name in predictor.feature_names if name not in frame.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+
+    checked = predictor.schema.validate(frame[predictor.feature_names])
+    values, valid = checked.values, checked.valid
+    class_names = np.asarray(predictor.label_encoder.classes_, dtype=object)
+    top_k = min(top_k, len(class_names))
+
+    n_rows = len(frame)
+    out = frame.copy()
+    crops = np.full(n_rows, None, dtype=object)
+    confidence = np.full(n_rows, np.nan)
+    top_crops = np.full((n_rows, top_k), None, dtype=object)
+    top_probabilities = np.full((n_rows, top_k), np.nan)
+    stages = np.full(n_rows, None, dtype=object)
+    n_trees_used = np.zeros(n_rows, dtype=np.int64)
+    dispersion = np.full((n_rows, len(DISPERSION_FIELDS)), np.nan)
+    ood_distance = np.full(n_rows, np.nan)
+    ood = np.zeros(n_rows, dtype=bool)
+
+    if valid.any():
+        probabilities, escalated, trees, dispersion[valid] = predictor.predict_proba(
+            values[valid], return_stages=True, return_trees=True, return_uncertainty=True)
+        if predictor.ood is not None:
+            ood_distance[valid], ood[valid] = predictor.detect_ood(values[valid])
+            flagged = ood[valid]
+            if flagged.any():
+                probabilities[flagged] = predictor.ood.downgrade(probabilities[flagged])
+        top = top_k_indices(probabilities, top_k)
+        top_crops[valid] = class_names[top]
+        top_probabilities[valid] = np.take_along_axis(probabilities, top, axis=1)
+        crops[valid] = top_crops[valid, 0]
+        confidence[valid] = top_probabilities[valid, 0]
+        stages[valid] = np.where(escalated, predictor.STAGE_FOREST, predictor.STAGE_CASCADE)
+        n_trees_used[valid] = trees
+
+    out['crop'] = crops
+    out['confidence'] = confidence
+    for i in range(top_k):
+        out[f'top_{i + 1}'] = top_crops[:, i]
+        out[f'top_{i + 1}_probability'] = top_probabilities[:, i]
+    out['stage'] = stages
+    if predictor.anytime:
+        out['n_trees_used'] = n_trees_used
+    if predictor.uncertainty and predictor.forest is not None:
+        for i, name in enumerate(DISPERSION_FIELDS):
+            out[name] = dispersion[:, i]
+        out['low_certainty'] = predictor.low_certainty(dispersion)
+    if predictor.ood is not None:
+        out['ood_distance'] = ood_distance
+        out['ood'] = ood
+    errors = np.full(n_rows, None, dtype=object)
+    for row in np.flatnonzero(checked.codes.any(axis=1)).tolist():
+        errors[row] = "; ".join(issue['message'] for issue in checked.issues(row))
+    out['error'] = np.where(valid, None, errors)
+    out['warning'] = np.where(valid, errors, None)
+    return out
+
+
+def write_part(frame: pd.DataFrame, path: Path, fmt: str):
+    """Écrit un fichier de sortie de façon atomique (fichier temporaire puis renommage)"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    if fmt == 'parquet':
+        _require_pyarrow()
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _init_worker(model_path: str, config_path: str, cascade: Optional[bool], n_workers: int,
+                 backend: str = 'sklearn'):
+    """Charge le modèle une fois par processus worker"""
+    global _worker_predictor
+    config = Config(config_path)
+    predictor = CropPredictor(model_path=model_path, backend=backend, cache_size=0,
+                              config=config, cascade=cascade, batching=False)
+    predictor.load_model()
+    # Les coeurs sont partagés entre les processus du pool
+    predictor.parallelism = ParallelismPolicy(
+        min_parallel_batch=config.get('inference.parallelism.min_parallel_batch', 4096),
+        chunk_size=config.get('inference.parallelism.chunk_size', 2048),
+        max_threads=config.get('inference.parallelism.max_threads'),
+        workers=n_workers
+    )
+    _worker_predictor = predictor
+
+
+def _score_chunk(chunk_id: int, frame: pd.DataFrame, part_path: str, fmt: str, top_k: int) -> Dict:
+    """Évalue un bloc dans un worker et écrit son fichier de sortie"""
+    start = time.perf_counter()
+    scored = score_frame(_worker_predictor, frame, top_k)
+    write_part(scored, Path(part_path), fmt)
+    return {
+        'chunk': chunk_id,
+        'rows': len(scored),
+        'errors': int(scored['error'].notna().sum()),
+        'seconds': time.perf_counter() - start,
+        'model_version': _worker_predictor.model_version
+    }
+
+
+class OfflineScorer:
+    """
+    Scoring d'un gros fichier par blocs, réparti sur un pool de processus
+
+    Le fichier est lu bloc par bloc (jamais entièrement en mémoire); chaque
+    bloc est évalué par un worker qui a chargé le modèle une seule fois, et
+    écrit dans son propre fichier ``part-<n>``. Par défaut le modèle
+    scikit-learn est utilisé: sur des blocs de plusieurs milliers de lignes
+    il évalue environ deux fois plus de lignes par seconde que la forêt
+    compilée, qui reste disponible (``backend='compiled'``) pour son bundle
+    projeté en mémoire partagé entre les processus et les colonnes de
+    dispersion des votes. Le fichier de reprise
+    ``_checkpoint.json`` liste les blocs terminés: une exécution
+    interrompue reprend là où elle s'était arrêtée.
+    """
+
+    def __init__(self, output_dir: str, model_path: str = "models/tuned/random_forest_best.pkl",
+                 workers: Optional[int] = None, chunk_size: int = 50000, top_k: int = 3,
+                 output_format: str = 'csv', config_path: str = "config/config.yaml",
+                 cascade: Optional[bool] = None, max_pending: Optional[int] = None,
+                 backend: str = 'sklearn'):
+        """
+        Initialise le scoring
+
+        Args:
+            output_dir: Répertoire des fichiers de sortie et de reprise
+            model_path: Chemin vers le modèle (le bundle inference.bundle_path
+                        est utilisé s'il correspond)
+            workers: Nombre de processus (None: nombre de coeurs)
+            chunk_size: Nombre de lignes par bloc (et par fichier de sortie)
+            top_k: Nombre de cultures classées par ligne
+            output_format: 'csv' ou 'parquet'
+            config_path: Fichier de configuration chargé par les workers
+            cascade: Cascade Naive Bayes -> forêt (None: inference.cascade.enabled)
+            max_pending: Blocs lus en avance au maximum (None: 2 par worker)
+            backend: 'sklearn' ou 'compiled' (forêt compilée, bundle)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend inconnu: {backend} (attendu: {', '.join(BACKENDS)})")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Format de sortie inconnu: {output_format} (attendu: {', '.join(OUTPUT_FORMATS)})")
+        self.output_dir = Path(output_dir)
+        self.model_path = model_path
+        self.workers = max(1, workers or available_cpus())
+        self.chunk_size = max(1, chunk_size)
+        self.top_k = top_k
+        self.output_format = output_format
+        self.config_path = config_path
+        # Résolu ici pour que le fichier de reprise enregistre le modèle réellement utilisé
+        self.cascade = Config(config_path).get('inference.cascade.enabled', False) if cascade is None else cascade
+        self.max_pending = max_pending or 2 * self.workers
+        self.backend = backend
+
+    def part_path(self, chunk_id: int) -> Path:
+        """Fichier de sortie d'un bloc"""
+        return self.output_dir / f"part-{chunk_id:05d}.{self.output_format}"
+
+    def run(self, input_path: str, resume: bool = True) -> Dict:
+        """
+        Évalue un fichier
+
+        Args:
+            input_path: Fichier CSV, NDJSON ou Parquet
+            resume: Reprendre depuis le fichier de reprise s'il existe
+                    (False: recommencer depuis le début)
+
+        Returns:
+            Statistiques (lignes, erreurs, durée, lignes/s, lignes/s par coeur)
+        """
+        input_path = Path(input_path)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint = self._load_checkpoint(input_path, resume)
+        completed = checkpoint['completed']
+        total_rows = count_rows(input_path)
+
+        done_rows = sum(part['rows'] for part in completed.values())
+        if completed:
+            logger.info(f"Reprise: {len(completed)} blocs ({done_rows} lignes) déjà évalués")
+
+        stats = {'rows': 0, 'errors': 0, 'busy_seconds': 0.0}
+        start = time.perf_counter()
+        last_report = start
+
+        def record(result: Dict):
+            nonlocal done_rows, last_report
+            version = checkpoint.setdefault('model_version', result['model_version'])
+            if version != result['model_version']:
+                raise ValueError(f"Le modèle a changé depuis le début du scoring "
+                                   f"({version} -> {result['model_version']}): relancer sans reprise")
+            completed[str(result['chunk'])] = {'rows': result['rows'], 'errors': result['errors']}
+            self._save_checkpoint(checkpoint)
+            stats['rows'] += result['rows']
+            stats['errors'] += result['errors']
+            stats['busy_seconds'] += result['seconds']
+            done_rows += result['rows']
+
+            now = time.perf_counter()
+            if now - last_report >= 5 or (total_rows is not None and done_rows >= total_rows):
+                last_report = now
+                rate = stats['rows'] / (now - start)
+                progress = f"{done_rows}/{total_rows} lignes ({done_rows / total_rows:.1%})" \
+                    if total_rows else f"{done_rows} lignes"
+                eta = f", fin dans {(total_rows - done_rows) / rate:.0f} s" if total_rows and rate else ""
+                logger.info(f"Progression: {progress}, {rate:,.0f} lignes/s{eta}")
+
+        chunks = (
+            (chunk_id, frame) for chunk_id, frame in enumerate(iter_input_chunks(input_path, self.chunk_size))
+            if str(chunk_id) not in completed or not self.part_path(chunk_id).exists()
+        )
+        init_args = (self.model_path, self.config_path, self.cascade, self.workers, self.backend)
+
+        if self.workers == 1:
+            # Pas de pool: évaluation dans le processus courant
+            _init_worker(*init_args)
+            for chunk_id, frame in chunks:
+                record(_score_chunk(chunk_id, frame, str(self.part_path(chunk_id)), self.output_format, self.top_k))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=init_args) as pool:
+                pending = set()
+                for chunk_id, frame in chunks:
+                    # Lecture bornée: au plus max_pending blocs en mémoire
+                    if len(pending) >= self.max_pending:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record(future.result())
+                    pending.add(pool.submit(_score_chunk, chunk_id, frame, str(self.part_path(chunk_id)),
+                                            self.output_format, self.top_k))
+                for future in pending:
+                    record(future.result())
+
+        elapsed = time.perf_counter() - start
+        stats.update({
+            'seconds': elapsed,
+            'workers': self.workers,
+            'rows_per_second': stats['rows'] / elapsed if elapsed else 0.0,
+            'rows_per_second_per_core': stats['rows'] / elapsed / self.workers if elapsed else 0.0,
+            # Débit d'un worker pendant qu'il calcule (hors lecture et attente)
+            'worker_rows_per_second': stats['rows'] / stats['busy_seconds'] if stats['busy_seconds'] else 0.0,
+            'total_rows': sum(part['rows'] for part in completed.values()),
+            'parts': len(completed),
+            'output_dir': str(self.output_dir)
+        })
+        checkpoint['stats'] = stats
+        checkpoint['finished'] = True
+        self._save_checkpoint(checkpoint)
+        logger.info(f"Scoring terminé: {stats['rows']} lignes en {elapsed:.1f} s "
+                    f"({stats['rows_per_second']:,.0f} lignes/s, "
+                    f"{stats['rows_per_second_per_core']:,.0f} lignes/s par coeur, {self.workers} workers)")
+        return stats
+
+    def _signature(self, input_path: Path) -> Dict:
+        """Identifie l'entrée et le découpage (une reprise doit les retrouver à l'identique)"""
+        stat = input_path.stat()
+        return {
+            'input': str(input_path.resolve()),
+            'input_size': stat.st_size,
+            'input_mtime': stat.st_mtime,
+            'chunk_size': self.chunk_size,
+            'top_k': self.top_k,
+            'output_format': self.output_format,
+            'backend': self.backend,
+            'cascade': bool(self.cascade)
+        }
+
+    def _load_checkpoint(self, input_path: Path, resume: bool) -> Dict:
+        """Lit le fichier de reprise (ou en crée un nouveau)"""
+        signature = self._signature(input_path)
+        path = self.output_dir / CHECKPOINT_FILE
+        if resume and path.exists():
+            checkpoint = json.loads(path.read_text(encoding='utf-8'))
+            changed = [key for key, value in signature.items() if checkpoint.get(key) != value]
+            if changed:
+                raise ValueError(f"Reprise impossible, {', '.join(changed)} différent(s) du fichier de "
+                                 f"reprise {path}: relancer sans reprise")
+            checkpoint.pop('finished', None)
+            return checkpoint
+
+        # Nouveau départ: supprimer les sorties d'une exécution précédente
+        for part in self.output_dir.glob('part-*'):
+            part.unlink()
+        return dict(signature, completed={})
+
+    def _save_checkpoint(self, checkpoint: Dict):
+        """Écrit le fichier de reprise de façon atomique"""
+        path = self.output_dir / CHECKPOINT_FILE
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(json.dumps(checkpoint, indent=2), encoding='utf-8')
+        os.replace(tmp_path, path)
@@ -0,0 +1,145 @@
+"""
+Détection des entrées hors distribution (distance de Mahalanobis aux classes)
+
+Module sans dépendance lourde (NumPy seulement): utilisé aussi par le
+runtime minimal.
+"""
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Politiques appliquées aux lignes hors distribution
+OOD_POLICIES = ('flag', 'skip_explanation', 'downgrade')
+
+
+class MahalanobisDetector:
+    """
+    Détecteur vectorisé d'entrées hors distribution
+
+    La moyenne et la covariance de chaque classe sont précalculées sur les
+    données d'entraînement, sous forme d'une matrice de blanchiment ``W_c``
+    (inverse du facteur de Cholesky de la covariance). La distance d'une
+    ligne est sa distance de Mahalanobis à la classe la plus proche,
+    ``min_c ||W_c (x - mean_c)||``, en écarts-types: un batch est évalué en
+    un seul produit pour toutes les classes. Au-delà de ``max_distance``, la
+    ligne est hors distribution et traitée selon la politique:
+
+    - ``flag``: la ligne est seulement signalée
+    - ``skip_explanation``: pas d'explication LIME pour la ligne
+    - ``downgrade``: pas d'explication, et probabilités rapprochées de la
+      distribution uniforme (``shrinkage``), ce qui baisse la confiance sans
+      changer le classement des cultures
+    """
+
+    def __init__(self, means: np.ndarray, whitening: np.ndarray, max_distance: float = 5.0,
+                 policy: str = 'flag', shrinkage: float = 0.5):
+        """
+        Initialise le détecteur
+
+        Args:
+            means: Moyenne de chaque classe (n_classes, n_features)
+            whitening: Matrice de blanchiment de chaque classe
+                       (n_classes, n_features, n_features)
+            max_distance: Distance au-delà de laquelle une ligne est hors distribution
+            policy: 'flag', 'skip_explanation' ou 'downgrade'
+            shrinkage: Poids de la distribution uniforme (politique 'downgrade')
+        """
+        if policy not in OOD_POLICIES:
+            raise ValueError(f"Politique hors distribution inconnue: {policy} "
+                             f"(attendu: {', '.join(OOD_POLICIES)})")
+        if not 0 <= shrinkage <= 1:
+            raise ValueError(f"shrinkage doit être entre 0 et 1 (reçu {shrinkage})")
+        self.means = np.asarray(means, dtype=np.float64)
+        self.whitening = np.asarray(whitening, dtype=np.float64)
+        self.max_distance = float(max_distance)
+        self.policy = policy
+        self.shrinkage = float(shrinkage)
+
+    @classmethod
+    def fit(cls, X: np.ndarray, labels: np.ndarray, ridge: float = 1e-6, **kwargs) -> "MahalanobisDetector":
+        """
+        Précalcule les statistiques de chaque classe
+
+        Args:
+            X: Données d'entraînement (n_samples, n_features), dans l'espace
+               des entrées à évaluer
+            labels: Indice de classe de chaque ligne
+            ridge: Régularisation relative de la diagonale des covariances
+            **kwargs: max_distance, policy, shrinkage (voir __init__)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        labels = np.asarray(labels)
+        classes = np.unique(labels)
+        means = np.stack([X[labels == c].mean(axis=0) for c in classes])
+        covariances = np.stack([np.cov(X[labels == c], rowvar=False) for c in classes])
+        diagonal = np.einsum('cii->ci', covariances)
+        covariances += ridge * diagonal[:, :, None] * np.eye(X.shape[1])
+        whitening = np.linalg.inv(np.linalg.cholesky(covariances))
+        return cls(means, whitening, **kwargs)
+
+    @classmethod
+    def from_config(cls, config, X: np.ndarray, labels: np.ndarray) -> "MahalanobisDetector":
+        """
+        Construit le détecteur depuis la section ``inference.ood``
+
+        Args:
+            config: Instance de Config
+            X: Données d'entraînement (espace des entrées)
+            labels: Indice de classe de chaque ligne
+        """
+        return cls.fit(
+            X, labels,
+            max_distance=config.get('inference.ood.max_distance', 5.0),
+            policy=config.get('inference.ood.policy', 'flag'),
+            shrinkage=config.get('inference.ood.shrinkage', 0.5)
+        )
+
+    @property
+    def skip_explanation(self) -> bool:
+        """Les lignes hors distribution ne sont pas expliquées"""
+        return self.policy != 'flag'
+
+    def distance(self, X: np.ndarray) -> np.ndarray:
+        """
+        Distance de Mahalanobis de chaque ligne à la classe la plus proche
+
+        Args:
+            X: Entrées (n_samples, n_features)
+
+        Returns:
+            Distances (n_samples,)
+        """
+        diff = np.asarray(X, dtype=np.float64)[:, None, :] - self.means
+        whitened = np.einsum('ncf,cgf->ncg', diff, self.whitening)
+        return np.sqrt(np.einsum('ncg,ncg->nc', whitened, whitened).min(axis=1))
+
+    def detect(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distances et masque des lignes hors distribution
+
+        Args:
+            X: Entrées (n_samples, n_features)
+
+        Returns:
+            (distances (n_samples,), masque booléen)
+        """
+        distances = self.distance(X)
+        return distances, distances > self.max_distance
+
+    def downgrade(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        Probabilités des lignes hors distribution selon la politique
+
+        Args:
+            probabilities: Probabilités (n_samples, n_classes) des lignes hors distribution
+
+        Returns:
+            Nouveau tableau, mélangé avec la distribution uniforme si la
+            politique est 'downgrade' (inchangé sinon)
+        """
+        if self.policy != 'downgrade':
+            return probabilities
+        return (1 - self.shrinkage) * probabilities + self.shrinkage / probabilities.shape[1]
@@ -0,0 +1,135 @@
+"""
+Politique de parallélisme pour l'inférence
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pool partagé par tous les prédicteurs du processus
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def _reset_pool():
+    """Oublie le pool hérité du parent après un fork (ses threads n'existent plus)"""
+    global _pool, _pool_size, _pool_lock
+    _pool = None
+    _pool_size = 0
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+def available_cpus() -> int:
+    """Nombre de coeurs utilisables par le processus"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def shared_pool(max_threads: int) -> ThreadPoolExecutor:
+    """
+    Retourne le pool de threads partagé du processus
+
+    Le pool est créé à la première demande; sa taille est le plafond du
+    processus et n'est jamais augmentée ensuite.
+
+    Args:
+        max_threads: Taille du pool s'il doit être créé
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None:
+            _pool_size = max(1, max_threads)
+            _pool = ThreadPoolExecutor(max_workers=_pool_size, thread_name_prefix='inference')
+        return _pool
+
+
+class ParallelismPolicy:
+    """
+    Politique de parallélisme de l'inférence
+
+    Les petits batches (requêtes web, CLI) sont évalués sur le thread
+    appelant. Au-delà de ``min_parallel_batch`` lignes, le batch est découpé
+    en blocs de ``chunk_size`` lignes répartis sur le pool partagé, dont la
+    taille est plafonnée à ``coeurs / workers`` pour que les workers
+    gunicorn d'une même machine ne se disputent pas les coeurs.
+    """
+
+    def __init__(self, min_parallel_batch: int = 4096, chunk_size: int = 2048,
+                 max_threads: Optional[int] = None, workers: Optional[int] = None):
+        """
+        Initialise la politique
+
+        Args:
+            min_parallel_batch: Taille de batch à partir de laquelle le pool est utilisé
+            chunk_size: Nombre de lignes par bloc
+            max_threads: Nombre maximal de threads (None: selon les coeurs)
+            workers: Nombre de processus web sur la machine
+                     (None: variable WEB_CONCURRENCY, lue aussi par gunicorn)
+        """
+        if workers is None:
+            workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+        self.workers = max(1, workers)
+        self.cpus = available_cpus()
+
+        cap = max(1, self.cpus // self.workers)
+        self.threads = min(cap, max_threads) if max_threads else cap
+        self.min_parallel_batch = max(1, min_parallel_batch)
+        self.chunk_size = max(1, chunk_size)
+
+    @classmethod
+    def from_config(cls, config) -> "ParallelismPolicy":
+        """
+        Construit la politique depuis la section ``inference.parallelism``
+
+        Args:
+            config: Instance de Config
+        """
+        return cls(
+            min_parallel_batch=config.get('inference.parallelism.min_parallel_batch', 4096),
+            chunk_size=config.get('inference.parallelism.chunk_size', 2048),
+            max_threads=config.get('inference.parallelism.max_threads'),
+            workers=config.get('inference.parallelism.workers')
+        )
+
+    def describe(self) -> str:
+        """Résumé lisible de la politique (pour les logs)"""
+        return (f"{self.threads} thread(s) max (coeurs={self.cpus}, workers={self.workers}), "
+                f"mono-thread sous {self.min_parallel_batch} lignes, blocs de {self.chunk_size}")
+
+    def map_rows(self, fn: Callable[[np.ndarray], np.ndarray], X: np.ndarray) -> np.ndarray:
+        """
+        Applique ``fn`` à ``X`` par blocs de lignes selon la politique
+
+        Args:
+            fn: Fonction vectorisée (n_samples, ...) -> (n_samples, ...), ou
+                tuple de tels tableaux
+            X: Entrées
+
+        Returns:
+            Résultats concaténés dans l'ordre des lignes (tuple si ``fn``
+            retourne un tuple)
+        """
+        n_samples = len(X)
+        if n_samples <= self.chunk_size:
+            return fn(X)
+
+        chunks = [X[start:start + self.chunk_size] for start in range(0, n_samples, self.chunk_size)]
+        if self.threads == 1 or n_samples < self.min_parallel_batch:
+            results = [fn(chunk) for chunk in chunks]
+        else:
+            results = list(shared_pool(self.threads).map(fn, chunks))
+        if isinstance(results[0], tuple):
+            return tuple(np.concatenate(parts) for parts in zip(*results))
+        return np.concatenate(results)
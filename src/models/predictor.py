@@ -1,13 +1,26 @@
 """
 Système de prédiction pour les cultures
 """
-import joblib
 import numpy as np
 import pandas as pd
 from pathlib import Path
 import logging
-from typing import Dict, List, Union
-from lime.lime_tabular import LimeTabularExplainer
+import time
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union
+
+from .bundle import BundleError, file_sha256, load_bundle
+from .cache import PredictionCache
+from .dispatcher import BatchDispatcher
+from .forest import DISPERSION_FIELDS, CompiledForest, vote_dispersion
+from .naive_bayes import CompiledGaussianNB, confidence_gate
+from .neighbors import build_reference_index
+from .ood import MahalanobisDetector
+from .parallel import ParallelismPolicy
+from .results import (STAGE_CASCADE, STAGE_FOREST, PredictionResultSet, check_probability_format, format_row,
+                      low_certainty_mask, ood_field, uncertainty_fields)
+from ..data.schema import InputSchema
+from ..utils.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -15,42 +28,156 @@ logger = logging.getLogger(__name__)
 class CropPredictor:
     """Classe pour effectuer des prédictions de cultures"""
     
-    def __init__(self, model_path: str = "models/tuned/random_forest_best.pkl"):
+    BACKENDS = ('sklearn', 'compiled')
+    
+    # Étage ayant produit une prédiction (champ 'stage' des résultats)
+    STAGE_CASCADE = STAGE_CASCADE
+    STAGE_FOREST = STAGE_FOREST
+    
+    def __init__(self, model_path: str = "models/tuned/random_forest_best.pkl", backend: str = "sklearn",
+                 cache_size: int = 1024, cache_ttl: Optional[float] = None, config: Optional[Config] = None,
+                 cascade: Optional[bool] = None, batching: Optional[bool] = None):
         """
         Initialise le prédicteur
         
         Args:
             model_path: Chemin vers le modèle sauvegardé
+            backend: Moteur d'inférence ('sklearn' ou 'compiled' pour la
+                     forêt aplatie en NumPy, voir CompiledForest). La forêt
+                     compilée intègre la standardisation dans ses seuils et
+                     prend directement les features brutes.
+            cache_size: Nombre de résultats de predict() gardés en cache
+                        (0 pour désactiver). La clé combine la version du
+                        modèle et le vecteur de codes de bin (backend
+                        'compiled': exact) ou les features arrondies à
+                        ``inference.cache.decimals`` décimales (sklearn).
+            cache_ttl: Durée de vie d'un résultat en cache en secondes
+                       (None: ``inference.cache.ttl``)
+            config: Configuration (par défaut config/config.yaml), utilisée
+                    notamment pour la politique de parallélisme
+            cascade: Évaluer d'abord un Naive Bayes gaussien et n'envoyer à
+                     la forêt que les lignes dont il n'est pas sûr
+                     (None: ``inference.cascade.enabled``)
+            batching: Regrouper les appels concurrents de predict() en un
+                      seul predict_proba vectorisé (voir BatchDispatcher;
+                      None: ``inference.batching.enabled``)
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend inconnu: {backend} (attendu: {', '.join(self.BACKENDS)})")
+        
         self.model_path = Path(model_path)
+        self.backend = backend
         self.model = None
+        self.forest = None
+        # Modèle scikit-learn gardé pour predict_batch (inference.batch_backend)
+        self.batch_model = None
         self.scaler = None
         self.label_encoder = None
+        # Table des noms de classes (indice -> culture), remplie au chargement
+        self.class_names: List[str] = []
         self.feature_names = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
         self.lime_explainer = None
         self.training_data = None
+        self.training_labels = None
+        self.neighbors = None
+        self.model_version = None
+        self.is_warm = False
+        self.cache_size = cache_size
+        self.config = config if config is not None else Config()
+        self.parallelism = None
+        if cache_ttl is None:
+            cache_ttl = self.config.get('inference.cache.ttl', 3600)
+        self.cache_decimals = self.config.get('inference.cache.decimals', 4)
+        self.neighbors_k = self.config.get('inference.neighbors.k', 5)
+        self.batch_neighbors_k = self.config.get('inference.neighbors.batch_k', 0)
+        self.top_k = self.config.get('inference.top_k', 3)
+        self.batch_backend = self.config.get('inference.batch_backend') or backend
+        if self.batch_backend not in self.BACKENDS:
+            raise ValueError(f"Backend de batch inconnu: {self.batch_backend} "
+                             f"(attendu: {', '.join(self.BACKENDS)})")
+        # Validation des entrées (section validation), avant tout calcul
+        self.schema = InputSchema.from_config(self.config, self.feature_names)
+        self._cache = PredictionCache(cache_size, ttl=cache_ttl, copy=_copy_result)
+        
+        # Cascade Naive Bayes -> forêt
+        self.use_cascade = self.config.get('inference.cascade.enabled', False) if cascade is None else cascade
+        self.cascade = None
+        self.cascade_min_probability = self.config.get('inference.cascade.min_probability', 0.99)
+        self.cascade_min_margin = self.config.get('inference.cascade.min_margin', 0.0)
+        
+        # Évaluation anytime de la forêt compilée: arbres par blocs, arrêt
+        # des lignes dont la classe en tête est acquise
+        self.anytime = self.config.get('inference.anytime.enabled', False)
+        self.anytime_bound = self.config.get('inference.anytime.bound', 'exact')
+        self.anytime_block_size = self.config.get('inference.anytime.block_size', 10)
+        self.anytime_delta = self.config.get('inference.anytime.delta', 0.01)
+        self.anytime_min_rows = self.config.get('inference.anytime.min_rows', 32)
+        if self.anytime_bound not in CompiledForest.ANYTIME_BOUNDS:
+            raise ValueError(f"Borne anytime inconnue: {self.anytime_bound} "
+                             f"(attendu: {', '.join(CompiledForest.ANYTIME_BOUNDS)})")
+        
+        # Incertitude par dispersion des votes des arbres (forêt compilée):
+        # calculée sur les feuilles déjà parcourues, sans évaluation en plus
+        self.uncertainty = self.config.get('inference.uncertainty.enabled', True)
+        self.max_entropy = self.config.get('inference.uncertainty.max_entropy', 0.3)
+        self.min_vote_margin = self.config.get('inference.uncertainty.min_vote_margin', 0.6)
+        self.min_half_agreement = self.config.get('inference.uncertainty.min_half_agreement', 0.8)
+        self.batch_uncertainty = self.config.get('inference.uncertainty.batch', False)
+        
+        # Détection hors distribution (Mahalanobis aux classes d'entraînement),
+        # détecteur précalculé au chargement
+        self.ood_enabled = self.config.get('inference.ood.enabled', True)
+        self.batch_ood = self.config.get('inference.ood.batch', False)
+        self.ood = None
+        
+        # Micro-batching des requêtes unitaires concurrentes
+        self.dispatcher = None
+        if self.config.get('inference.batching.enabled', False) if batching is None else batching:
+            self.dispatcher = BatchDispatcher(
+                lambda X: self.predict_proba(X, return_stages=True, return_trees=True, return_uncertainty=True),
+                max_batch=self.config.get('inference.batching.max_batch', 64),
+                max_wait_ms=self.config.get('inference.batching.max_wait_ms', 2.0)
+            )
         
     def load_model(self):
         """Charge le modèle et les preprocesseurs"""
         try:
-            logger.info(f"Chargement du modèle depuis {self.model_path}")
-            self.model = joblib.load(self.model_path)
+            # Le parallélisme est géré par la politique, pas par joblib
+            # (le modèle a été entraîné avec n_jobs=-1)
+            self.parallelism = ParallelismPolicy.from_config(self.config)
+            logger.info(f"Politique de parallélisme: {self.parallelism.describe()}")
             
-            model_dir = self.model_path.parent.parent
-            self.scaler = joblib.load(model_dir / "scaler.pkl")
-            self.label_encoder = joblib.load(model_dir / "label_encoder.pkl")
+            self.cascade = None
+            self.batch_model = None
+            if not (self.backend == 'compiled' and self._load_bundle()):
+                self._load_pickles()
+            if self.forest is not None and self.batch_backend == 'sklearn' and self.batch_model is None:
+                self._load_batch_model()
+            if not self.use_cascade:
+                self.cascade = None
+            elif self.cascade is None:
+                self._load_cascade()
+            self.class_names = [str(name) for name in self.label_encoder.classes_]
+            if self.anytime and self.forest is None:
+                logger.warning("Évaluation anytime indisponible avec le backend sklearn: forêt complète")
+            if self.uncertainty and self.forest is None:
+                logger.warning("Dispersion des votes indisponible avec le backend sklearn: pas d'incertitude")
             
-            # Charger les données d'entraînement pour LIME
-            try:
-                self.training_data = np.load(model_dir / "X_train_scaled.npy")
-            except:
-                # Fallback: charger depuis data/
-                self.training_data = np.load("data/X_train_scaled.npy")
+            if self.config.get('inference.neighbors.enabled', True):
+                self.neighbors = build_reference_index(
+                    self.training_data, self.training_labels, self.scaler,
+                    self.class_names, self.feature_names
+                )
+            self.ood = None
+            if self.ood_enabled:
+                self._init_ood_detector()
             
-            # Initialiser LIME explainer
-            self._init_lime_explainer()
+            self.clear_cache()
+            # L'explainer LIME est construit à la première explication
+            self.lime_explainer = None
+            self.is_warm = False
             
-            logger.info("Modèle chargé avec succès")
+            logger.info(f"Modèle chargé avec succès (version {self.model_version})")
         except FileNotFoundError as e:
             logger.error(f"Fichier non trouvé: {e}")
             raise
@@ -58,19 +185,299 @@ class CropPredictor:
             logger.error(f"Erreur lors du chargement: {e}")
             raise
     
+    def _load_pickles(self):
+        """Charge le modèle scikit-learn, le scaler et le label encoder picklés"""
+        import joblib
+        
+        model_dir = self.model_path.parent.parent
+        self.scaler = joblib.load(model_dir / "scaler.pkl")
+        self.label_encoder = joblib.load(model_dir / "label_encoder.pkl")
+        
+        logger.info(f"Chargement du modèle depuis {self.model_path}")
+        self.model = joblib.load(self.model_path)
+        self.model.n_jobs = 1
+        self.model_version = file_sha256(self.model_path)[:12]
+        
+        if self.backend == 'compiled':
+            leaf_storage = self.config.get('inference.leaf_storage', 'auto')
+            self.forest = CompiledForest.from_sklearn(self.model, leaf_storage=leaf_storage).fold_scaler(
+                self.scaler.mean_, self.scaler.scale_
+            )
+            logger.info(f"Forêt compilée (espace brut): {self.forest.n_trees} arbres, "
+                        f"{self.forest.n_nodes} noeuds, feuilles en {self.forest.leaf_storage}, "
+                        f"{self.forest.nbytes / 1024:.0f} Ko")
+            # La forêt compilée remplace le modèle scikit-learn en mémoire
+            # (gardé seulement pour les batches si inference.batch_backend l'utilise)
+            if self.batch_backend == 'sklearn':
+                self.batch_model = self.model
+            self.model = None
+        
+        # Charger les données d'entraînement pour LIME
+        try:
+            self.training_data = np.load(model_dir / "X_train_scaled.npy")
+        except:
+            # Fallback: charger depuis data/
+            self.training_data = np.load("data/X_train_scaled.npy")
+        try:
+            self.training_labels = np.load(model_dir / "y_train.npy")
+        except FileNotFoundError:
+            self.training_labels = np.load("data/y_train.npy") if Path("data/y_train.npy").exists() else None
+    
+    def _load_bundle(self) -> bool:
+        """
+        Charge le bundle du modèle (inference.bundle_path)
+        
+        Le bundle remplace les trois pickles et les données LIME: il se
+        charge sans scikit-learn et ses tableaux sont projetés en mémoire en
+        lecture seule, partagés par tous les workers.
+        
+        Returns:
+            False si le bundle est absent, invalide ou exporté d'un autre modèle
+        """
+        bundle_path = self.config.get('inference.bundle_path')
+        if not bundle_path or not Path(bundle_path).exists():
+            return False
+        
+        try:
+            bundle = load_bundle(bundle_path, verify=self.config.get('inference.verify_bundle', True))
+        except BundleError as e:
+            logger.warning(f"Bundle ignoré: {e}")
+            return False
+        if self.model_path.exists() and file_sha256(self.model_path) != bundle.source_sha256:
+            logger.warning(f"Bundle {bundle_path} obsolète pour {self.model_path}, recompilation")
+            return False
+        
+        self.forest = bundle.forest
+        self.scaler = bundle.scaler
+        self.label_encoder = bundle.label_encoder
+        self.feature_names = list(bundle.feature_names)
+        self.training_data = bundle.training_data
+        self.training_labels = bundle.training_labels
+        self.model_version = bundle.model_version
+        self.cascade = bundle.cascade
+        logger.info(f"Bundle {bundle_path} chargé (mmap): {bundle.forest.n_trees} arbres, "
+                    f"{bundle.forest.nbytes / 1024:.0f} Ko")
+        return True
+    
+    def _load_batch_model(self):
+        """Charge le modèle scikit-learn de predict_batch à côté du bundle (inference.batch_backend)"""
+        import joblib
+        
+        if not self.model_path.exists():
+            logger.warning(f"Modèle {self.model_path} absent: batches évalués par la forêt compilée")
+            return
+        self.batch_model = joblib.load(self.model_path)
+        self.batch_model.n_jobs = 1
+        logger.info(f"Modèle scikit-learn chargé pour les batches depuis {self.model_path}")
+    
+    def _load_cascade(self):
+        """Charge le Naive Bayes picklé du premier étage (inference.cascade.model_path)"""
+        import joblib
+        
+        cascade_path = self.config.get('inference.cascade.model_path', "models/tuned/naive_bayes_best.pkl")
+        logger.info(f"Chargement du premier étage de la cascade depuis {cascade_path}")
+        self.cascade = CompiledGaussianNB.from_sklearn(joblib.load(cascade_path)).fold_scaler(
+            self.scaler.mean_, self.scaler.scale_
+        )
+        
+        classes = (self.forest if self.forest is not None else self.model).classes_
+        if not np.array_equal(self.cascade.classes_, classes):
+            raise ValueError("Les classes du Naive Bayes ne correspondent pas à celles de la forêt")
+    
+    def _init_ood_detector(self):
+        """Précalcule les moyennes et covariances par classe du détecteur hors distribution"""
+        if self.training_data is None or self.training_labels is None \
+                or len(self.training_data) != len(self.training_labels):
+            logger.warning("Données d'entraînement étiquetées absentes: pas de détection hors distribution")
+            return
+        raw_training = self.training_data * self.scaler.scale_ + self.scaler.mean_
+        self.ood = MahalanobisDetector.from_config(self.config, raw_training, self.training_labels)
+        logger.info(f"Détecteur hors distribution: {len(self.ood.means)} classes, "
+                    f"distance max {self.ood.max_distance}, politique {self.ood.policy}")
+    
     def _init_lime_explainer(self):
-        """Initialise l'explainer LIME"""
+        """Initialise l'explainer LIME (import de lime différé: ~2 s)"""
         if self.training_data is not None:
+            from lime.lime_tabular import LimeTabularExplainer
+            
             self.lime_explainer = LimeTabularExplainer(
                 training_data=self.training_data,
                 feature_names=self.feature_names,
-                class_names=list(self.label_encoder.classes_),
+                class_names=self.class_names,
                 mode='classification',
                 discretize_continuous=True
             )
             logger.info("LIME explainer initialisé")
     
-    def predict(self, features: Union[List, np.ndarray, pd.DataFrame]) -> Dict:
+    def warmup(self, n_samples: int = 32, explain: bool = True) -> Dict[str, float]:
+        """
+        Chauffe le prédicteur avec des requêtes synthétiques
+        
+        Parcourt une fois chaque chemin de code servi par l'application
+        (prédiction unitaire, batch, explication LIME) pour que la première
+        vraie requête n'en paie pas le coût. Les entrées sont des lignes des
+        données d'entraînement; le cache est vidé ensuite.
+        
+        Args:
+            n_samples: Nombre de lignes synthétiques pour le batch
+            explain: Construire l'explainer LIME et expliquer une ligne
+        
+        Returns:
+            Durée de chaque étape en secondes
+        """
+        if not self.is_loaded:
+            self.load_model()
+        
+        if self.training_data is not None and len(self.training_data):
+            samples = self.scaler.inverse_transform(self.training_data[:n_samples])
+        else:
+            samples = np.tile(np.asarray(self.scaler.mean_, dtype=np.float64), (n_samples, 1))
+        
+        timings = {}
+        start = time.perf_counter()
+        self.predict(samples[0].tolist())
+        timings['predict'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        self.predict_batch(pd.DataFrame(samples, columns=self.feature_names))
+        timings['predict_batch'] = time.perf_counter() - start
+        
+        if explain:
+            start = time.perf_counter()
+            self.explain_prediction(samples[0], num_features=len(self.feature_names))
+            timings['explain'] = time.perf_counter() - start
+        
+        self.clear_cache()
+        self.is_warm = True
+        logger.info("Prédicteur chauffé: " + ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in timings.items()))
+        return timings
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Indique si le modèle est chargé"""
+        return self.model is not None or self.forest is not None
+    
+    @property
+    def n_trees(self) -> int:
+        """Nombre d'arbres de la forêt"""
+        if self.forest is not None:
+            return self.forest.n_trees
+        return len(self.model.estimators_)
+    
+    def predict_proba(self, features: np.ndarray, return_stages: bool = False, return_trees: bool = False,
+                      return_uncertainty: bool = False, batch: bool = False):
+        """
+        Probabilités des classes à partir des features brutes
+        
+        En mode cascade, le Naive Bayes évalue toutes les lignes et seules
+        celles sous les seuils de confiance (``inference.cascade``) sont
+        réévaluées par la forêt.
+        
+        Args:
+            features: Array de shape (n_samples, n_features), non standardisé
+            return_stages: Retourner aussi le masque des lignes évaluées par
+                           la forêt
+            return_trees: Retourner aussi le nombre d'arbres évalués par
+                          ligne (0 si la cascade a répondu)
+            return_uncertainty: Retourner aussi la dispersion des votes
+                                (n_samples, 3), NaN si la cascade a répondu
+            batch: Évaluer la forêt avec le moteur des batches
+                   (inference.batch_backend)
+        
+        Returns:
+            Probabilités de shape (n_samples, n_classes), suivies du masque
+            (return_stages), du nombre d'arbres (return_trees) et de la
+            dispersion des votes (return_uncertainty)
+        """
+        if not self.is_loaded:
+            self.load_model()
+        
+        if self.cascade is None:
+            probabilities, trees, dispersion = self._forest_proba(features, return_uncertainty, batch)
+            escalated = np.ones(len(probabilities), dtype=bool)
+        else:
+            features = np.asarray(features, dtype=np.float64)
+            probabilities = self.parallelism.map_rows(self.cascade.predict_proba, features)
+            escalated = ~confidence_gate(probabilities, self.cascade_min_probability, self.cascade_min_margin)
+            trees = np.zeros(len(probabilities), dtype=np.intp)
+            dispersion = np.full((len(probabilities), len(DISPERSION_FIELDS)), np.nan)
+            if escalated.any():
+                (probabilities[escalated], trees[escalated],
+                 dispersion[escalated]) = self._forest_proba(features[escalated], return_uncertainty, batch)
+        
+        outputs = (probabilities,)
+        if return_stages:
+            outputs += (escalated,)
+        if return_trees:
+            outputs += (trees,)
+        if return_uncertainty:
+            outputs += (dispersion,)
+        return outputs if len(outputs) > 1 else probabilities
+    
+    def _forest_proba(self, features: np.ndarray, uncertainty: bool = True, batch: bool = False):
+        """Probabilités de la forêt (sans cascade), nombre d'arbres évalués et dispersion des votes par ligne"""
+        # Batches: modèle scikit-learn si inference.batch_backend le demande,
+        # sauf si la dispersion des votes ou l'anytime (forêt compilée) sont utilisés
+        model = self.model
+        if batch and self.batch_model is not None and not (uncertainty and self.uncertainty) and not self.anytime:
+            model = self.batch_model
+        if model is None:
+            return self.parallelism.map_rows(partial(self._forest_chunk, uncertainty=uncertainty), features)
+        scaled = self.scaler.transform(features)
+        if self.parallelism.threads == 1:
+            # scikit-learn parcourt déjà le batch entier arbre par arbre: des
+            # blocs n'ajouteraient que son coût fixe par appel
+            probabilities = model.predict_proba(scaled)
+        else:
+            probabilities = self.parallelism.map_rows(model.predict_proba, scaled)
+        return (probabilities, np.full(len(probabilities), self.n_trees, dtype=np.intp),
+                np.full((len(probabilities), len(DISPERSION_FIELDS)), np.nan))
+    
+    def _forest_chunk(self, features: np.ndarray, uncertainty: bool = True):
+        """Évaluation d'un bloc de lignes par la forêt compilée (anytime selon inference.anytime)"""
+        if self.anytime and len(features) >= self.anytime_min_rows:
+            probabilities, trees, votes = self.forest.predict_proba_anytime(
+                features, self.anytime_block_size, self.anytime_bound, self.anytime_delta, return_votes=True)
+        else:
+            probabilities, votes = self.forest.predict_proba(features, return_votes=True)
+            trees = np.full(len(features), self.forest.n_trees, dtype=np.intp)
+        return probabilities, trees, self._dispersion(votes, uncertainty)
+    
+    def _dispersion(self, votes: np.ndarray, uncertainty: bool = True) -> np.ndarray:
+        """Dispersion des votes (NaN si inference.uncertainty est désactivé ou non demandée)"""
+        if self.uncertainty and uncertainty:
+            return vote_dispersion(votes, len(self.forest.classes_))
+        return np.full((len(votes), len(DISPERSION_FIELDS)), np.nan)
+    
+    def low_certainty(self, dispersion: np.ndarray) -> np.ndarray:
+        """
+        Lignes dont la dispersion des votes dépasse un des seuils de
+        ``inference.uncertainty`` (entropie, marge de votes, accord des moitiés)
+        
+        Args:
+            dispersion: Dispersion des votes (n_samples, 3), voir vote_dispersion
+        
+        Returns:
+            Masque booléen (False pour les lignes sans votes)
+        """
+        return low_certainty_mask(dispersion, self.max_entropy, self.min_vote_margin, self.min_half_agreement)
+    
+    def detect_ood(self, features: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Détection hors distribution d'un batch (inference.ood)
+        
+        Args:
+            features: Array de shape (n_samples, n_features), non standardisé
+        
+        Returns:
+            (distance de Mahalanobis à la classe la plus proche, masque des
+            lignes hors distribution), None si la détection est désactivée
+        """
+        if self.ood is None:
+            return None
+        return self.parallelism.map_rows(self.ood.detect, features)
+    
+    def predict(self, features: Union[List, np.ndarray, pd.DataFrame], neighbors: Optional[int] = None) -> Dict:
         """
         Effectue une prédiction
         
@@ -78,89 +485,221 @@ class CropPredictor:
             features: Features pour la prédiction
                      Format: [N, P, K, temperature, humidity, ph, rainfall]
                      ou DataFrame avec les colonnes appropriées
+            neighbors: Nombre d'échantillons de référence les plus proches
+                       retournés dans 'neighbors' (None: inference.neighbors.k,
+                       0 pour désactiver)
         
         Returns:
             Dictionnaire avec la prédiction et les probabilités
         """
-        if self.model is None:
+        if not self.is_loaded:
             self.load_model()
         
-        # Convertir en array si nécessaire
-        if isinstance(features, list):
-            features = np.array(features).reshape(1, -1)
-        elif isinstance(features, pd.DataFrame):
-            features = features[self.feature_names].values
-        elif isinstance(features, np.ndarray) and features.ndim == 1:
-            features = features.reshape(1, -1)
-        
-        # Validation
-        if features.shape[1] != len(self.feature_names):
-            raise ValueError(f"Attendu {len(self.feature_names)} features, reçu {features.shape[1]}")
-        
-        # Standardisation
-        features_scaled = self.scaler.transform(features)
-        
-        # Prédiction
-        prediction = self.model.predict(features_scaled)
-        probabilities = self.model.predict_proba(features_scaled)
-        
-        # Résultats
-        crop = self.label_encoder.inverse_transform(prediction)[0]
-        confidence = float(probabilities.max())
-        
-        # Top 3 prédictions
-        top_3_indices = probabilities[0].argsort()[-3:][::-1]
-        top_3 = [
-            {
-                'crop': self.label_encoder.inverse_transform([idx])[0],
-                'probability': float(probabilities[0][idx])
-            }
-            for idx in top_3_indices
-        ]
-        
-        return {
-            'crop': crop,
-            'confidence': confidence,
-            'top_3': top_3,
-            'all_probabilities': {
-                self.label_encoder.inverse_transform([i])[0]: float(probabilities[0][i])
-                for i in range(len(probabilities[0]))
-            }
-        }
+        # Validation (valeurs manquantes, infinies, hors plage) avant tout calcul
+        checked = self.schema.validate(features)
+        checked.raise_for_row(0)
+        features = checked.values[:1]
+        
+        # Hors distribution: les entrées au-delà des seuils extrêmes ont les
+        # mêmes codes de bin que des entrées connues, la détection est donc
+        # faite hors du cache et les probabilités dégradées ne sont pas cachées
+        ood = self.detect_ood(features)
+        downgrade = ood is not None and bool(ood[1][0]) and self.ood.policy == 'downgrade'
+        
+        # Les requêtes unitaires passent par le cache (calcul unique pour les
+        # requêtes identiques concurrentes)
+        codes = self.forest.encode(features) if self.forest is not None else None
+        if self._cache.enabled and not downgrade:
+            key = self._cache_key(features, codes)
+            result = self._cache.get_or_compute(key, lambda: self._build_result(features, codes))
+        else:
+            result = self._build_result(features, codes, downgrade)
+        if ood is not None:
+            result['ood'] = ood_field(ood[0][0], ood[1][0])
+        
+        # Les voisins dépendent des features exactes: hors du cache
+        k = self.neighbors_k if neighbors is None else neighbors
+        if self.neighbors is not None and k > 0:
+            result['neighbors'] = self.neighbors.neighbors(features[:1], k)[0]
+        if checked.flagged[0]:
+            result['warnings'] = checked.issues(0)
+        return result
     
-    def predict_batch(self, features_df: pd.DataFrame) -> List[Dict]:
+    def _cache_key(self, features: np.ndarray, codes: Optional[np.ndarray]) -> tuple:
+        """Clé de cache d'une ligne: version du modèle + entrée normalisée"""
+        if codes is not None and self.cascade is None:
+            # Deux entrées de mêmes codes de bin ont exactement la même prédiction
+            return (self.model_version, codes.tobytes())
+        rounded = np.round(features[0].astype(np.float64), self.cache_decimals) + 0.0
+        if codes is not None:
+            # Cascade: la forêt reste exacte, le Naive Bayes est continu
+            return (self.model_version, codes.tobytes(), rounded.tobytes())
+        return (self.model_version, rounded.tobytes())
+    
+    def _build_result(self, features: np.ndarray, codes: Optional[np.ndarray], downgrade: bool = False) -> Dict:
+        """Calcule le résultat de predict() pour la première ligne (dégradé si hors distribution)"""
+        stage = self.STAGE_FOREST
+        probabilities = None
+        dispersion = None
+        n_trees = self.n_trees
+        if self.dispatcher is not None:
+            # Évaluée dans le batch des requêtes concurrentes
+            probabilities, escalated, trees, dispersion = self.dispatcher(features[:1])
+            n_trees = int(trees[0])
+            if not escalated[0]:
+                stage = self.STAGE_CASCADE
+        elif self.cascade is not None:
+            cascade_proba = self.cascade.predict_proba(features[:1])
+            if confidence_gate(cascade_proba, self.cascade_min_probability, self.cascade_min_margin)[0]:
+                probabilities, stage, n_trees = cascade_proba, self.STAGE_CASCADE, 0
+        
+        if probabilities is None:
+            # La standardisation est faite selon le backend
+            if codes is not None and not (self.anytime and self.anytime_min_rows <= 1):
+                probabilities, votes = self.forest.predict_proba_codes(codes[:1], return_votes=True)
+                dispersion = self._dispersion(votes)
+            else:
+                probabilities, trees, dispersion = self._forest_proba(features[:1])
+                n_trees = int(trees[0])
+        if downgrade:
+            probabilities = self.ood.downgrade(probabilities)
+        
+        uncertainty = None
+        if dispersion is not None:
+            uncertainty = uncertainty_fields(dispersion[0].tolist(), bool(self.low_certainty(dispersion)[0]))
+        # Table des classes et top-k sur la ligne (pas d'inverse_transform par classe)
+        return format_row(probabilities[0].tolist(), stage == self.STAGE_FOREST, self.class_names, self.top_k,
+                          n_trees_used=n_trees if self.anytime else None, uncertainty=uncertainty)
+    
+    def clear_cache(self):
+        """Vide le cache des prédictions"""
+        self._cache.clear()
+    
+    def batching_stats(self) -> Optional[Dict]:
+        """Tailles des batches et temps d'attente du micro-batching (None si désactivé)"""
+        return self.dispatcher.stats() if self.dispatcher is not None else None
+    
+    def cache_stats(self) -> Dict:
+        """Compteurs du cache (hits, misses, évictions...) pour la supervision"""
+        return self._cache.stats()
+    
+    def predict_batch(self, features_df: pd.DataFrame, top_k: Optional[int] = None,
+                      neighbors: Optional[int] = None, all_probabilities: str = 'full',
+                      uncertainty: Optional[bool] = None, ood: Optional[bool] = None) -> PredictionResultSet:
         """
-        Prédictions par batch
+        Prédictions par batch (entièrement vectorisées)
+        
+        Les lignes sont validées (voir InputSchema), standardisées et
+        évaluées en un seul appel à ``predict_proba``. Les lignes rejetées
+        sont écartées via un masque et reçoivent 'error' et 'errors' (détail
+        par feature); les lignes acceptées malgré des valeurs hors plage
+        reçoivent 'warnings'.
         
         Args:
             features_df: DataFrame avec plusieurs échantillons
+            top_k: Nombre de cultures retournées dans ``top_3`` (None: inference.top_k)
+            neighbors: Nombre d'échantillons de référence par ligne (None:
+                       inference.neighbors.batch_k, 0 par défaut)
+            all_probabilities: 'full', 'sparse' (probabilités non nulles) ou
+                               'none' (champ absent des dictionnaires)
+            uncertainty: Dispersion des votes par ligne (None:
+                         inference.uncertainty.batch, désactivée par défaut)
+            ood: Détection hors distribution par ligne (None:
+                 inference.ood.batch, désactivée par défaut)
             
         Returns:
-            Liste de dictionnaires avec les prédictions
+            PredictionResultSet: colonnes NumPy du batch; l'indexation et
+            l'itération retournent les dictionnaires de predict() (avec 'index')
         """
-        if self.model is None:
+        if not self.is_loaded:
             self.load_model()
         
-        results = []
-        for idx, row in features_df.iterrows():
-            try:
-                result = self.predict(row.values)
-                result['index'] = idx
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Erreur pour l'échantillon {idx}: {e}")
-                results.append({'index': idx, 'error': str(e)})
+        check_probability_format(all_probabilities)
+        top_k = self.top_k if top_k is None else top_k
+        index = features_df.index.tolist()
+        n_features = len(self.feature_names)
+        class_names = self.class_names
+        
+        if set(self.feature_names).issubset(features_df.columns):
+            features_df = features_df[self.feature_names]
+        elif features_df.shape[1] != n_features:
+            error = f"Attendu {n_features} features, reçu {features_df.shape[1]}"
+            logger.error(f"Erreur pour le batch: {error}")
+            issue = {'feature': None, 'code': 'shape', 'value': features_df.shape[1], 'message': error}
+            return PredictionResultSet(np.empty((0, len(class_names))), np.empty(0, dtype=bool), class_names,
+                                       top_k, index=index, valid=np.zeros(len(index), dtype=bool),
+                                       errors={pos: [issue] for pos in range(len(index))},
+                                       all_probabilities=all_probabilities)
+        
+        # Validation vectorisée: les lignes rejetées ne sont pas évaluées
+        checked = self.schema.validate(features_df)
+        values, valid = checked.values, checked.valid
+        
+        # Incertitude et hors distribution: opt-in, leur coût par ligne
+        # s'ajoute à celui de la forêt
+        uncertainty = self.uncertainty and (self.batch_uncertainty if uncertainty is None else uncertainty)
+        detect = self.ood is not None and (self.batch_ood if ood is None else ood)
         
-        return results
+        probabilities = np.empty((0, len(class_names)))
+        escalated = np.empty(0, dtype=bool)
+        trees = np.empty(0, dtype=np.intp)
+        dispersion = np.empty((0, len(DISPERSION_FIELDS)))
+        ood_distance, ood = (np.empty(0), np.empty(0, dtype=bool)) if detect else (None, None)
+        row_neighbors = None
+        if valid.any():
+            outputs = self.predict_proba(values[valid], return_stages=True, return_trees=True,
+                                         return_uncertainty=uncertainty, batch=True)
+            probabilities, escalated, trees = outputs[:3]
+            if uncertainty:
+                dispersion = outputs[3]
+            if detect:
+                ood_distance, ood = self.detect_ood(values[valid])
+                if ood.any():
+                    probabilities[ood] = self.ood.downgrade(probabilities[ood])
+            k = self.batch_neighbors_k if neighbors is None else neighbors
+            if self.neighbors is not None and k > 0:
+                row_neighbors = self.neighbors.neighbors(values[valid], k)
+        
+        rejected = np.flatnonzero(~valid).tolist()
+        if rejected:
+            logger.warning(f"{len(rejected)} échantillon(s) rejeté(s) par la validation sur {len(index)}")
+        
+        return PredictionResultSet(
+            probabilities, escalated, class_names, top_k, index=index, valid=valid,
+            errors={pos: checked.issues(pos) for pos in rejected},
+            warnings={pos: checked.issues(pos) for pos in np.flatnonzero(checked.flagged).tolist()},
+            neighbors=row_neighbors, all_probabilities=all_probabilities,
+            n_trees_used=trees if self.anytime else None,
+            uncertainty=dispersion if uncertainty else None,
+            low_certainty=self.low_certainty(dispersion) if uncertainty else None,
+            ood_distance=ood_distance, ood=ood
+        )
+    
+    def add_reference_samples(self, features: np.ndarray, crops: List[str], source: str = 'history') -> int:
+        """
+        Ajoute des échantillons (ex: historique des prédictions) à l'index des voisins
+        
+        Args:
+            features: Features brutes (n_samples, n_features)
+            crops: Culture de chaque échantillon
+            source: Origine retournée avec les voisins
+        
+        Returns:
+            Nombre d'échantillons ajoutés
+        """
+        if self.neighbors is None:
+            return 0
+        return self.neighbors.add(features, crops, source=source)
     
     def get_feature_importance(self) -> Dict:
         """Retourne l'importance des features si disponible"""
-        if self.model is None:
+        if not self.is_loaded:
             self.load_model()
         
-        # Random Forest a feature_importances_
-        if hasattr(self.model, 'feature_importances_'):
-            importances = self.model.feature_importances_
+        # Random Forest a feature_importances_ (conservé par la forêt compilée)
+        estimator = self.forest if self.forest is not None else self.model
+        if getattr(estimator, 'feature_importances_', None) is not None:
+            importances = estimator.feature_importances_
             return {
                 name: float(imp) 
                 for name, imp in zip(self.feature_names, importances)
@@ -178,23 +717,40 @@ class CropPredictor:
         Returns:
             Dictionnaire avec l'explication LIME
         """
-        if self.model is None:
+        # Entrée rejetée: pas de perturbations LIME
+        checked = self.schema.validate(features)
+        if not checked.valid[0]:
+            issues = checked.issues(0)
+            return {'error': "; ".join(issue['message'] for issue in issues), 'errors': issues}
+        features = checked.values[0]
+        
+        if not self.is_loaded:
             self.load_model()
         
+        # Entrée hors distribution: l'explication locale n'aurait pas de sens
+        # et coûterait les perturbations LIME
+        if self.ood is not None and self.ood.skip_explanation:
+            distance, flagged = self.ood.detect(features[None, :])
+            if flagged[0]:
+                logger.info(f"Explication LIME ignorée: entrée hors distribution (distance {distance[0]:.1f})")
+                return {'error': f"Entrée hors distribution (distance {distance[0]:.1f} > "
+                                 f"{self.ood.max_distance:g}): explication non calculée",
+                        'ood': ood_field(distance[0], True)}
+        
+        if self.lime_explainer is None:
+            self._init_lime_explainer()
         if self.lime_explainer is None:
             logger.warning("LIME explainer non disponible")
             return {'error': 'Explainer not available'}
         
-        # Convertir en array si nécessaire
-        if isinstance(features, list):
-            features = np.array(features)
-        
         # Standardiser les features
         features_scaled = self.scaler.transform(features.reshape(1, -1))[0]
         
         # Fonction de prédiction pour LIME (sur données scalées)
         def predict_fn(X):
-            return self.model.predict_proba(X)
+            if self.forest is not None:
+                return self.parallelism.map_rows(self.forest.predict_proba, self.scaler.inverse_transform(X))
+            return self.parallelism.map_rows(self.model.predict_proba, X)
         
         try:
             # Générer l'explication
@@ -205,8 +761,8 @@ class CropPredictor:
                 top_labels=1
             )
             
-            # Récupérer la classe prédite
-            predicted_label = self.model.predict(features_scaled.reshape(1, -1))[0]
+            # Classe prédite par le modèle expliqué (la forêt, sans la cascade)
+            predicted_label = int(predict_fn(features_scaled.reshape(1, -1))[0].argmax())
             
             # Extraire les contributions des features
             exp_list = explanation.as_list(label=predicted_label)
@@ -233,10 +789,20 @@ class CropPredictor:
             
             return {
                 'contributions': feature_contributions,
-                'predicted_class': self.label_encoder.inverse_transform([predicted_label])[0],
+                'predicted_class': self.class_names[predicted_label],
                 'intercept': float(explanation.intercept[predicted_label]) if hasattr(explanation, 'intercept') else 0
             }
         
         except Exception as e:
             logger.error(f"Erreur lors de l'explication LIME: {e}")
             return {'error': str(e)}
+
+
+def _copy_result(result: Dict) -> Dict:
+    """Copie un résultat de prédiction (les appelants peuvent le modifier)"""
+    copied = dict(result)
+    copied['top_3'] = [dict(item) for item in result['top_3']]
+    copied['all_probabilities'] = dict(result['all_probabilities'])
+    if 'uncertainty' in result:
+        copied['uncertainty'] = dict(result['uncertainty'])
+    return copied
@@ -0,0 +1,344 @@
+"""
+Registre de modèles: routage du trafic et évaluation en ombre (shadow)
+"""
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .metrics import LatencyStats
+from .predictor import CropPredictor
+from .results import PredictionResultSet
+from ..utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Registre des modèles servis par l'application
+
+    Chaque modèle est un ``CropPredictor`` nommé et versionné. Le trafic est
+    routé vers un modèle selon des pourcentages (``registry.routing``);
+    les modèles en ombre (``registry.shadow``) évaluent les mêmes requêtes
+    sur un thread d'arrière-plan, hors du chemin de la requête, et leur
+    accord avec le modèle qui a répondu est comptabilisé.
+    """
+
+    def __init__(self, shadow_queue_size: int = 1000, latency_window: int = 1024):
+        """
+        Initialise un registre vide
+
+        Args:
+            shadow_queue_size: Requêtes en attente d'évaluation en ombre
+                               (au-delà, elles sont ignorées et comptées)
+            latency_window: Nombre de latences récentes gardées par modèle
+        """
+        self.models: Dict[str, CropPredictor] = {}
+        self.versions: Dict[str, Optional[str]] = {}
+        self.default: Optional[str] = None
+        self.split: Dict[str, float] = {}
+        self.shadows: List[str] = []
+        self.latency_window = latency_window
+
+        self._latency: Dict[str, LatencyStats] = {}
+        self._agreement: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self._shadow_queue = queue.Queue(maxsize=shadow_queue_size)
+        self._shadow_dropped = 0
+        self._worker = None
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None,
+                    predictor_factory: Callable[..., CropPredictor] = CropPredictor) -> "ModelRegistry":
+        """
+        Construit le registre depuis la section ``registry`` de la configuration
+
+        Sans section ``registry``, le registre contient un seul modèle
+        (``model.path``, backend compilé).
+
+        Args:
+            config: Instance de Config (par défaut config/config.yaml)
+            predictor_factory: Constructeur des prédicteurs
+
+        Returns:
+            Registre (modèles non chargés, voir ``load_all``)
+        """
+        config = config if config is not None else Config()
+        registry = cls(shadow_queue_size=config.get('registry.shadow_queue_size', 1000),
+                       latency_window=config.get('registry.latency_window', 1024))
+
+        entries = config.get('registry.models') or {
+            'random_forest': {'model_path': config.get('model.path', "models/tuned/random_forest_best.pkl"),
+                              'backend': 'compiled'}
+        }
+        for name, entry in entries.items():
+            entry = dict(entry or {})
+            version = entry.pop('version', None)
+            min_probability = entry.pop('cascade_min_probability', None)
+            predictor = predictor_factory(config=config, **entry)
+            if min_probability is not None:
+                predictor.cascade_min_probability = min_probability
+            registry.register(name, predictor, version=version)
+
+        registry.configure_routing(
+            default=config.get('registry.routing.default'),
+            split=config.get('registry.routing.split'),
+            shadows=config.get('registry.shadow')
+        )
+        return registry
+
+    def register(self, name: str, predictor: CropPredictor, version: Optional[str] = None):
+        """
+        Ajoute un modèle au registre
+
+        Args:
+            name: Nom du modèle
+            predictor: Prédicteur (chargé ou non)
+            version: Version affichée (par défaut celle du modèle chargé)
+        """
+        self.models[name] = predictor
+        self.versions[name] = version
+        self._latency[name] = LatencyStats(self.latency_window)
+        if self.default is None:
+            self.default = name
+
+    def configure_routing(self, default: Optional[str] = None, split: Optional[Dict[str, float]] = None,
+                          shadows: Optional[List[str]] = None):
+        """
+        Configure le routage du trafic
+
+        Args:
+            default: Modèle servant les requêtes hors pourcentages
+            split: Pourcentage du trafic par modèle (total <= 100)
+            shadows: Modèles évalués en ombre
+        """
+        split = dict(split or {})
+        shadows = list(shadows or [])
+        for name in [default, *split, *shadows]:
+            if name is not None and name not in self.models:
+                raise ValueError(f"Modèle inconnu dans le registre: {name}")
+        if sum(split.values()) > 100:
+            raise ValueError("La somme des pourcentages de routage dépasse 100")
+
+        if default is not None:
+            self.default = default
+        self.split = split
+        self.shadows = shadows
+        with self._stats_lock:
+            for shadow in shadows:
+                self._agreement.setdefault(shadow, {'compared': 0, 'agreed': 0})
+
+    def get(self, name: Optional[str] = None) -> CropPredictor:
+        """Prédicteur d'un modèle (par défaut le modèle par défaut)"""
+        return self.models[name or self.default]
+
+    def version(self, name: str) -> Optional[str]:
+        """Version d'un modèle (configurée ou celle du modèle chargé)"""
+        return self.versions[name] or self.models[name].model_version
+
+    def load_all(self):
+        """Charge tous les modèles du registre"""
+        for name, predictor in self.models.items():
+            if not predictor.is_loaded:
+                predictor.load_model()
+            logger.info(f"Modèle {name} chargé (version {self.version(name)})")
+
+    def route(self, key=None) -> str:
+        """
+        Choisit le modèle qui répond à une requête
+
+        Args:
+            key: Clé de routage stable (ex: identifiant utilisateur): une
+                 même clé est toujours routée vers le même modèle. None:
+                 tirage aléatoire.
+
+        Returns:
+            Nom du modèle
+        """
+        if not self.split:
+            return self.default
+        if key is None:
+            bucket = random.random() * 100
+        else:
+            bucket = zlib.crc32(str(key).encode('utf-8')) % 10000 / 100
+        cumulative = 0.0
+        for name, percent in self.split.items():
+            cumulative += percent
+            if bucket < cumulative:
+                return name
+        return self.default
+
+    def predict(self, features, key=None, model: Optional[str] = None, neighbors: Optional[int] = None) -> Dict:
+        """
+        Prédiction par le modèle routé, puis évaluation en ombre asynchrone
+
+        Args:
+            features: Features (voir CropPredictor.predict)
+            key: Clé de routage (voir ``route``)
+            model: Forcer un modèle (ignore le routage)
+            neighbors: Nombre d'échantillons de référence (voir CropPredictor.predict)
+
+        Returns:
+            Résultat de CropPredictor.predict avec les champs 'model' et
+            'model_version'
+        """
+        name = model or self.route(key)
+        result = self._timed_predict(name, features, neighbors=neighbors)
+        result['model'] = name
+        result['model_version'] = self.version(name)
+
+        shadows = [shadow for shadow in self.shadows if shadow != name]
+        if shadows:
+            self._submit_shadow(shadows, features, name, result['crop'])
+        return result
+
+    def predict_proba(self, features: np.ndarray, key=None,
+                      model: Optional[str] = None) -> Tuple[str, np.ndarray, np.ndarray]:
+        """
+        Probabilités d'un batch par le modèle routé (sans évaluation en ombre)
+
+        Args:
+            features: Features brutes (n_samples, n_features)
+            key: Clé de routage (voir ``route``)
+            model: Forcer un modèle (ignore le routage)
+
+        Returns:
+            (nom du modèle, probabilités, masque des lignes évaluées par la forêt)
+        """
+        name = model or self.route(key)
+        stats = self._latency[name]
+        start = time.perf_counter()
+        try:
+            probabilities, escalated = self.models[name].predict_proba(features, return_stages=True)
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record(time.perf_counter() - start)
+        return name, probabilities, escalated
+
+    def predict_batch(self, features: np.ndarray, key=None, model: Optional[str] = None,
+                      neighbors: Optional[int] = None) -> Tuple[str, PredictionResultSet]:
+        """
+        Prédictions d'un batch par le modèle routé (sans évaluation en ombre)
+
+        Mêmes validation, détection hors distribution et incertitude que
+        ``CropPredictor.predict_batch``: les lignes rejetées y sont marquées
+        au lieu de faire échouer le batch.
+
+        Args:
+            features: Features brutes (n_samples, n_features)
+            key: Clé de routage (voir ``route``)
+            model: Forcer un modèle (ignore le routage)
+            neighbors: Nombre d'échantillons de référence par ligne
+
+        Returns:
+            (nom du modèle, résultats du batch)
+        """
+        name = model or self.route(key)
+        predictor = self.models[name]
+        features = np.asarray(features)
+        columns = predictor.feature_names if features.shape[1] == len(predictor.feature_names) else None
+        stats = self._latency[name]
+        start = time.perf_counter()
+        try:
+            results = predictor.predict_batch(pd.DataFrame(features, columns=columns), neighbors=neighbors)
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record(time.perf_counter() - start)
+        return name, results
+
+    def _timed_predict(self, name: str, features, neighbors: Optional[int] = 0) -> Dict:
+        """Prédiction avec mesure de la latence (sans voisins par défaut: ombre)"""
+        stats = self._latency[name]
+        start = time.perf_counter()
+        try:
+            result = self.models[name].predict(features, neighbors=neighbors)
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record(time.perf_counter() - start)
+        return result
+
+    def _submit_shadow(self, shadows: List[str], features, primary: str, crop):
+        """Met une requête en file pour les modèles en ombre (sans bloquer)"""
+        self._ensure_worker()
+        try:
+            self._shadow_queue.put_nowait((shadows, features, primary, crop))
+        except queue.Full:
+            with self._stats_lock:
+                self._shadow_dropped += 1
+
+    def _ensure_worker(self):
+        """Démarre le thread d'ombre (une fois par processus, y compris après fork)"""
+        pid = os.getpid()
+        if self._worker_pid == pid:
+            return
+        with self._worker_lock:
+            if self._worker_pid == pid:
+                return
+            if self._worker_pid is not None:
+                # Processus fils: la file héritée peut contenir un verrou pris
+                self._shadow_queue = queue.Queue(maxsize=self._shadow_queue.maxsize)
+            self._worker = threading.Thread(target=self._shadow_loop, name='shadow-scoring', daemon=True)
+            self._worker.start()
+            self._worker_pid = pid
+
+    def _shadow_loop(self):
+        """Évalue les requêtes en ombre et compare avec le modèle qui a répondu"""
+        shadow_queue = self._shadow_queue
+        while True:
+            shadows, features, primary, crop = shadow_queue.get()
+            try:
+                for shadow in shadows:
+                    try:
+                        result = self._timed_predict(shadow, features)
+                    except Exception as e:
+                        logger.error(f"Erreur du modèle en ombre {shadow}: {e}")
+                        continue
+                    with self._stats_lock:
+                        agreement = self._agreement.setdefault(shadow, {'compared': 0, 'agreed': 0})
+                        agreement['compared'] += 1
+                        agreement['agreed'] += int(result['crop'] == crop)
+            finally:
+                shadow_queue.task_done()
+
+    def flush(self):
+        """Attend la fin des évaluations en ombre en attente"""
+        if self._worker_pid == os.getpid():
+            self._shadow_queue.join()
+
+    def stats(self) -> Dict:
+        """Latences, accords et routage de chaque modèle (supervision)"""
+        models = {}
+        for name in self.models:
+            models[name] = {
+                'version': self.version(name),
+                'role': 'default' if name == self.default else ('shadow' if name in self.shadows else 'routed'),
+                'traffic_percent': self.split.get(name),
+                'latency': self._latency[name].summary(),
+                'batching': self.models[name].batching_stats()
+            }
+        with self._stats_lock:
+            for shadow, agreement in self._agreement.items():
+                compared = agreement['compared']
+                models[shadow]['agreement'] = dict(
+                    agreement, rate=agreement['agreed'] / compared if compared else None
+                )
+            dropped = self._shadow_dropped
+        return {
+            'default': self.default,
+            'models': models,
+            'shadow_queue': self._shadow_queue.qsize(),
+            'shadow_dropped': dropped
+        }
@@ -0,0 +1,469 @@
+"""
+Mise en forme des résultats de prédiction
+
+Module sans dépendance lourde (NumPy seulement): utilisé par le client du
+serveur d'inférence, qui n'importe ni pandas ni scikit-learn.
+"""
+import json
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .forest import DISPERSION_FIELDS
+
+# Étage ayant produit une prédiction (champ 'stage' des résultats)
+STAGE_CASCADE = 'naive_bayes'
+STAGE_FOREST = 'random_forest'
+
+# Forme du champ 'all_probabilities': toutes les classes, classes de
+# probabilité non nulle seulement, ou champ absent
+PROBABILITY_FORMATS = ('full', 'sparse', 'none')
+
+
+def check_probability_format(fmt: str) -> str:
+    """Vérifie une forme du champ 'all_probabilities' (ValueError si inconnue)"""
+    if fmt not in PROBABILITY_FORMATS:
+        raise ValueError(f"Forme de all_probabilities inconnue: {fmt} (attendu: {', '.join(PROBABILITY_FORMATS)})")
+    return fmt
+
+
+def uncertainty_fields(dispersion: Sequence[float], low_certainty: bool) -> Optional[Dict]:
+    """
+    Champ 'uncertainty' d'un résultat à partir de la dispersion des votes
+
+    Args:
+        dispersion: Ligne de ``vote_dispersion`` (entropy, vote_margin, half_agreement)
+        low_certainty: La ligne dépasse un des seuils d'incertitude
+
+    Returns:
+        Dictionnaire (NaN remplacés par None), ou None si la ligne n'a pas
+        de votes (cascade, backend sklearn)
+    """
+    if dispersion[0] != dispersion[0]:
+        return None
+    fields = {name: (None if value != value else value) for name, value in zip(DISPERSION_FIELDS, dispersion)}
+    fields['low_certainty'] = low_certainty
+    return fields
+
+
+def ood_field(distance: float, flagged: bool) -> Dict:
+    """Champ 'ood' d'un résultat (distance arrondie: stable pour des entrées quasi identiques)"""
+    return {'distance': round(float(distance), 3), 'flagged': bool(flagged)}
+
+
+def low_certainty_mask(dispersion: np.ndarray, max_entropy: float = 0.3, min_vote_margin: float = 0.6,
+                       min_half_agreement: float = 0.8) -> np.ndarray:
+    """
+    Lignes dont la dispersion des votes dépasse un des seuils
+
+    Args:
+        dispersion: Dispersion des votes (n_samples, 3), voir vote_dispersion
+        max_entropy: Entropie normalisée maximale
+        min_vote_margin: Écart minimal entre les parts de voix des deux premières classes
+        min_half_agreement: Accord minimal entre les deux moitiés de la forêt
+
+    Returns:
+        Masque booléen (False pour les lignes sans votes)
+    """
+    entropy, margin, agreement = np.asarray(dispersion, dtype=np.float64).reshape(-1, 3).T
+    return (entropy > max_entropy) | (margin < min_vote_margin) | (agreement < min_half_agreement)
+
+
+def top_k_indices(probabilities: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices des k classes les plus probables de chaque ligne, par probabilité décroissante
+
+    Sélection par partition (linéaire) puis tri des k candidats seulement;
+    à probabilité égale, la classe d'indice le plus petit d'abord.
+
+    Args:
+        probabilities: Probabilités (n_samples, n_classes)
+        k: Nombre de classes (borné à n_classes)
+
+    Returns:
+        Array (n_samples, k)
+    """
+    n_samples, n_classes = probabilities.shape
+    k = max(1, min(k, n_classes))
+    if k < n_classes:
+        # Seuil: k-ième plus grande probabilité de chaque ligne; les ex æquo
+        # au seuil sont départagés par indice de classe
+        threshold = -np.partition(-probabilities, k - 1, axis=1)[:, k - 1:k]
+        above = probabilities > threshold
+        tied = probabilities == threshold
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= k - above.sum(axis=1, keepdims=True)))
+        candidates = np.nonzero(selected)[1].reshape(n_samples, k)
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), probabilities.shape)
+    order = np.argsort(-np.take_along_axis(probabilities, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def format_row(probabilities: Sequence[float], escalated: bool, class_names: Sequence[str], top_k: int = 3,
+               all_probabilities: str = 'full', top: Optional[List[int]] = None,
+               n_trees_used: Optional[int] = None, uncertainty: Optional[Dict] = None,
+               ood: Optional[Dict] = None) -> Dict:
+    """
+    Résultat d'une ligne au format de predict() (sans passer par NumPy)
+
+    Args:
+        probabilities: Probabilités de la ligne (liste Python)
+        escalated: Ligne évaluée par la forêt (sinon par la cascade)
+        class_names: Table des noms de classes
+        top_k: Nombre de cultures retournées dans ``top_3``
+        all_probabilities: 'full', 'sparse' ou 'none'
+        top: Indices des meilleures classes déjà calculés (voir top_k_indices)
+        n_trees_used: Nombre d'arbres évalués (évaluation anytime; None: champ absent)
+        uncertainty: Dispersion des votes (voir uncertainty_fields; None: champ absent)
+        ood: Détection hors distribution (distance, flagged; None: champ absent)
+
+    Returns:
+        Dictionnaire (crop, confidence, top_3, all_probabilities, stage)
+    """
+    if top is None:
+        # Tri stable: mêmes ex æquo que top_k_indices
+        top = sorted(range(len(probabilities)), key=lambda idx: -probabilities[idx])[:max(1, top_k)]
+    row = {
+        'crop': class_names[top[0]],
+        'confidence': probabilities[top[0]],
+        'top_3': [{'crop': class_names[idx], 'probability': probabilities[idx]} for idx in top]
+    }
+    if all_probabilities == 'full':
+        row['all_probabilities'] = dict(zip(class_names, probabilities))
+    elif all_probabilities == 'sparse':
+        row['all_probabilities'] = {name: p for name, p in zip(class_names, probabilities) if p > 0}
+    row['stage'] = STAGE_FOREST if escalated else STAGE_CASCADE
+    if n_trees_used is not None:
+        row['n_trees_used'] = n_trees_used
+    if uncertainty is not None:
+        row['uncertainty'] = uncertainty
+    if ood is not None:
+        row['ood'] = ood
+    return row
+
+
+def shape_probabilities(result: Dict, fmt: str) -> Dict:
+    """
+    Applique une forme au champ 'all_probabilities' d'un résultat (modifié en place)
+
+    Args:
+        result: Résultat de prédiction
+        fmt: 'full', 'sparse' (probabilités non nulles) ou 'none' (champ retiré)
+
+    Returns:
+        Le résultat
+    """
+    if fmt == 'none':
+        result.pop('all_probabilities', None)
+    elif fmt == 'sparse' and 'all_probabilities' in result:
+        result['all_probabilities'] = {name: p for name, p in result['all_probabilities'].items() if p > 0}
+    return result
+
+
+class PredictionResultSet:
+    """
+    Résultats d'un batch en colonnes NumPy
+
+    Les colonnes (classe prédite, confiance, top-k, matrice des probabilités,
+    étage) couvrent toutes les lignes du batch; les lignes rejetées par la
+    validation ont la classe -1 et des probabilités NaN. Les dictionnaires
+    du format historique (voir ``format_predictions``) ne sont construits
+    qu'à l'indexation ou à l'itération: chaque accès retourne un nouveau
+    dictionnaire, les modifier ne modifie pas le batch.
+    """
+
+    __slots__ = ('class_names', 'index', 'valid', 'class_index', 'confidence', 'top_indices',
+                 'top_probabilities', 'probabilities', 'escalated', 'errors', 'warnings', 'neighbors',
+                 'probability_format', 'n_trees_used', 'uncertainty', 'low_certainty',
+                 'ood_distance', 'ood')
+
+    def __init__(self, probabilities: np.ndarray, escalated: np.ndarray, class_names: Sequence[str],
+                 top_k: int = 3, index: Optional[Sequence] = None, valid: Optional[np.ndarray] = None,
+                 errors: Optional[Dict[int, List[Dict]]] = None, warnings: Optional[Dict[int, List[Dict]]] = None,
+                 neighbors: Optional[List] = None, all_probabilities: str = 'full',
+                 n_trees_used: Optional[np.ndarray] = None, uncertainty: Optional[np.ndarray] = None,
+                 low_certainty: Optional[np.ndarray] = None, ood_distance: Optional[np.ndarray] = None,
+                 ood: Optional[np.ndarray] = None):
+        """
+        Initialise le batch
+
+        Args:
+            probabilities: Probabilités des lignes acceptées (n_valid, n_classes)
+            escalated: Lignes acceptées évaluées par la forêt (sinon par la cascade)
+            class_names: Nom de chaque classe
+            top_k: Nombre de cultures retournées dans ``top_3``
+            index: Étiquette de chaque ligne du batch (champ 'index'; None: pas d'index)
+            valid: Masque des lignes acceptées (None: toutes)
+            errors: Détail des erreurs des lignes rejetées, par position
+            warnings: Détail des valeurs hors plage des lignes acceptées, par position
+            neighbors: Voisins de chaque ligne acceptée (None: pas de voisins)
+            all_probabilities: Forme du champ 'all_probabilities' des
+                               dictionnaires ('full', 'sparse' ou 'none')
+            n_trees_used: Nombre d'arbres évalués par ligne acceptée
+                          (évaluation anytime; None: pas de colonne)
+            uncertainty: Dispersion des votes par ligne acceptée
+                         (n_valid, 3), NaN sans votes (None: pas de colonne)
+            low_certainty: Lignes acceptées dépassant un seuil d'incertitude
+            ood_distance: Distance de Mahalanobis de chaque ligne acceptée à
+                          la classe la plus proche (None: pas de colonne)
+            ood: Lignes acceptées hors distribution
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        escalated = np.asarray(escalated, dtype=bool)
+        n_valid, n_classes = probabilities.shape
+        top_k = max(1, min(top_k, n_classes))
+
+        if valid is not None and not valid.all():
+            # Colonnes pleine longueur: les lignes rejetées restent vides
+            full = np.full((len(valid), n_classes), np.nan)
+            full[valid] = probabilities
+            probabilities = full
+            full_escalated = np.zeros(len(valid), dtype=bool)
+            full_escalated[valid] = escalated
+            escalated = full_escalated
+            if n_trees_used is not None:
+                full_trees = np.zeros(len(valid), dtype=np.intp)
+                full_trees[valid] = n_trees_used
+                n_trees_used = full_trees
+            if uncertainty is not None:
+                full_uncertainty = np.full((len(valid), len(DISPERSION_FIELDS)), np.nan)
+                full_uncertainty[valid] = uncertainty
+                uncertainty = full_uncertainty
+                full_low = np.zeros(len(valid), dtype=bool)
+                full_low[valid] = low_certainty
+                low_certainty = full_low
+            if ood_distance is not None:
+                full_distance = np.full(len(valid), np.nan)
+                full_distance[valid] = ood_distance
+                ood_distance = full_distance
+                full_ood = np.zeros(len(valid), dtype=bool)
+                full_ood[valid] = ood
+                ood = full_ood
+        else:
+            valid = np.ones(n_valid, dtype=bool)
+
+        class_index = np.full(len(valid), -1, dtype=np.intp)
+        top_indices = np.full((len(valid), top_k), -1, dtype=np.intp)
+        if valid.any():
+            top_indices[valid] = top_k_indices(probabilities[valid], top_k)
+            class_index[valid] = top_indices[valid, 0]
+        confidence = np.take_along_axis(probabilities, np.maximum(class_index, 0)[:, None], axis=1)[:, 0]
+        confidence[~valid] = np.nan
+        top_probabilities = np.take_along_axis(probabilities, np.maximum(top_indices, 0), axis=1)
+        top_probabilities[~valid] = np.nan
+
+        self.probability_format = check_probability_format(all_probabilities)
+        self.class_names = list(class_names)
+        self.index = None if index is None else list(index)
+        self.valid = valid
+        self.class_index = class_index
+        self.confidence = confidence
+        self.top_indices = top_indices
+        self.top_probabilities = top_probabilities
+        self.probabilities = probabilities
+        self.escalated = escalated
+        self.n_trees_used = None if n_trees_used is None else np.asarray(n_trees_used)
+        self.uncertainty = None
+        self.low_certainty = None
+        if uncertainty is not None:
+            self.uncertainty = np.asarray(uncertainty, dtype=np.float64)
+            self.low_certainty = np.asarray(low_certainty, dtype=bool)
+        self.ood_distance = None
+        self.ood = None
+        if ood_distance is not None:
+            self.ood_distance = np.asarray(ood_distance, dtype=np.float64)
+            self.ood = np.asarray(ood, dtype=bool)
+        self.errors = errors or {}
+        self.warnings = warnings or {}
+        self.neighbors = None
+        if neighbors is not None:
+            self.neighbors = [None] * len(valid)
+            for pos, row_neighbors in zip(np.flatnonzero(valid).tolist(), neighbors):
+                self.neighbors[pos] = row_neighbors
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self._row(i) for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("Indice hors du batch")
+        return self._row(pos)
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Conversion en listes Python une fois pour tout le batch
+        valid = self.valid.tolist()
+        top_indices = self.top_indices.tolist()
+        escalated = self.escalated.tolist()
+        for pos, probabilities in enumerate(self.probabilities.tolist()):
+            if valid[pos]:
+                yield self._scored(pos, probabilities, top_indices[pos], escalated[pos])
+            else:
+                yield self._rejected(pos)
+
+    def __repr__(self) -> str:
+        return f"PredictionResultSet({len(self)} lignes, {self.n_errors} rejetée(s))"
+
+    @property
+    def n_errors(self) -> int:
+        """Nombre de lignes rejetées"""
+        return int(len(self) - np.count_nonzero(self.valid))
+
+    @property
+    def crops(self) -> np.ndarray:
+        """Culture prédite de chaque ligne (None pour les lignes rejetées)"""
+        names = np.asarray(self.class_names + [None], dtype=object)
+        return names[self.class_index]
+
+    @property
+    def stages(self) -> np.ndarray:
+        """Étage de chaque ligne (None pour les lignes rejetées)"""
+        stages = np.where(self.escalated, STAGE_FOREST, STAGE_CASCADE).astype(object)
+        stages[~self.valid] = None
+        return stages
+
+    def error_messages(self) -> Dict[int, str]:
+        """Message d'erreur de chaque ligne rejetée, par position"""
+        return {pos: "; ".join(issue['message'] for issue in issues) for pos, issues in self.errors.items()}
+
+    def to_list(self) -> List[Dict]:
+        """Tous les résultats au format historique (liste de dictionnaires)"""
+        return list(self)
+
+    def to_numpy(self) -> Dict[str, np.ndarray]:
+        """
+        Colonnes du batch, sans copie
+
+        Returns:
+            Dictionnaire de tableaux: valid, class_index (-1 si rejetée),
+            confidence, top_indices, top_probabilities, probabilities
+            (NaN si rejetée), escalated, n_trees_used (évaluation anytime),
+            uncertainty et low_certainty (dispersion des votes), ood_distance
+            et ood (détection hors distribution)
+        """
+        columns = {
+            'valid': self.valid,
+            'class_index': self.class_index,
+            'confidence': self.confidence,
+            'top_indices': self.top_indices,
+            'top_probabilities': self.top_probabilities,
+            'probabilities': self.probabilities,
+            'escalated': self.escalated
+        }
+        if self.n_trees_used is not None:
+            columns['n_trees_used'] = self.n_trees_used
+        if self.uncertainty is not None:
+            columns['uncertainty'] = self.uncertainty
+            columns['low_certainty'] = self.low_certainty
+        if self.ood_distance is not None:
+            columns['ood_distance'] = self.ood_distance
+            columns['ood'] = self.ood
+        return columns
+
+    def to_arrow(self):
+        """
+        Table Arrow du batch (pyarrow requis)
+
+        La confiance et les probabilités (liste de taille fixe par ligne)
+        partagent la mémoire des tableaux NumPy; les cultures sont des
+        colonnes dictionnaire sur les indices de classe.
+
+        Returns:
+            pyarrow.Table
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("L'export Arrow nécessite pyarrow (pip install pyarrow)") from e
+
+        n_classes = len(self.class_names)
+        invalid = ~self.valid
+        columns = {}
+        if self.index is not None:
+            columns['index'] = pa.array(self.index)
+        columns['crop'] = pa.DictionaryArray.from_arrays(
+            pa.array(self.class_index.astype(np.int32), mask=invalid), pa.array(self.class_names))
+        columns['confidence'] = pa.array(self.confidence)
+        for i in range(self.top_indices.shape[1]):
+            columns[f'top_{i + 1}'] = pa.DictionaryArray.from_arrays(
+                pa.array(self.top_indices[:, i].astype(np.int32), mask=invalid), pa.array(self.class_names))
+            columns[f'top_{i + 1}_probability'] = pa.array(np.ascontiguousarray(self.top_probabilities[:, i]))
+        columns['probabilities'] = pa.FixedSizeListArray.from_arrays(
+            pa.array(self.probabilities.reshape(-1)), n_classes)
+        columns['stage'] = pa.array(self.stages.tolist(), type=pa.string())
+        if self.n_trees_used is not None:
+            columns['n_trees_used'] = pa.array(self.n_trees_used)
+        if self.uncertainty is not None:
+            for i, name in enumerate(DISPERSION_FIELDS):
+                values = np.ascontiguousarray(self.uncertainty[:, i])
+                columns[name] = pa.array(values, mask=np.isnan(values))
+            columns['low_certainty'] = pa.array(self.low_certainty)
+        if self.ood_distance is not None:
+            columns['ood_distance'] = pa.array(self.ood_distance, mask=invalid)
+            columns['ood'] = pa.array(self.ood)
+        messages = self.error_messages()
+        columns['error'] = pa.array([messages.get(pos) for pos in range(len(self))], type=pa.string())
+        return pa.table(columns)
+
+    def iter_ndjson(self) -> Iterator[str]:
+        """Une ligne JSON par résultat (format historique, sans saut de ligne)"""
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        for row in self:
+            yield dumps(row)
+
+    def to_ndjson(self) -> str:
+        """Résultats en NDJSON (une ligne par résultat, saut de ligne final)"""
+        return ''.join(line + '\n' for line in self.iter_ndjson())
+
+    def _row(self, pos: int) -> Dict:
+        """Dictionnaire du format historique pour la ligne ``pos``"""
+        if not self.valid[pos]:
+            return self._rejected(pos)
+        return self._scored(pos, self.probabilities[pos].tolist(), self.top_indices[pos].tolist(),
+                            bool(self.escalated[pos]))
+
+    def _scored(self, pos: int, probabilities: List[float], top: List[int], escalated: bool) -> Dict:
+        n_trees_used = None if self.n_trees_used is None else int(self.n_trees_used[pos])
+        uncertainty = None
+        if self.uncertainty is not None:
+            uncertainty = uncertainty_fields(self.uncertainty[pos].tolist(), bool(self.low_certainty[pos]))
+        ood = None
+        if self.ood_distance is not None:
+            ood = ood_field(self.ood_distance[pos], self.ood[pos])
+        row = format_row(probabilities, escalated, self.class_names, all_probabilities=self.probability_format,
+                         top=top, n_trees_used=n_trees_used, uncertainty=uncertainty, ood=ood)
+        if self.index is not None:
+            row['index'] = self.index[pos]
+        if self.neighbors is not None:
+            row['neighbors'] = self.neighbors[pos]
+        if pos in self.warnings:
+            row['warnings'] = self.warnings[pos]
+        return row
+
+    def _rejected(self, pos: int) -> Dict:
+        issues = self.errors.get(pos, [])
+        row = {} if self.index is None else {'index': self.index[pos]}
+        row['error'] = "; ".join(issue['message'] for issue in issues) or "Ligne rejetée"
+        row['errors'] = issues
+        return row
+
+
+def format_predictions(probabilities: np.ndarray, stages: List[str], class_names: List[str],
+                       top_k: int = 3) -> List[Dict]:
+    """
+    Met en forme des probabilités au format des résultats de prédiction
+
+    Args:
+        probabilities: Probabilités (n_samples, n_classes)
+        stages: Étage ayant répondu pour chaque ligne
+        class_names: Nom de chaque classe
+        top_k: Nombre de cultures retournées dans ``top_3``
+
+    Returns:
+        Liste de dictionnaires (crop, confidence, top_3, all_probabilities, stage)
+    """
+    escalated = np.asarray(stages, dtype=object) == STAGE_FOREST
+    return PredictionResultSet(probabilities, escalated, class_names, top_k).to_list()
@@ -0,0 +1,212 @@
+"""
+Runtime d'inférence minimal (NumPy seulement)
+
+Charge le bundle du modèle (``scripts/export_model.py``) et prédit sans
+importer pandas, scikit-learn, scipy ni LIME: pour les CLI, tâches cron et
+machines embarquées, le démarrage (import + chargement + prédiction) reste
+bien sous la seconde. Pas d'explications LIME ni d'échantillons de
+référence: utiliser CropPredictor pour ces fonctionnalités.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from .bundle import BundleError, file_sha256, load_bundle
+from ..data.schema import InputSchema
+from .naive_bayes import confidence_gate
+from .ood import MahalanobisDetector
+from .forest import DISPERSION_FIELDS, vote_dispersion
+from .results import STAGE_CASCADE, STAGE_FOREST, PredictionResultSet, low_certainty_mask
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimePredictor:
+    """Prédicteur minimal sur bundle (même format de résultat que CropPredictor.predict)"""
+
+    STAGE_CASCADE = STAGE_CASCADE
+    STAGE_FOREST = STAGE_FOREST
+
+    def __init__(self, bundle_path: str = "models/model.bundle", model_path: Optional[str] = None,
+                 cascade: bool = False, cascade_min_probability: float = 0.99, cascade_min_margin: float = 0.0,
+                 verify: bool = True, schema: Optional[InputSchema] = None, uncertainty: bool = True,
+                 uncertainty_thresholds: Optional[Dict[str, float]] = None, ood: bool = True,
+                 ood_settings: Optional[Dict] = None):
+        """
+        Initialise le prédicteur
+
+        Args:
+            bundle_path: Fichier du bundle
+            model_path: Modèle picklé d'origine: si présent, le bundle doit en
+                        avoir été exporté (sinon BundleError)
+            cascade: Évaluer d'abord le Naive Bayes du bundle
+            cascade_min_probability: Seuil de confiance du Naive Bayes
+            cascade_min_margin: Écart minimal entre ses deux meilleures classes
+            verify: Vérifier les empreintes des tableaux du bundle
+            schema: Validation des entrées de predict (défaut: plages agronomiques, valeurs hors plage signalées)
+            uncertainty: Ajouter la dispersion des votes des arbres aux résultats
+            uncertainty_thresholds: Seuils de low_certainty (max_entropy,
+                                    min_vote_margin, min_half_agreement)
+            ood: Détecter les entrées hors distribution (statistiques par
+                 classe des données d'entraînement du bundle)
+            ood_settings: max_distance, policy et shrinkage du détecteur
+        """
+        self.bundle_path = Path(bundle_path)
+        self.model_path = Path(model_path) if model_path else None
+        self.use_cascade = cascade
+        self.cascade_min_probability = cascade_min_probability
+        self.cascade_min_margin = cascade_min_margin
+        self.verify = verify
+        self.schema = schema if schema is not None else InputSchema()
+        self.uncertainty = uncertainty
+        self.uncertainty_thresholds = dict(uncertainty_thresholds or {})
+        self.ood_enabled = ood
+        self.ood_settings = dict(ood_settings or {})
+        self.ood = None
+
+        self.forest = None
+        self.cascade = None
+        self.class_names: List[str] = []
+        self.feature_names: List[str] = []
+        self.model_version = None
+
+    @classmethod
+    def from_config(cls, config, model_path: Optional[str] = None,
+                    cascade: Optional[bool] = None) -> "RuntimePredictor":
+        """
+        Construit le prédicteur depuis la section ``inference`` de la configuration
+
+        Args:
+            config: Instance de Config
+            model_path: Modèle picklé d'origine (contrôle de fraîcheur du bundle)
+            cascade: Cascade Naive Bayes -> forêt (None: inference.cascade.enabled)
+        """
+        return cls(
+            bundle_path=config.get('inference.bundle_path', "models/model.bundle"),
+            model_path=model_path,
+            cascade=config.get('inference.cascade.enabled', False) if cascade is None else cascade,
+            cascade_min_probability=config.get('inference.cascade.min_probability', 0.99),
+            cascade_min_margin=config.get('inference.cascade.min_margin', 0.0),
+            verify=config.get('inference.verify_bundle', True),
+            schema=InputSchema.from_config(config),
+            uncertainty=config.get('inference.uncertainty.enabled', True),
+            uncertainty_thresholds={
+                name: config.get(f'inference.uncertainty.{name}', default)
+                for name, default in (('max_entropy', 0.3), ('min_vote_margin', 0.6), ('min_half_agreement', 0.8))
+            },
+            ood=config.get('inference.ood.enabled', True),
+            ood_settings={
+                name: config.get(f'inference.ood.{name}', default)
+                for name, default in (('max_distance', 5.0), ('policy', 'flag'), ('shrinkage', 0.5))
+            }
+        )
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.forest is not None
+
+    def load_model(self):
+        """
+        Charge le bundle (projeté en mémoire)
+
+        Raises:
+            FileNotFoundError: Bundle absent (scripts/export_model.py)
+            BundleError: Bundle invalide, obsolète ou sans Naive Bayes alors
+                         que la cascade est demandée
+        """
+        if not self.bundle_path.exists():
+            raise FileNotFoundError(f"Bundle absent: {self.bundle_path} (python scripts/export_model.py)")
+        bundle = load_bundle(str(self.bundle_path), verify=self.verify)
+        if self.model_path is not None and self.model_path.exists() \
+                and file_sha256(self.model_path) != bundle.source_sha256:
+            raise BundleError(f"Bundle {self.bundle_path} obsolète pour {self.model_path} "
+                              f"(python scripts/export_model.py)")
+        if self.use_cascade and bundle.cascade is None:
+            raise BundleError(f"Bundle {self.bundle_path} exporté sans Naive Bayes de cascade")
+
+        self.forest = bundle.forest
+        self.cascade = bundle.cascade if self.use_cascade else None
+        self.class_names = [str(name) for name in bundle.label_encoder.classes_]
+        self.feature_names = list(bundle.feature_names)
+        self.model_version = bundle.model_version
+        self.ood = None
+        if self.ood_enabled and bundle.training_labels is not None:
+            raw_training = bundle.training_data * bundle.scaler.scale_ + bundle.scaler.mean_
+            self.ood = MahalanobisDetector.fit(raw_training, bundle.training_labels, **self.ood_settings)
+        logger.info(f"Bundle {self.bundle_path} chargé (version {self.model_version})")
+
+    def predict_proba(self, features: np.ndarray, return_stages: bool = False,
+                      return_uncertainty: bool = False):
+        """
+        Probabilités des classes à partir des features brutes
+
+        Args:
+            features: Array de shape (n_samples, n_features), non standardisé
+            return_stages: Retourner aussi le masque des lignes évaluées par la forêt
+            return_uncertainty: Retourner aussi la dispersion des votes
+                                (n_samples, 3), NaN si la cascade a répondu
+        """
+        if not self.is_loaded:
+            self.load_model()
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim != 2 or features.shape[1] != len(self.feature_names):
+            raise ValueError(f"Attendu {len(self.feature_names)} features, reçu {features.shape[-1]}")
+        if not np.isfinite(features).all():
+            raise ValueError("Valeur manquante ou non numérique")
+
+        dispersion = np.full((len(features), len(DISPERSION_FIELDS)), np.nan)
+        if self.cascade is None:
+            probabilities, votes = self.forest.predict_proba(features, return_votes=True)
+            escalated = np.ones(len(probabilities), dtype=bool)
+        else:
+            probabilities = self.cascade.predict_proba(features)
+            escalated = ~confidence_gate(probabilities, self.cascade_min_probability, self.cascade_min_margin)
+            votes = None
+            if escalated.any():
+                probabilities[escalated], votes = self.forest.predict_proba(features[escalated], return_votes=True)
+        if votes is not None and self.uncertainty:
+            dispersion[escalated] = vote_dispersion(votes, len(self.class_names))
+
+        outputs = (probabilities,)
+        if return_stages:
+            outputs += (escalated,)
+        if return_uncertainty:
+            outputs += (dispersion,)
+        return outputs if len(outputs) > 1 else probabilities
+
+    def predict(self, features: Union[List, np.ndarray], neighbors: Optional[int] = None) -> Dict:
+        """
+        Prédit la culture d'un échantillon
+
+        Args:
+            features: Liste ou array des features brutes
+            neighbors: Ignoré (pas d'échantillons de référence dans ce runtime)
+
+        Returns:
+            Dictionnaire (crop, confidence, top_3, all_probabilities, stage)
+
+        Raises:
+            ValidationError: Entrée rejetée par le schéma
+        """
+        checked = self.schema.validate(features)
+        checked.raise_for_row(0)
+        result = self.predict_many(checked.values[:1])[0]
+        if checked.flagged[0]:
+            result['warnings'] = checked.issues(0)
+        return result
+
+    def predict_many(self, features: np.ndarray, top_k: int = 3) -> PredictionResultSet:
+        """Prédictions d'un batch de lignes valides (n_samples, n_features)"""
+        probabilities, escalated, dispersion = self.predict_proba(features, return_stages=True,
+                                                                  return_uncertainty=True)
+        ood_distance = ood = None
+        if self.ood is not None:
+            ood_distance, ood = self.ood.detect(features)
+            if ood.any():
+                probabilities[ood] = self.ood.downgrade(probabilities[ood])
+        return PredictionResultSet(probabilities, escalated, self.class_names, top_k,
+                                   uncertainty=dispersion if self.uncertainty else None,
+                                   low_certainty=low_certainty_mask(dispersion, **self.uncertainty_thresholds),
+                                   ood_distance=ood_distance, ood=ood)
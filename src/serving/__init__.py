@@ -0,0 +1,22 @@
+"""Serveur d'inférence partagé (socket Unix)"""
+import importlib
+
+# Import à la demande (PEP 562): le client n'importe pas le serveur et ses modèles
+_EXPORTS = {
+    'InferenceClient': '.client',
+    'InferenceServer': '.server'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,242 @@
+"""
+Client du serveur d'inférence (pool de connexions, repli en processus)
+"""
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from . import protocol
+from ..data.schema import ValidationError
+from ..utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceClient:
+    """
+    Client du serveur d'inférence local
+
+    Les connexions au socket Unix sont réutilisées via un pool. Si le socket
+    est absent ou que le serveur ne répond pas, la requête est servie par
+    la fonction de repli (typiquement ``ModelRegistry.predict`` en
+    processus); une nouvelle tentative de connexion est faite après
+    ``retry_interval`` secondes.
+    """
+
+    def __init__(self, socket_path: str, pool_size: int = 4, timeout: float = 2.0,
+                 fallback: Optional[Callable[..., Dict]] = None, neighbors_k: int = 5,
+                 retry_interval: float = 5.0, enabled: bool = True, top_k: int = 3):
+        """
+        Initialise le client
+
+        Args:
+            socket_path: Chemin du socket Unix du serveur
+            pool_size: Nombre maximal de connexions gardées ouvertes
+            timeout: Délai maximal d'une requête (secondes)
+            fallback: Prédiction en processus, appelée comme
+                      ``fallback(features, key=..., model=..., neighbors=...)``
+            neighbors_k: Nombre d'échantillons de référence par défaut
+            retry_interval: Délai avant de retenter le serveur après un échec
+            enabled: False: toujours prédire en processus
+            top_k: Nombre de cultures retournées dans ``top_3``
+        """
+        self.enabled = enabled
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback = fallback
+        self.neighbors_k = neighbors_k
+        self.retry_interval = retry_interval
+        self.top_k = top_k
+
+        self._pool = queue.LifoQueue(maxsize=max(1, pool_size))
+        self._pid = os.getpid()
+        self._info: Optional[Dict] = None
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+        self.remote_calls = 0
+        self.fallback_calls = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None,
+                    fallback: Optional[Callable[..., Dict]] = None) -> "InferenceClient":
+        """
+        Construit le client depuis la section ``serving``
+
+        Args:
+            config: Instance de Config (par défaut config/config.yaml)
+            fallback: Prédiction en processus
+        """
+        config = config if config is not None else Config()
+        return cls(
+            socket_path=config.get('serving.socket_path', "/tmp/smartcrop-inference.sock"),
+            pool_size=config.get('serving.client_pool_size', 4),
+            timeout=config.get('serving.timeout', 2.0),
+            fallback=fallback,
+            enabled=config.get('serving.enabled', False),
+            retry_interval=config.get('serving.retry_interval', 5.0),
+            neighbors_k=config.get('inference.neighbors.k', 5) if config.get('inference.neighbors.enabled', True) else 0,
+            top_k=config.get('inference.top_k', 3)
+        )
+
+    @property
+    def available(self) -> bool:
+        """Indique si le serveur doit être tenté"""
+        return (self.enabled and os.path.exists(self.socket_path)
+                and time.monotonic() >= self._unavailable_until)
+
+    def predict(self, features, key=None, model: Optional[str] = None, neighbors: Optional[int] = None) -> Dict:
+        """
+        Prédiction d'une ligne (même format que ModelRegistry.predict)
+
+        Args:
+            features: Liste ou array des 7 features brutes
+            key: Clé de routage
+            model: Forcer un modèle
+            neighbors: Nombre d'échantillons de référence (None: défaut)
+        """
+        X = np.asarray(features, dtype=np.float64).reshape(1, -1)
+        if self.available:
+            try:
+                return self._remote(X, key, model, neighbors)[0]
+            except (OSError, protocol.ProtocolError) as e:
+                self._mark_unavailable(e)
+        return self._fallback(features, key, model, neighbors)
+
+    def predict_many(self, features: np.ndarray, key=None, model: Optional[str] = None,
+                     neighbors: Optional[int] = None) -> List[Dict]:
+        """
+        Prédiction d'un batch (un aller-retour par bloc de 65535 lignes)
+
+        Les lignes sont validées comme par ``CropPredictor.predict_batch``:
+        une ligne rejetée reçoit 'error' et 'errors' au lieu de faire
+        échouer le batch.
+
+        Args:
+            features: Features brutes (n_samples, n_features)
+            key: Clé de routage
+            model: Forcer un modèle
+            neighbors: Nombre d'échantillons de référence par ligne (None: 0)
+        """
+        X = np.asarray(features, dtype=np.float64)
+        neighbors = 0 if neighbors is None else neighbors
+        if self.available:
+            try:
+                results = []
+                for start in range(0, len(X), protocol.MAX_ROWS):
+                    results.extend(self._remote(X[start:start + protocol.MAX_ROWS], key, model, neighbors))
+                return results
+            except (OSError, protocol.ProtocolError) as e:
+                self._mark_unavailable(e)
+        results = []
+        for row in X:
+            try:
+                results.append(self._fallback(row, key, model, neighbors))
+            except ValidationError as e:
+                results.append({'error': str(e), 'errors': e.errors})
+        return results
+
+    def info(self, refresh: bool = False) -> Dict:
+        """Modèles servis par le serveur (versions, classes, statistiques)"""
+        if self._info is None or refresh:
+            status, _, _, extra = self._request(protocol.encode_request(protocol.OP_INFO))
+            if status != protocol.STATUS_OK:
+                raise RuntimeError(extra.get('error', "Erreur du serveur d'inférence"))
+            self._info = extra
+        return self._info
+
+    def _remote(self, X: np.ndarray, key, model: Optional[str], neighbors: Optional[int]) -> List[Dict]:
+        """Prédiction par le serveur"""
+        k = self.neighbors_k if neighbors is None else neighbors
+        frame = protocol.encode_request(protocol.OP_PREDICT, X, model=model or '',
+                                        key='' if key is None else str(key), neighbors=k)
+        status, probabilities, stages, extra = self._request(frame)
+        if status != protocol.STATUS_OK:
+            # Erreur applicative (ex: entrée invalide): pas de repli
+            if extra.get('errors'):
+                raise ValidationError(extra['errors'])
+            raise ValueError(extra.get('error', "Erreur du serveur d'inférence"))
+
+        name = extra['model']
+        info = self.info()
+        if info['models'].get(name, {}).get('version') != extra['model_version']:
+            # Le serveur a rechargé un modèle: rafraîchir la table des classes
+            info = self.info(refresh=True)
+
+        results = protocol.decode_columns(probabilities, stages, extra, info['models'][name]['classes'],
+                                          self.top_k).to_list()
+        for result in results:
+            result['model'] = name
+            result['model_version'] = extra['model_version']
+        self.remote_calls += len(results)
+        return results
+
+    def _request(self, frame: bytes):
+        """Envoie une trame sur une connexion du pool et lit la réponse"""
+        sock = self._acquire()
+        try:
+            sock.sendall(frame)
+            response = protocol.read_response(sock)
+        except BaseException:
+            sock.close()
+            raise
+        self._release(sock)
+        return response
+
+    def _acquire(self) -> socket.socket:
+        """Connexion du pool, ou nouvelle connexion"""
+        if self._pid != os.getpid():
+            # Processus fils (fork): ne pas partager les connexions du parent
+            self._pool = queue.LifoQueue(maxsize=self._pool.maxsize)
+            self._pid = os.getpid()
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            return sock
+
+    def _release(self, sock: socket.socket):
+        """Rend une connexion au pool (fermée si le pool est plein)"""
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def _mark_unavailable(self, error: Exception):
+        """Bascule sur le repli pendant ``retry_interval`` secondes"""
+        with self._lock:
+            if time.monotonic() >= self._unavailable_until:
+                logger.warning(f"Serveur d'inférence indisponible ({error}), repli en processus "
+                               f"pendant {self.retry_interval:.0f} s")
+            self._unavailable_until = time.monotonic() + self.retry_interval
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _fallback(self, features, key, model: Optional[str], neighbors: Optional[int]) -> Dict:
+        """Prédiction en processus"""
+        if self.fallback is None:
+            raise ConnectionError(f"Serveur d'inférence indisponible ({self.socket_path}) et pas de repli")
+        self.fallback_calls += 1
+        return self.fallback(features, key=key, model=model, neighbors=neighbors)
+
+    def close(self):
+        """Ferme les connexions du pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,240 @@
+"""
+Protocole binaire du serveur d'inférence (socket Unix)
+
+Requête (little-endian)::
+
+    en-tête: magic "SC" | version u8 | opcode u8 | n_rows u16 | n_features u16
+             | neighbors u16 | len(model) u8 | len(key) u8
+    model (UTF-8) | key (UTF-8) | features float64 (n_rows x n_features)
+
+Réponse::
+
+    en-tête: magic "SC" | version u8 | status u8 | n_rows u16 | n_classes u16
+             | len(extra) u32
+    probabilités float64 (n_rows x n_classes) | étages u8 (n_rows)
+    | extra JSON (UTF-8)
+
+Les probabilités voyagent en binaire (NaN pour les lignes rejetées);
+``extra`` porte les métadonnées (modèle, version) et les autres colonnes
+du batch (voir ``encode_columns``), ou le message d'erreur.
+"""
+import json
+import socket
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.forest import DISPERSION_FIELDS
+from ..models.results import PredictionResultSet
+
+MAGIC = b"SC"
+VERSION = 1
+
+OP_PREDICT = 1
+OP_INFO = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Valeur de l'étage: 1 si la forêt a répondu, 0 pour le premier étage de la cascade
+STAGE_FOREST = 1
+
+MAX_ROWS = np.iinfo(np.uint16).max
+# Longueur maximale (octets UTF-8) du nom de modèle et de la clé de routage
+MAX_NAME_BYTES = np.iinfo(np.uint8).max
+
+REQUEST_HEADER = struct.Struct('<2sBBHHHBB')
+RESPONSE_HEADER = struct.Struct('<2sBBHHI')
+
+
+class ProtocolError(ConnectionError):
+    """Trame invalide ou connexion interrompue"""
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Lit exactement ``size`` octets (ProtocolError si la connexion est fermée)"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ProtocolError("Connexion fermée")
+        received += n
+    return bytes(buffer)
+
+
+def encode_request(opcode: int, features: Optional[np.ndarray] = None, model: str = '', key: str = '',
+                   neighbors: int = 0) -> bytes:
+    """
+    Encode une requête
+
+    Args:
+        opcode: OP_PREDICT ou OP_INFO
+        features: Features brutes (n_rows, n_features)
+        model: Modèle demandé ('' pour le routage du registre)
+        key: Clé de routage
+        neighbors: Nombre d'échantillons de référence par ligne
+
+    Returns:
+        Trame
+    """
+    if features is None:
+        features = np.empty((0, 0))
+    features = np.ascontiguousarray(features, dtype='<f8')
+    if len(features) > MAX_ROWS:
+        raise ValueError(f"Au plus {MAX_ROWS} lignes par requête")
+    if not 0 <= neighbors <= MAX_ROWS:
+        raise ValueError(f"neighbors doit être entre 0 et {MAX_ROWS} (reçu {neighbors})")
+    model_bytes = model.encode('utf-8')
+    if len(model_bytes) > MAX_NAME_BYTES:
+        raise ValueError(f"Nom de modèle trop long: {len(model_bytes)} octets UTF-8 (au plus {MAX_NAME_BYTES})")
+    # La clé ne sert qu'au routage: tronquée sans couper un caractère UTF-8
+    key_bytes = key.encode('utf-8')[:MAX_NAME_BYTES].decode('utf-8', 'ignore').encode('utf-8')
+    header = REQUEST_HEADER.pack(MAGIC, VERSION, opcode, features.shape[0], features.shape[1],
+                                 neighbors, len(model_bytes), len(key_bytes))
+    return b''.join([header, model_bytes, key_bytes, features.tobytes()])
+
+
+def read_request(sock: socket.socket) -> Tuple[int, np.ndarray, str, str, int]:
+    """
+    Lit une requête
+
+    Returns:
+        (opcode, features, model, key, neighbors)
+    """
+    magic, version, opcode, n_rows, n_features, neighbors, model_len, key_len = REQUEST_HEADER.unpack(
+        recv_exact(sock, REQUEST_HEADER.size)
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError("En-tête de requête invalide")
+    model = recv_exact(sock, model_len).decode('utf-8') if model_len else ''
+    key = recv_exact(sock, key_len).decode('utf-8') if key_len else ''
+    data = recv_exact(sock, n_rows * n_features * 8) if n_rows * n_features else b''
+    features = np.frombuffer(data, dtype='<f8').reshape(n_rows, n_features)
+    return opcode, features, model, key, neighbors
+
+
+def encode_response(status: int, probabilities: Optional[np.ndarray] = None,
+                    stages: Optional[np.ndarray] = None, extra: Optional[Dict] = None) -> bytes:
+    """
+    Encode une réponse
+
+    Args:
+        status: STATUS_OK ou STATUS_ERROR
+        probabilities: Probabilités (n_rows, n_classes)
+        stages: Étage de chaque ligne (STAGE_FOREST ou 0)
+        extra: Métadonnées JSON-sérialisables
+
+    Returns:
+        Trame
+    """
+    if probabilities is None:
+        probabilities = np.empty((0, 0))
+    probabilities = np.ascontiguousarray(probabilities, dtype='<f8')
+    stages = np.zeros(len(probabilities), dtype=np.uint8) if stages is None else np.asarray(stages, np.uint8)
+    extra_bytes = json.dumps(extra or {}, separators=(',', ':')).encode('utf-8')
+    header = RESPONSE_HEADER.pack(MAGIC, VERSION, status, probabilities.shape[0], probabilities.shape[1],
+                                  len(extra_bytes))
+    return b''.join([header, probabilities.tobytes(), stages.tobytes(), extra_bytes])
+
+
+def _json_floats(values: np.ndarray) -> List:
+    """Liste JSON d'un tableau de floats (NaN -> null)"""
+    return np.where(np.isnan(values), None, values.astype(object)).tolist()
+
+
+def encode_columns(results: PredictionResultSet) -> Dict:
+    """
+    Colonnes d'un batch pour le champ ``extra`` d'une réponse
+
+    Les probabilités et étages voyagent en binaire; ce dictionnaire porte le
+    reste: lignes rejetées et leurs erreurs, avertissements, voisins,
+    nombre d'arbres, dispersion des votes et détection hors distribution.
+    """
+    columns = {}
+    if not results.valid.all():
+        columns['valid'] = results.valid.tolist()
+        columns['errors'] = {str(pos): issues for pos, issues in results.errors.items()}
+    if results.warnings:
+        columns['warnings'] = {str(pos): issues for pos, issues in results.warnings.items()}
+    if results.neighbors is not None:
+        columns['neighbors'] = results.neighbors
+    if results.n_trees_used is not None:
+        columns['n_trees_used'] = results.n_trees_used.tolist()
+    if results.uncertainty is not None:
+        columns['uncertainty'] = _json_floats(results.uncertainty)
+        columns['low_certainty'] = results.low_certainty.tolist()
+    if results.ood_distance is not None:
+        columns['ood_distance'] = _json_floats(results.ood_distance)
+        columns['ood'] = results.ood.tolist()
+    return columns
+
+
+def encode_row_columns(result: Dict) -> Dict:
+    """Colonnes (voir ``encode_columns``) d'un résultat unitaire de predict()"""
+    columns = {}
+    if 'warnings' in result:
+        columns['warnings'] = {'0': result['warnings']}
+    if 'neighbors' in result:
+        columns['neighbors'] = [result['neighbors']]
+    if 'n_trees_used' in result:
+        columns['n_trees_used'] = [result['n_trees_used']]
+    if 'uncertainty' in result:
+        columns['uncertainty'] = [[result['uncertainty'][name] for name in DISPERSION_FIELDS]]
+        columns['low_certainty'] = [result['uncertainty']['low_certainty']]
+    if 'ood' in result:
+        columns['ood_distance'] = [result['ood']['distance']]
+        columns['ood'] = [result['ood']['flagged']]
+    return columns
+
+
+def decode_columns(probabilities: np.ndarray, stages: np.ndarray, extra: Dict, class_names: Sequence[str],
+                   top_k: int = 3) -> PredictionResultSet:
+    """
+    Reconstruit les résultats d'un batch à partir d'une réponse
+
+    Args:
+        probabilities: Probabilités reçues (n_rows, n_classes)
+        stages: Étages reçus
+        extra: Colonnes du champ ``extra`` (voir ``encode_columns``)
+        class_names: Nom de chaque classe
+        top_k: Nombre de cultures retournées dans ``top_3``
+    """
+    valid = np.asarray(extra['valid'], dtype=bool) if 'valid' in extra else np.ones(len(probabilities), dtype=bool)
+
+    def column(name, dtype):
+        return np.array(extra[name], dtype=dtype)[valid] if name in extra else None
+
+    neighbors = extra.get('neighbors')
+    if neighbors is not None:
+        neighbors = [row for row, keep in zip(neighbors, valid.tolist()) if keep]
+    return PredictionResultSet(
+        probabilities[valid], stages[valid] == STAGE_FOREST, class_names, top_k, valid=valid,
+        errors={int(pos): issues for pos, issues in extra.get('errors', {}).items()},
+        warnings={int(pos): issues for pos, issues in extra.get('warnings', {}).items()},
+        neighbors=neighbors, n_trees_used=column('n_trees_used', np.intp),
+        uncertainty=column('uncertainty', np.float64), low_certainty=column('low_certainty', bool),
+        ood_distance=column('ood_distance', np.float64), ood=column('ood', bool)
+    )
+
+
+def read_response(sock: socket.socket) -> Tuple[int, np.ndarray, np.ndarray, Dict]:
+    """
+    Lit une réponse
+
+    Returns:
+        (status, probabilités, étages, extra)
+    """
+    magic, version, status, n_rows, n_classes, extra_len = RESPONSE_HEADER.unpack(
+        recv_exact(sock, RESPONSE_HEADER.size)
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError("En-tête de réponse invalide")
+    size = n_rows * n_classes * 8
+    body = recv_exact(sock, size + n_rows + extra_len)
+    probabilities = np.frombuffer(body[:size], dtype='<f8').reshape(n_rows, n_classes)
+    stages = np.frombuffer(body[size:size + n_rows], dtype=np.uint8)
+    extra = json.loads(body[size + n_rows:].decode('utf-8')) if extra_len else {}
+    return status, probabilities, stages, extra
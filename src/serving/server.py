@@ -0,0 +1,189 @@
+"""
+Serveur d'inférence local (socket Unix) partagé par les workers web
+"""
+import logging
+import os
+import socketserver
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from . import protocol
+from ..data.schema import ValidationError
+from ..models.parallel import ParallelismPolicy
+from ..models.registry import ModelRegistry
+from ..utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Connexion d'un client: requêtes traitées l'une après l'autre"""
+
+    def handle(self):
+        server: "InferenceServer" = self.server.inference
+        sock = self.request
+        while True:
+            try:
+                opcode, features, model, key, neighbors = protocol.read_request(sock)
+            except (protocol.ProtocolError, OSError):
+                return
+            try:
+                response = server.handle(opcode, features, model, key, neighbors)
+            except Exception as e:
+                logger.error(f"Erreur du serveur d'inférence: {e}")
+                extra = {'error': str(e)}
+                if isinstance(e, ValidationError):
+                    extra['errors'] = e.errors
+                response = protocol.encode_response(protocol.STATUS_ERROR, extra=extra)
+            try:
+                sock.sendall(response)
+            except OSError:
+                return
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class InferenceServer:
+    """
+    Serveur d'inférence possédant les modèles
+
+    Les workers web envoient leurs requêtes sur un socket Unix (voir
+    ``protocol``). Chaque connexion est servie par un thread; les requêtes
+    unitaires de tous les workers passent par le cache et le micro-batching
+    des prédicteurs du serveur, et le parallélisme des gros batches utilise
+    tous les coeurs, indépendamment du nombre de workers web.
+    """
+
+    def __init__(self, registry: ModelRegistry, socket_path: str):
+        """
+        Initialise le serveur
+
+        Args:
+            registry: Registre des modèles (chargés par ``start``)
+            socket_path: Chemin du socket Unix
+        """
+        self.registry = registry
+        self.socket_path = socket_path
+        self._server: Optional[_ThreadingUnixServer] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls, config: Optional[Config] = None, socket_path: Optional[str] = None) -> "InferenceServer":
+        """
+        Construit le serveur depuis la configuration (registry, serving)
+
+        Args:
+            config: Instance de Config (par défaut config/config.yaml)
+            socket_path: Chemin du socket (par défaut serving.socket_path)
+        """
+        config = config if config is not None else Config()
+        socket_path = socket_path or config.get('serving.socket_path', "/tmp/smartcrop-inference.sock")
+        return cls(ModelRegistry.from_config(config), socket_path)
+
+    def load(self, warmup: bool = True):
+        """
+        Charge et chauffe les modèles
+
+        Le serveur est le seul processus d'inférence: sa politique de
+        parallélisme dispose de tous les coeurs (un seul "worker").
+
+        Args:
+            warmup: Chauffer les prédicteurs (sans LIME, servi par l'application)
+        """
+        self.registry.load_all()
+        for predictor in self.registry.models.values():
+            predictor.parallelism = ParallelismPolicy(
+                min_parallel_batch=predictor.config.get('inference.parallelism.min_parallel_batch', 4096),
+                chunk_size=predictor.config.get('inference.parallelism.chunk_size', 2048),
+                max_threads=predictor.config.get('inference.parallelism.max_threads'),
+                workers=1
+            )
+            if warmup:
+                predictor.warmup(explain=False)
+        logger.info(f"Serveur d'inférence: {len(self.registry.models)} modèle(s), "
+                    f"{self.registry.get().parallelism.describe()}")
+
+    def handle(self, opcode: int, features: np.ndarray, model: str, key: str, neighbors: int) -> bytes:
+        """
+        Traite une requête décodée
+
+        Returns:
+            Trame de réponse
+        """
+        if opcode == protocol.OP_INFO:
+            return protocol.encode_response(protocol.STATUS_OK, extra=self.info())
+        if opcode != protocol.OP_PREDICT:
+            raise ValueError(f"Opération inconnue: {opcode}")
+
+        model = model or None
+        key = key or None
+        if model is not None and model not in self.registry.models:
+            raise ValueError(f"Modèle inconnu: {model}")
+
+        if len(features) == 1:
+            # Requête unitaire: cache, micro-batching et évaluation en ombre
+            result = self.registry.predict(features[0], key=key, model=model, neighbors=neighbors)
+            predictor = self.registry.get(result['model'])
+            class_names = predictor.label_encoder.classes_.tolist()
+            probabilities = np.array([[result['all_probabilities'][name] for name in class_names]])
+            stages = [int(result['stage'] == predictor.STAGE_FOREST)]
+            name = result['model']
+            columns = protocol.encode_row_columns(result)
+        else:
+            # Batch: validation, détection hors distribution et incertitude
+            # de predict_batch (lignes rejetées marquées, pas d'échec du batch)
+            name, results = self.registry.predict_batch(features, key=key, model=model, neighbors=neighbors)
+            probabilities = results.probabilities
+            stages = results.escalated.astype(np.uint8)
+            columns = protocol.encode_columns(results)
+
+        extra = {'model': name, 'model_version': self.registry.version(name), **columns}
+        return protocol.encode_response(protocol.STATUS_OK, probabilities, stages, extra)
+
+    def info(self) -> Dict:
+        """Modèles servis (versions, classes, features) et statistiques"""
+        return {
+            'default': self.registry.default,
+            'models': {
+                name: {
+                    'version': self.registry.version(name),
+                    'classes': [str(c) for c in predictor.label_encoder.classes_],
+                    'feature_names': list(predictor.feature_names),
+                    'neighbors_k': predictor.neighbors_k if predictor.neighbors is not None else 0
+                }
+                for name, predictor in self.registry.models.items()
+            },
+            'stats': self.registry.stats(),
+            'pid': os.getpid()
+        }
+
+    def start(self):
+        """Ouvre le socket (remplace un socket orphelin) et sert dans un thread"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = _ThreadingUnixServer(self.socket_path, _Handler)
+        self._server.inference = self
+        os.chmod(self.socket_path, 0o660)
+        thread = threading.Thread(target=self._server.serve_forever, name='inference-server', daemon=True)
+        thread.start()
+        logger.info(f"Serveur d'inférence à l'écoute sur {self.socket_path}")
+
+    def serve_forever(self):
+        """Ouvre le socket et sert jusqu'à ``stop``"""
+        self.start()
+        self._stopped.wait()
+
+    def stop(self):
+        """Arrête le serveur et supprime le socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._stopped.set()
+        logger.info("Serveur d'inférence arrêté")
@@ -0,0 +1,108 @@
+"""
+Tests pour le bundle de modèle
+"""
+import subprocess
+import sys
+
+import pytest
+import numpy as np
+import yaml
+from src.models.bundle import BundleError, export_bundle, load_bundle, read_bundle, write_bundle
+from src.models.predictor import CropPredictor
+from src.utils.config import Config
+
+
+@pytest.fixture(scope="module")
+def bundle_path(tmp_path_factory):
+    """Bundle exporté depuis le modèle de référence"""
+    path = tmp_path_factory.mktemp("bundle") / "model.bundle"
+    export_bundle("models/tuned/random_forest_best.pkl", str(path))
+    return path
+
+
+def make_config(tmp_path, bundle_path) -> Config:
+    """Configuration pointant vers le bundle"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'inference': {'bundle_path': str(bundle_path)}}))
+    return Config(str(config_path))
+
+
+def test_bundle_round_trip(tmp_path):
+    """Test l'écriture et la relecture des tableaux"""
+    arrays = {
+        'a': np.arange(10, dtype=np.uint16),
+        'b': np.linspace(0, 1, 12).reshape(3, 4),
+        'names': np.array(['rice', 'maize'])
+    }
+    version = write_bundle(str(tmp_path / "test.bundle"), arrays, {'key': 'value'})
+    loaded, manifest = read_bundle(str(tmp_path / "test.bundle"))
+    
+    assert manifest['model_version'] == version
+    assert manifest['meta'] == {'key': 'value'}
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+        assert loaded[name].ctypes.data % 64 == 0
+
+
+def test_bundle_is_memory_mapped(bundle_path):
+    """Test que les tableaux sont projetés en mémoire, sans sous-classe memmap"""
+    bundle = load_bundle(str(bundle_path))
+    
+    assert type(bundle.forest.children) is np.ndarray
+    assert not bundle.forest.children.flags.writeable
+    assert len(bundle.source_sha256) == 64
+    assert len(bundle.model_version) == 12
+    assert list(bundle.label_encoder.classes_[:2]) == ['apple', 'banana']
+
+
+def test_corrupted_bundle_is_rejected(tmp_path, bundle_path):
+    """Test que la vérification des empreintes détecte une corruption"""
+    corrupted = tmp_path / "corrupted.bundle"
+    data = bytearray(bundle_path.read_bytes())
+    data[-1] ^= 0xFF
+    corrupted.write_bytes(bytes(data))
+    
+    with pytest.raises(BundleError):
+        load_bundle(str(corrupted))
+    
+    corrupted.write_bytes(b"not a bundle")
+    with pytest.raises(BundleError):
+        load_bundle(str(corrupted))
+
+
+def test_bundle_loads_without_sklearn(bundle_path):
+    """Test que le chargement et la prédiction n'importent ni scikit-learn ni joblib"""
+    code = (
+        "import sys; from src.models.bundle import load_bundle; import numpy as np; "
+        f"b = load_bundle({str(bundle_path)!r}); b.forest.predict_proba(np.ones((1, 7))); "
+        "assert 'sklearn' not in sys.modules and 'joblib' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_predictor_loads_bundle(tmp_path, bundle_path):
+    """Test que le prédicteur utilise le bundle et prédit à l'identique"""
+    predictor = CropPredictor(backend="compiled", config=make_config(tmp_path, bundle_path))
+    predictor.load_model()
+    reference = CropPredictor(backend="compiled", config=make_config(tmp_path, tmp_path / "absent"))
+    reference.load_model()
+    
+    assert predictor.model is None
+    assert predictor.model_version == load_bundle(str(bundle_path)).model_version
+    assert predictor.lime_explainer is None
+    
+    raw = reference.scaler.inverse_transform(np.load("data/X_test_scaled.npy"))
+    np.testing.assert_array_equal(predictor.predict_proba(raw), reference.predict_proba(raw))
+    assert predictor.predict(raw[0].tolist()) == reference.predict(raw[0].tolist())
+    
+    explanation = predictor.explain_prediction(raw[0])
+    assert 'contributions' in explanation
+
+
+def test_stale_bundle_is_ignored(tmp_path, bundle_path):
+    """Test qu'un bundle exporté d'un autre modèle n'est pas utilisé"""
+    predictor = CropPredictor(model_path="models/tuned/naive_bayes_best.pkl", backend="compiled",
+                              config=make_config(tmp_path, bundle_path))
+    
+    assert not predictor._load_bundle()
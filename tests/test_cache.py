@@ -0,0 +1,111 @@
+"""
+Tests pour le cache des prédictions
+"""
+import threading
+import time
+
+import pytest
+from src.models.cache import PredictionCache
+from src.models.predictor import CropPredictor
+
+
+class FakeClock:
+    """Horloge manuelle"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    """Test l'éviction de l'entrée la moins récemment utilisée"""
+    cache = PredictionCache(max_size=2, ttl=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiration():
+    """Test l'expiration des entrées"""
+    clock = FakeClock()
+    cache = PredictionCache(max_size=10, ttl=60, clock=clock)
+    cache.put('a', 1)
+    
+    clock.now = 59
+    assert cache.get('a') == 1
+    clock.now = 60
+    assert cache.get('a') is None
+    
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['size'] == 0
+
+
+def test_single_flight():
+    """Test qu'un seul calcul est lancé pour des requêtes identiques concurrentes"""
+    cache = PredictionCache(max_size=10)
+    calls = []
+    release = threading.Event()
+    
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {'crop': 'rice'}
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == [{'crop': 'rice'}] * 4
+    assert cache.stats()['misses'] == 1
+
+
+def test_single_flight_returns_copies():
+    """Test que le thread qui calcule reçoit aussi une copie (il peut la modifier)"""
+    cache = PredictionCache(max_size=10, copy=dict)
+    computed = {'crop': 'rice'}
+    
+    leader = cache.get_or_compute('k', lambda: computed)
+    leader['neighbors'] = []
+    
+    assert leader is not computed and computed == {'crop': 'rice'}
+    assert cache.get_or_compute('k', lambda: None) == {'crop': 'rice'}
+
+
+def test_single_flight_error():
+    """Test qu'une erreur de calcul n'est pas mise en cache"""
+    cache = PredictionCache(max_size=10)
+    
+    def fail():
+        raise ValueError("boom")
+    
+    with pytest.raises(ValueError):
+        cache.get_or_compute('k', fail)
+    assert cache.get_or_compute('k', lambda: 1) == 1
+
+
+def test_predictor_cache_sklearn():
+    """Test le cache du backend sklearn (features arrondies, stats)"""
+    predictor = CropPredictor(cache_size=8)
+    predictor.load_model()
+    
+    first = predictor.predict([90, 42, 43, 20.8, 82, 6.5, 202.9])
+    second = predictor.predict([90, 42, 43, 20.800001, 82, 6.5, 202.9])
+    
+    assert first == second
+    stats = predictor.cache_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
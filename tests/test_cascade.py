@@ -0,0 +1,79 @@
+"""
+Tests pour la cascade Naive Bayes -> forêt
+"""
+import pytest
+import joblib
+import numpy as np
+import pandas as pd
+from src.models.naive_bayes import CompiledGaussianNB, confidence_gate
+from src.models.predictor import CropPredictor
+
+
+@pytest.fixture(scope="module")
+def sklearn_nb():
+    """Naive Bayes de référence"""
+    return joblib.load("models/tuned/naive_bayes_best.pkl")
+
+
+@pytest.fixture(scope="module")
+def X_test():
+    """Données de test standardisées"""
+    return np.load("data/X_test_scaled.npy")
+
+
+def test_naive_bayes_matches_sklearn(sklearn_nb, X_test):
+    """Test la parité avec GaussianNB, y compris après repli du scaler"""
+    scaler = joblib.load("models/scaler.pkl")
+    compiled = CompiledGaussianNB.from_sklearn(sklearn_nb)
+    folded = compiled.fold_scaler(scaler.mean_, scaler.scale_)
+    reference = sklearn_nb.predict_proba(X_test)
+    
+    np.testing.assert_allclose(compiled.predict_proba(X_test), reference, atol=1e-12)
+    np.testing.assert_allclose(folded.predict_proba(scaler.inverse_transform(X_test)), reference, atol=1e-12)
+    np.testing.assert_array_equal(folded.predict(scaler.inverse_transform(X_test)), sklearn_nb.predict(X_test))
+
+
+def test_confidence_gate():
+    """Test les seuils de probabilité et de marge"""
+    proba = np.array([[0.995, 0.005, 0.0], [0.6, 0.4, 0.0], [0.5, 0.4, 0.1]])
+    
+    np.testing.assert_array_equal(confidence_gate(proba, 0.99, 0.0), [True, False, False])
+    np.testing.assert_array_equal(confidence_gate(proba, 0.0, 0.25), [True, False, False])
+    np.testing.assert_array_equal(confidence_gate(proba, 0.0, 0.15), [True, True, False])
+
+
+@pytest.mark.parametrize("backend", CropPredictor.BACKENDS)
+def test_predictor_cascade(backend, X_test):
+    """Test que la cascade escalade les lignes incertaines et indique l'étage"""
+    predictor = CropPredictor(backend=backend, cascade=True)
+    predictor.load_model()
+    forest = CropPredictor(backend=backend)
+    forest.load_model()
+    
+    raw = forest.scaler.inverse_transform(X_test)
+    proba, escalated = predictor.predict_proba(raw, return_stages=True)
+    
+    assert 0 < escalated.sum() < len(raw)
+    np.testing.assert_array_equal(proba[escalated], forest.predict_proba(raw[escalated]))
+    assert np.mean(proba.argmax(axis=1) == np.load("data/y_test.npy")) >= 0.99
+    
+    results = predictor.predict_batch(pd.DataFrame(raw[:50], columns=predictor.feature_names))
+    assert [r['stage'] == CropPredictor.STAGE_FOREST for r in results] == escalated[:50].tolist()
+    
+    single = predictor.predict(raw[0].tolist())
+    assert single['stage'] == results[0]['stage']
+    assert single['crop'] == results[0]['crop']
+
+
+def test_explanation_follows_the_forest(X_test):
+    """Test que LIME explique la classe de la forêt quand la cascade répond autre chose"""
+    predictor = CropPredictor(backend="compiled", cascade=True, cache_size=0, batching=False)
+    predictor.load_model()
+    predictor.cascade_min_probability = 0.0
+    raw = predictor.scaler.inverse_transform(X_test)
+    forest_classes = predictor.forest.predict_proba(raw).argmax(axis=1)
+    disagree = np.flatnonzero(predictor.predict_proba(raw).argmax(axis=1) != forest_classes)
+    assert len(disagree) > 0
+    
+    explanation = predictor.explain_prediction(raw[disagree[0]])
+    assert explanation['predicted_class'] == predictor.class_names[forest_classes[disagree[0]]]
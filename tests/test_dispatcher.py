@@ -0,0 +1,76 @@
+"""
+Tests pour le micro-batching des requêtes
+"""
+import threading
+import time
+
+import pytest
+import numpy as np
+from src.models.dispatcher import BatchDispatcher
+from src.models.predictor import CropPredictor
+
+
+def test_concurrent_rows_are_batched():
+    """Test que des requêtes concurrentes sont évaluées dans un même batch"""
+    calls = []
+    
+    def fn(X):
+        calls.append(len(X))
+        return X.sum(axis=1), X * 2
+    
+    dispatcher = BatchDispatcher(fn, max_batch=8, max_wait_ms=200)
+    rows = [np.full((1, 3), i, dtype=np.float64) for i in range(8)]
+    barrier = threading.Barrier(8)
+    results = [None] * 8
+    
+    def call(i):
+        barrier.wait()
+        results[i] = dispatcher(rows[i])
+    
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    for i, (total, doubled) in enumerate(results):
+        assert total.tolist() == [3 * i]
+        np.testing.assert_array_equal(doubled, rows[i] * 2)
+    assert sum(calls) == 8 and len(calls) < 8
+    
+    stats = dispatcher.stats()
+    assert stats['rows'] == 8 and stats['max_batch_size'] > 1
+
+
+def test_single_caller_is_not_delayed():
+    """Test qu'une requête isolée n'attend pas la fin de la fenêtre"""
+    dispatcher = BatchDispatcher(lambda X: (X,), max_wait_ms=500)
+    
+    start = time.perf_counter()
+    dispatcher(np.zeros((1, 3)))
+    
+    assert time.perf_counter() - start < 0.25
+
+
+def test_batch_error_is_propagated():
+    """Test que l'erreur d'un batch est remontée à chaque appelant"""
+    def fail(X):
+        raise RuntimeError("boom")
+    
+    dispatcher = BatchDispatcher(fail)
+    with pytest.raises(RuntimeError):
+        dispatcher(np.zeros((1, 3)))
+
+
+def test_predictor_batching_matches_direct():
+    """Test que predict() via le micro-batching donne le même résultat"""
+    batched = CropPredictor(backend="compiled", batching=True, cache_size=0)
+    batched.load_model()
+    direct = CropPredictor(backend="compiled", batching=False, cache_size=0)
+    direct.load_model()
+    
+    raw = direct.scaler.inverse_transform(np.load("data/X_test_scaled.npy")[:20])
+    for features in raw:
+        assert batched.predict(features.tolist()) == direct.predict(features.tolist())
+    assert batched.batching_stats()['rows'] == 20
+    assert direct.batching_stats() is None
@@ -0,0 +1,240 @@
+"""
+Tests pour le moteur d'inférence de forêt compilée
+"""
+import pytest
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+from src.models.forest import CompiledForest, vote_dispersion
+from src.models.predictor import CropPredictor
+from src.utils.config import Config
+
+
+@pytest.fixture(scope="module")
+def sklearn_model():
+    """Forêt scikit-learn de référence (mono-thread, ordre d'accumulation déterministe)"""
+    model = joblib.load("models/tuned/random_forest_best.pkl")
+    model.n_jobs = 1
+    return model
+
+
+@pytest.fixture(scope="module")
+def forest(sklearn_model):
+    """Forêt compilée"""
+    return CompiledForest.from_sklearn(sklearn_model)
+
+
+@pytest.fixture(scope="module")
+def scaler():
+    """Scaler de référence"""
+    return joblib.load("models/scaler.pkl")
+
+
+@pytest.fixture(scope="module")
+def raw_forest(forest, scaler):
+    """Forêt compilée travaillant sur les features brutes"""
+    return forest.fold_scaler(scaler.mean_, scaler.scale_)
+
+
+@pytest.fixture(scope="module")
+def X_test():
+    """Données de test standardisées"""
+    return np.load("data/X_test_scaled.npy")
+
+
+def test_forest_structure(forest, sklearn_model):
+    """Test la structure de la forêt compilée"""
+    assert forest.n_trees == len(sklearn_model.estimators_)
+    assert forest.n_nodes == sum(e.tree_.node_count for e in sklearn_model.estimators_)
+    assert forest.leaf_values.shape[1] == len(sklearn_model.classes_)
+    assert forest.n_leaves == sum((e.tree_.children_left == -1).sum() for e in sklearn_model.estimators_)
+
+
+def test_probabilities_bit_identical(forest, sklearn_model, X_test):
+    """Test que les probabilités sont identiques bit à bit à scikit-learn"""
+    np.testing.assert_array_equal(forest.predict_proba(X_test), sklearn_model.predict_proba(X_test))
+    np.testing.assert_array_equal(forest.predict_proba(X_test[:1]), sklearn_model.predict_proba(X_test[:1]))
+
+
+def test_probabilities_random_inputs(forest, sklearn_model):
+    """Test l'équivalence sur des entrées hors distribution"""
+    X = np.random.default_rng(0).normal(scale=3.0, size=(500, 7))
+    np.testing.assert_array_equal(forest.predict_proba(X), sklearn_model.predict_proba(X))
+    np.testing.assert_array_equal(forest.predict(X), sklearn_model.predict(X))
+
+
+def test_compiled_backend_predictor(X_test):
+    """Test que le backend compilé donne les mêmes prédictions"""
+    reference = CropPredictor()
+    reference.load_model()
+    compiled = CropPredictor(backend="compiled")
+    compiled.load_model()
+    
+    raw = reference.scaler.inverse_transform(X_test[:20])
+    for row in raw:
+        expected = reference.predict(row)
+        result = compiled.predict(row)
+        assert result['crop'] == expected['crop']
+        assert result['confidence'] == pytest.approx(expected['confidence'])
+
+
+def test_batch_backend(X_test):
+    """Test que predict_batch passe par scikit-learn (inference.batch_backend) avec les mêmes probabilités"""
+    compiled = CropPredictor(backend="compiled", cache_size=0, batching=False)
+    compiled.load_model()
+    raw = compiled.scaler.inverse_transform(X_test)
+    data = pd.DataFrame(raw, columns=compiled.feature_names)
+    
+    assert compiled.batch_model is not None
+    np.testing.assert_array_equal(compiled.predict_batch(data).to_numpy()['probabilities'],
+                                  compiled.predict_proba(raw))
+    # La dispersion des votes demande la forêt compilée
+    assert not np.isnan(compiled.predict_batch(data, uncertainty=True).uncertainty).any()
+
+
+def test_unknown_backend():
+    """Test qu'un backend inconnu est refusé"""
+    with pytest.raises(ValueError):
+        CropPredictor(backend="gpu")
+
+
+def test_fold_scaler_exact_at_thresholds(raw_forest, sklearn_model, scaler):
+    """Test que les seuils repliés sont exacts à la frontière de chaque noeud"""
+    base = scaler.inverse_transform(np.load("data/X_test_scaled.npy"))
+    rng = np.random.default_rng(1)
+    
+    rows = []
+    for f, edges in enumerate(raw_forest.bin_edges):
+        for threshold in rng.choice(edges, 100):
+            row = base[rng.integers(len(base))].copy()
+            for value in (threshold, np.nextafter(threshold, np.inf)):
+                row[f] = value
+                rows.append(row.copy())
+    X = np.array(rows)
+    
+    np.testing.assert_array_equal(
+        raw_forest.predict_proba(X),
+        sklearn_model.predict_proba((X - scaler.mean_) / scaler.scale_)
+    )
+    assert not raw_forest.cast_float32
+
+
+def test_bin_codes_preserve_predictions(raw_forest, scaler, X_test):
+    """Test que le parcours sur codes de bin donne les mêmes feuilles"""
+    forest = raw_forest
+    X_test = scaler.inverse_transform(X_test)
+    codes = forest.encode(X_test)
+    
+    assert codes.dtype == np.uint16
+    np.testing.assert_array_equal(forest.apply_codes(codes), forest.apply(X_test))
+    single = np.vstack([forest.apply_codes(codes[i:i + 1]) for i in range(20)])
+    np.testing.assert_array_equal(single, forest.apply_codes(codes[:20]))
+    
+    # Deux entrées de mêmes codes ont les mêmes probabilités
+    shifted = X_test.copy()
+    for f, edges in enumerate(forest.bin_edges):
+        upper = np.append(edges, np.inf)[codes[:, f]]
+        lower = np.insert(edges, 0, -np.inf)[codes[:, f]]
+        shifted[:, f] = np.where(np.isfinite(upper), upper, lower + 1.0)
+    np.testing.assert_array_equal(forest.encode(shifted), codes)
+    np.testing.assert_array_equal(forest.predict_proba(shifted), forest.predict_proba(X_test))
+
+
+def test_prediction_cache():
+    """Test le cache exact des prédictions sur les codes de bin"""
+    predictor = CropPredictor(backend="compiled", cache_size=2)
+    predictor.load_model()
+    
+    first = predictor.predict([90, 42, 43, 20.8, 82, 6.5, 202.9])
+    first['explanation'] = {}
+    second = predictor.predict([90, 42, 43, 20.8, 82, 6.5, 202.9])
+    
+    assert len(predictor._cache) == 1
+    assert second == {k: v for k, v in first.items() if k != 'explanation'}
+    
+    predictor.predict([20, 10, 15, 25.5, 70, 5.8, 150.0])
+    predictor.predict([60, 55, 44, 23.0, 82, 7.0, 263.0])
+    assert len(predictor._cache) == 2
+
+
+def test_compact_storage(forest, sklearn_model, X_test):
+    """Test le format compact et la parité avec les feuilles quantifiées"""
+    assert forest.leaf_storage == 'counts'
+    assert forest.feature.dtype == np.uint8
+    assert forest.children.dtype == np.int32
+    assert forest.nbytes < sum(e.tree_.value.nbytes for e in sklearn_model.estimators_) / 4
+    
+    y_test = np.load("data/y_test.npy")
+    reference = sklearn_model.predict(X_test)
+    quantized = CompiledForest.from_sklearn(sklearn_model, leaf_storage='float16')
+    
+    assert quantized.leaf_values.dtype == np.float16
+    assert np.mean(quantized.predict(X_test) == reference) >= 0.995
+    assert np.mean(quantized.predict(X_test) == y_test) == pytest.approx(np.mean(reference == y_test), abs=0.005)
+
+
+def test_anytime_early_exit(forest, X_test):
+    """Test l'arrêt anticipé: même classe (borne exacte), lignes complètes identiques"""
+    full = forest.predict_proba(X_test)
+    
+    proba, used = forest.predict_proba_anytime(X_test, block_size=10)
+    assert np.array_equal(proba.argmax(axis=1), full.argmax(axis=1))
+    assert used.min() > forest.n_trees // 2 and used.mean() < forest.n_trees
+    np.testing.assert_array_equal(proba[used == forest.n_trees], full[used == forest.n_trees])
+    
+    proba, fast = forest.predict_proba_anytime(X_test, block_size=10, bound='hoeffding', delta=0.01)
+    assert fast.mean() < used.mean()
+    assert np.mean(proba.argmax(axis=1) == full.argmax(axis=1)) >= 0.99
+    
+    with pytest.raises(ValueError):
+        forest.predict_proba_anytime(X_test, bound='chernoff')
+
+
+def test_predictor_reports_trees_used(tmp_path):
+    """Test le champ n_trees_used du prédicteur en mode anytime"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'inference': {'anytime': {'enabled': True, 'min_rows': 1}}}))
+    predictor = CropPredictor(backend="compiled", config=Config(str(config_path)), cache_size=0, batching=False)
+    predictor.load_model()
+    raw = predictor.scaler.inverse_transform(np.load("data/X_test_scaled.npy")[:40])
+    
+    results = predictor.predict_batch(pd.DataFrame(raw, columns=predictor.feature_names), neighbors=0,
+                                      uncertainty=True, ood=True)
+    single = predictor.predict(raw[0], neighbors=0)
+    
+    assert single == {k: v for k, v in results[0].items() if k != 'index'}
+    assert 0 < results.n_trees_used.min() and results.n_trees_used.max() <= predictor.n_trees
+
+
+def test_vote_dispersion(forest, X_test):
+    """Test des votes des arbres et de leur dispersion (entropie, marge, accord des moitiés)"""
+    dispersion = vote_dispersion(np.array([[0, 0, 0, 0], [0, 1, 0, 1], [0, 0, 1, 1], [2, -1, -1, -1]]), 3)
+    np.testing.assert_allclose(dispersion[:3], [[0, 1, 1], [np.log(2) / np.log(3), 0, 1],
+                                                [np.log(2) / np.log(3), 0, 0]])
+    assert dispersion[3, :2].tolist() == [0, 1] and np.isnan(dispersion[3, 2])
+    
+    proba, votes = forest.predict_proba(X_test, return_votes=True)
+    np.testing.assert_array_equal(votes, forest.leaf_class[forest.apply(X_test)])
+    
+    _, used, partial = forest.predict_proba_anytime(X_test, block_size=10, return_votes=True)
+    assert np.array_equal((partial >= 0).sum(axis=1), used)
+    assert np.array_equal(partial[used == forest.n_trees], votes[used == forest.n_trees])
+
+
+def test_predictor_uncertainty():
+    """Test du champ uncertainty du prédicteur (identique en unitaire et en batch)"""
+    predictor = CropPredictor(backend="compiled", cache_size=0, batching=False)
+    predictor.load_model()
+    raw = predictor.scaler.inverse_transform(np.load("data/X_test_scaled.npy")[:40])
+    
+    data = pd.DataFrame(raw, columns=predictor.feature_names)
+    results = predictor.predict_batch(data, neighbors=0, uncertainty=True, ood=True)
+    single = predictor.predict(raw[0], neighbors=0)
+    
+    # Opt-in en batch: absent par défaut
+    assert 'uncertainty' not in predictor.predict_batch(data)[0]
+    assert single == {k: v for k, v in results[0].items() if k != 'index'}
+    assert set(single['uncertainty']) == {'entropy', 'vote_margin', 'half_agreement', 'low_certainty'}
+    np.testing.assert_array_equal(results.low_certainty, predictor.low_certainty(results.uncertainty))
+    assert results.to_numpy()['uncertainty'].shape == (40, 3)
@@ -114,3 +114,45 @@ def test_batch_prediction(predictor):
     
     assert len(results) == 2
     assert all('crop' in r for r in results)
+
+
+def test_batch_prediction_matches_single(predictor):
+    """Test que le batch vectorisé donne les mêmes résultats que predict()"""
+    X = np.load("data/X_test_scaled.npy")[:50]
+    raw = predictor.scaler.inverse_transform(X)
+    data = pd.DataFrame(raw, columns=predictor.feature_names)
+    
+    results = predictor.predict_batch(data)
+    
+    for i, result in enumerate(results):
+        expected = predictor.predict(raw[i])
+        assert result['index'] == i
+        assert result['crop'] == expected['crop']
+        assert result['confidence'] == expected['confidence']
+        assert result['top_3'] == expected['top_3']
+
+
+def test_batch_prediction_invalid_rows(predictor):
+    """Test que les lignes invalides sont signalées sans bloquer le batch"""
+    data = pd.DataFrame([
+        [90, 42, 43, 20.8, 82, 6.5, 202.9],
+        [90, 42, None, 20.8, 82, 6.5, 202.9],
+        [90, 'abc', 43, 20.8, 82, 6.5, 202.9]
+    ], columns=['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'])
+    
+    results = predictor.predict_batch(data)
+    
+    assert 'crop' in results[0]
+    assert 'error' in results[1] and results[1]['index'] == 1
+    assert 'error' in results[2] and results[2]['index'] == 2
+
+
+def test_warmup(predictor, sample_features):
+    """Test la chauffe: LIME construit, cache vidé, prédictions inchangées"""
+    before = predictor.predict(sample_features)
+    timings = predictor.warmup(n_samples=8)
+    
+    assert predictor.is_warm
+    assert predictor.lime_explainer is not None
+    assert set(timings) == {'predict', 'predict_batch', 'explain'}
+    assert predictor.predict(sample_features) == before
@@ -0,0 +1,56 @@
+"""
+Tests pour l'index des échantillons de référence
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from src.models.predictor import CropPredictor
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    """Prédicteur compilé avec index des voisins"""
+    pred = CropPredictor(backend="compiled")
+    pred.load_model()
+    return pred
+
+
+def test_training_sample_is_its_own_neighbor(predictor):
+    """Test qu'un échantillon d'entraînement est son propre plus proche voisin"""
+    raw = predictor.scaler.inverse_transform(predictor.training_data[:3])
+    crops = predictor.label_encoder.inverse_transform(predictor.training_labels[:3])
+    
+    for features, crop in zip(raw, crops):
+        nearest = predictor.predict(features.tolist(), neighbors=3)['neighbors']
+        assert len(nearest) == 3
+        assert nearest[0]['crop'] == crop
+        assert nearest[0]['distance'] == pytest.approx(0.0, abs=1e-6)
+        assert nearest[0]['source'] == 'training'
+        assert [n['distance'] for n in nearest] == sorted(n['distance'] for n in nearest)
+
+
+def test_batch_neighbors_match_single(predictor):
+    """Test que les voisins du batch sont ceux de predict()"""
+    raw = predictor.scaler.inverse_transform(np.load("data/X_test_scaled.npy")[:20])
+    data = pd.DataFrame(raw, columns=predictor.feature_names)
+    assert 'neighbors' not in predictor.predict_batch(data)[0]
+    results = predictor.predict_batch(data, neighbors=predictor.neighbors_k)
+    
+    for features, result in zip(raw, results):
+        assert result['neighbors'] == predictor.predict(features.tolist())['neighbors']
+    assert 'neighbors' not in predictor.predict(raw[0].tolist(), neighbors=0)
+
+
+def test_add_history_samples():
+    """Test l'ajout de l'historique des prédictions à l'index"""
+    predictor = CropPredictor(backend="compiled")
+    predictor.load_model()
+    sample = [90, 42, 43, 20.8, 82, 6.5, 202.9]
+    
+    added = predictor.add_reference_samples(np.array([sample, sample]), ['rice', 'unknown-crop'])
+    nearest = predictor.predict(sample)['neighbors'][0]
+    
+    assert added == 1
+    assert nearest['source'] == 'history'
+    assert nearest['crop'] == 'rice'
+    assert predictor.neighbors.describe() == {'training': len(predictor.training_data), 'history': 1}
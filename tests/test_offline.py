@@ -0,0 +1,79 @@
+"""
+Tests pour le scoring hors ligne
+"""
+import json
+import pandas as pd
+import pytest
+from src.models.offline import CHECKPOINT_FILE, OfflineScorer
+from src.models.predictor import CropPredictor
+
+
+@pytest.fixture(scope="module")
+def survey(tmp_path_factory):
+    """Fichier CSV de 250 lignes avec une colonne d'identifiant et une ligne invalide"""
+    data = pd.read_csv("data/Crop_recommendation.csv").drop(columns=['label']).head(250)
+    data.insert(0, 'id', range(len(data)))
+    data.loc[7, 'ph'] = None
+    path = tmp_path_factory.mktemp("offline") / "survey.csv"
+    data.to_csv(path, index=False)
+    return path
+
+
+def _read_parts(output_dir):
+    return pd.concat([pd.read_csv(part) for part in sorted(output_dir.glob("part-*.csv"))], ignore_index=True)
+
+
+def test_partitioned_output(survey, tmp_path):
+    """Test les fichiers de sortie: un par bloc, mêmes prédictions que predict_batch"""
+    stats = OfflineScorer(str(tmp_path), workers=1, chunk_size=100).run(str(survey))
+    
+    assert stats['rows'] == 250 and stats['errors'] == 1 and stats['parts'] == 3
+    assert stats['rows_per_second_per_core'] > 0
+    output = _read_parts(tmp_path)
+    assert output['id'].tolist() == list(range(250))
+    assert {'crop', 'confidence', 'top_1', 'top_3_probability', 'stage', 'error'} <= set(output.columns)
+    assert output['error'].notna().sum() == 1 and pd.isna(output.loc[7, 'crop'])
+    
+    expected = CropPredictor().predict_batch(pd.read_csv(survey).drop(columns=['id']).head(20))
+    expected = [row for row in expected if 'error' not in row]
+    scored = output.head(20).dropna(subset=['crop'])
+    assert scored['crop'].tolist() == [row['crop'] for row in expected]
+    assert scored['confidence'].tolist() == pytest.approx([row['confidence'] for row in expected])
+
+
+def test_compiled_backend(survey, tmp_path):
+    """Test le backend compilé: mêmes cultures, colonnes de dispersion des votes"""
+    OfflineScorer(str(tmp_path / "sklearn"), workers=1, chunk_size=100).run(str(survey))
+    OfflineScorer(str(tmp_path / "compiled"), workers=1, chunk_size=100, backend='compiled').run(str(survey))
+    
+    reference, compiled = _read_parts(tmp_path / "sklearn"), _read_parts(tmp_path / "compiled")
+    assert 'low_certainty' not in reference.columns and 'low_certainty' in compiled.columns
+    assert compiled['crop'].tolist() == reference['crop'].tolist()
+    with pytest.raises(ValueError):
+        OfflineScorer(str(tmp_path), backend='onnx')
+
+
+def test_resume_from_checkpoint(survey, tmp_path):
+    """Test qu'une exécution interrompue ne réévalue que les blocs manquants"""
+    scorer = OfflineScorer(str(tmp_path), workers=1, chunk_size=100)
+    scorer.run(str(survey))
+    
+    # Simule une interruption avant la fin du dernier bloc
+    checkpoint_path = tmp_path / CHECKPOINT_FILE
+    checkpoint = json.loads(checkpoint_path.read_text())
+    del checkpoint['completed']['2']
+    checkpoint_path.write_text(json.dumps(checkpoint))
+    scorer.part_path(2).unlink()
+    
+    stats = scorer.run(str(survey))
+    
+    assert stats['rows'] == 50
+    assert stats['total_rows'] == 250
+    assert len(_read_parts(tmp_path)) == 250
+    
+    with pytest.raises(ValueError):
+        OfflineScorer(str(tmp_path), workers=1, chunk_size=50).run(str(survey))
+    with pytest.raises(ValueError):
+        OfflineScorer(str(tmp_path), workers=1, chunk_size=100, backend='compiled').run(str(survey))
+    with pytest.raises(ValueError):
+        OfflineScorer(str(tmp_path), workers=1, chunk_size=100, cascade=True).run(str(survey))
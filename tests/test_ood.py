@@ -0,0 +1,80 @@
+"""
+Tests pour la détection des entrées hors distribution
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from src.models.ood import MahalanobisDetector
+from src.models.predictor import CropPredictor
+from src.utils.config import Config
+
+
+# Valeurs toutes dans les plages agronomiques, mais combinaison jamais vue
+ODD_SOIL = [140, 5, 205, 44, 14, 3.5, 300]
+VALID = [90, 42, 43, 20.8, 82, 6.5, 202.9]
+
+
+def make_predictor(tmp_path, **ood):
+    """Prédicteur compilé avec une section inference.ood donnée"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'inference': {'ood': ood}}))
+    predictor = CropPredictor(backend="compiled", config=Config(str(config_path)), cache_size=0, batching=False)
+    predictor.load_model()
+    return predictor
+
+
+def test_detector_distances():
+    """Test des distances de Mahalanobis (classe la plus proche) et de la dégradation"""
+    rng = np.random.default_rng(0)
+    X = np.concatenate([rng.normal(0, 1, (200, 3)), rng.normal(10, 2, (200, 3))])
+    labels = np.repeat([0, 1], 200)
+    detector = MahalanobisDetector.fit(X, labels, max_distance=5.0, policy='downgrade', shrinkage=0.5)
+
+    points = np.array([[0.5, 0, 0], [10, 12, 9], [3, 3, 3], [100, 0, 0]])
+    expected = []
+    for point in points:
+        distances = []
+        for c in (0, 1):
+            diff = point - X[labels == c].mean(axis=0)
+            covariance = np.cov(X[labels == c], rowvar=False)
+            distances.append(np.sqrt(diff @ np.linalg.solve(covariance, diff)))
+        expected.append(min(distances))
+    distances, flagged = detector.detect(points)
+
+    np.testing.assert_allclose(distances, expected, rtol=1e-4)
+    assert flagged.tolist() == [False, False, True, True]
+    assert detector.detect(X)[1].mean() <= 0.01
+
+    probabilities = np.array([[0.9, 0.1, 0.0]])
+    np.testing.assert_allclose(detector.downgrade(probabilities), [[0.45 + 0.5 / 3, 0.05 + 0.5 / 3, 0.5 / 3]])
+    with pytest.raises(ValueError):
+        MahalanobisDetector.fit(X, labels, policy='drop')
+
+
+def test_predictor_flags_and_skips_explanation(tmp_path):
+    """Test du champ ood (unitaire et batch) et de l'explication LIME ignorée"""
+    predictor = make_predictor(tmp_path, policy='skip_explanation')
+    data = pd.DataFrame([VALID, ODD_SOIL], columns=predictor.feature_names)
+
+    results = predictor.predict_batch(data, neighbors=0, uncertainty=True, ood=True)
+    single = predictor.predict(ODD_SOIL, neighbors=0)
+
+    assert results.ood.tolist() == [False, True]
+    assert single == {k: v for k, v in results[1].items() if k != 'index'}
+    assert single['ood']['flagged'] and single['ood']['distance'] > predictor.ood.max_distance
+    explanation = predictor.explain_prediction(ODD_SOIL)
+    assert 'contributions' not in explanation and explanation['ood']['flagged']
+    # Politique par défaut (flag): la ligne est seulement signalée
+    assert 'contributions' in make_predictor(tmp_path).explain_prediction(ODD_SOIL)
+
+
+def test_downgrade_policy(tmp_path):
+    """Test de la politique downgrade: même culture, confiance réduite pour les lignes hors distribution"""
+    flag = make_predictor(tmp_path, policy='flag')
+    downgrade = make_predictor(tmp_path, policy='downgrade', shrinkage=0.5)
+
+    before, after = flag.predict(ODD_SOIL, neighbors=0), downgrade.predict(ODD_SOIL, neighbors=0)
+    assert after['crop'] == before['crop']
+    assert after['confidence'] == pytest.approx(0.5 * before['confidence'] + 0.5 / len(flag.class_names))
+    assert downgrade.predict(VALID, neighbors=0)['confidence'] == flag.predict(VALID, neighbors=0)['confidence']
@@ -0,0 +1,43 @@
+"""
+Tests pour la politique de parallélisme
+"""
+import numpy as np
+from src.models.parallel import ParallelismPolicy
+from src.utils.config import Config
+
+
+def test_thread_cap_by_workers():
+    """Test que le plafond de threads est partagé entre les workers"""
+    policy = ParallelismPolicy(workers=10 ** 6)
+    assert policy.threads == 1
+    
+    policy = ParallelismPolicy(max_threads=1, workers=1)
+    assert policy.threads == 1
+
+
+def test_map_rows_preserves_order():
+    """Test que le découpage en blocs conserve l'ordre des lignes"""
+    policy = ParallelismPolicy(min_parallel_batch=10, chunk_size=7, max_threads=4, workers=1)
+    X = np.arange(200, dtype=np.float64).reshape(100, 2)
+    
+    result = policy.map_rows(lambda chunk: chunk * 2, X)
+    
+    np.testing.assert_array_equal(result, X * 2)
+
+
+def test_small_batch_single_call():
+    """Test qu'un petit batch est évalué en un seul appel"""
+    calls = []
+    policy = ParallelismPolicy(min_parallel_batch=100, chunk_size=50)
+    
+    policy.map_rows(lambda chunk: calls.append(len(chunk)) or chunk, np.zeros((30, 7)))
+    
+    assert calls == [30]
+
+
+def test_policy_from_config():
+    """Test la lecture de la politique depuis la configuration"""
+    policy = ParallelismPolicy.from_config(Config())
+    
+    assert policy.threads >= 1
+    assert policy.chunk_size == 2048
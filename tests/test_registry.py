@@ -0,0 +1,67 @@
+"""
+Tests pour le registre de modèles
+"""
+import pytest
+import yaml
+from src.models.predictor import CropPredictor
+from src.models.registry import ModelRegistry
+from src.utils.config import Config
+
+
+@pytest.fixture(scope="module")
+def registry(tmp_path_factory):
+    """Registre forêt + Naive Bayes en ombre"""
+    config_path = tmp_path_factory.mktemp("registry") / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'registry': {
+        'models': {
+            'random_forest': {'backend': 'compiled'},
+            'naive_bayes': {'backend': 'compiled', 'cascade': True, 'cascade_min_probability': 0.0,
+                            'version': 'nb-1'}
+        },
+        'routing': {'default': 'random_forest'},
+        'shadow': ['naive_bayes']
+    }}))
+    registry = ModelRegistry.from_config(Config(str(config_path)))
+    registry.load_all()
+    return registry
+
+
+def test_shadow_scoring(registry):
+    """Test que le modèle en ombre est évalué hors requête et comparé"""
+    result = registry.predict([90, 42, 43, 20.8, 82, 6.5, 202.9])
+    registry.predict([20, 10, 15, 25.5, 70, 5.8, 150.0])
+    registry.flush()
+    
+    assert result['model'] == 'random_forest'
+    assert result['model_version'] == registry.get().model_version
+    assert result['stage'] == CropPredictor.STAGE_FOREST
+    
+    stats = registry.stats()
+    shadow = stats['models']['naive_bayes']
+    assert shadow['version'] == 'nb-1'
+    assert shadow['role'] == 'shadow'
+    assert shadow['agreement']['compared'] == 2
+    assert shadow['latency']['count'] == 2
+    assert stats['models']['random_forest']['latency']['count'] == 2
+
+
+def test_percentage_routing(registry):
+    """Test le routage par pourcentage, stable pour une même clé"""
+    registry.configure_routing(default='random_forest', split={'naive_bayes': 30}, shadows=[])
+    try:
+        routed = [registry.route(key=user_id) for user_id in range(2000)]
+        assert routed == [registry.route(key=user_id) for user_id in range(2000)]
+        assert 0.25 < routed.count('naive_bayes') / len(routed) < 0.35
+        
+        result = registry.predict([90, 42, 43, 20.8, 82, 6.5, 202.9], model='naive_bayes')
+        assert result['stage'] == CropPredictor.STAGE_CASCADE
+    finally:
+        registry.configure_routing(default='random_forest', shadows=['naive_bayes'])
+
+
+def test_invalid_routing(registry):
+    """Test le rejet des modèles inconnus et des pourcentages invalides"""
+    with pytest.raises(ValueError):
+        registry.configure_routing(default='unknown')
+    with pytest.raises(ValueError):
+        registry.configure_routing(split={'random_forest': 80, 'naive_bayes': 40})
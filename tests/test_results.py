@@ -0,0 +1,83 @@
+"""
+Tests pour le conteneur de résultats en colonnes
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.models.predictor import CropPredictor
+from src.models.results import (STAGE_CASCADE, STAGE_FOREST, PredictionResultSet, format_row,
+                                shape_probabilities, top_k_indices)
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    pred = CropPredictor(cache_size=0, batching=False)
+    pred.load_model()
+    return pred
+
+
+def test_rows_match_predict(predictor):
+    """Test que les lignes matérialisées sont celles de predict()"""
+    raw = predictor.scaler.inverse_transform(np.load("data/X_test_scaled.npy")[:20])
+    data = pd.DataFrame(raw, columns=predictor.feature_names)
+    data.loc[3, 'ph'] = None
+
+    results = predictor.predict_batch(data, neighbors=0, uncertainty=True, ood=True)
+
+    assert isinstance(results, PredictionResultSet) and len(results) == 20
+    assert results.n_errors == 1 and results.class_index[3] == -1 and np.isnan(results.confidence[3])
+    assert results[3] == {'index': 3, 'error': "ph: valeur manquante", 'errors': results.errors[3]}
+    for i in (0, 5, -1):
+        expected = predictor.predict(raw[i], neighbors=0)
+        expected['index'] = i % 20
+        assert results[i] == expected
+    assert results.to_list() == [results[i] for i in range(20)] == results[:]
+    assert results.crops[0] == results[0]['crop']
+
+
+def test_lazy_rows_and_exports():
+    """Test des dictionnaires construits à la demande et des exports sans copie"""
+    probabilities = np.array([[0.7, 0.2, 0.1], [0.1, 0.3, 0.6]])
+    results = PredictionResultSet(probabilities, np.array([True, False]), ['a', 'b', 'c'], top_k=2)
+
+    row = results[1]
+    assert row['crop'] == 'c' and row['stage'] == STAGE_CASCADE
+    assert [top['crop'] for top in row['top_3']] == ['c', 'b']
+    row['crop'] = 'x'
+    assert results[1]['crop'] == 'c' and results[0]['stage'] == STAGE_FOREST
+
+    columns = results.to_numpy()
+    assert np.shares_memory(columns['probabilities'], probabilities)
+    assert columns['confidence'].tolist() == [0.7, 0.6]
+
+    lines = results.to_ndjson().splitlines()
+    assert [json.loads(line) for line in lines] == results.to_list()
+
+    pa = pytest.importorskip("pyarrow")
+    table = results.to_arrow()
+    assert isinstance(table, pa.Table) and table.column('crop').to_pylist() == ['a', 'c']
+
+
+def test_top_k_and_probability_formats():
+    """Test du top-k par partition (ex æquo par indice de classe) et des formes de all_probabilities"""
+    rng = np.random.default_rng(0)
+    probabilities = rng.dirichlet(np.full(22, 0.1), size=200).round(2)
+    probabilities[0] = 0
+    probabilities[0, [4, 9]] = 0.5
+
+    for k in (1, 3, 22):
+        expected = np.array([sorted(range(22), key=lambda idx: (-row[idx], idx))[:k] for row in probabilities])
+        np.testing.assert_array_equal(top_k_indices(probabilities, k), expected)
+
+    names = [f"crop_{i}" for i in range(22)]
+    results = PredictionResultSet(probabilities, np.ones(200, dtype=bool), names, all_probabilities='sparse')
+    assert results[0]['all_probabilities'] == {'crop_4': 0.5, 'crop_9': 0.5}
+    assert [top['crop'] for top in results[0]['top_3']] == ['crop_4', 'crop_9', 'crop_0']
+    for i in range(200):
+        row = format_row(probabilities[i].tolist(), True, names)
+        assert shape_probabilities(row, 'sparse') == results[i]
+    assert 'all_probabilities' not in shape_probabilities(format_row([0.2, 0.8], True, ['a', 'b']), 'none')
+    with pytest.raises(ValueError):
+        PredictionResultSet(probabilities, np.ones(200, dtype=bool), names, all_probabilities='dense')
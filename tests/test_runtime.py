@@ -0,0 +1,59 @@
+"""
+Tests pour le runtime d'inférence minimal
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+from src.models.bundle import export_bundle
+from src.models.predictor import CropPredictor
+from src.models.runtime import RuntimePredictor
+from src.utils.config import Config
+
+
+@pytest.fixture(scope="module")
+def bundle_path(tmp_path_factory):
+    """Bundle (avec Naive Bayes de cascade) exporté depuis les modèles suivis par git"""
+    path = tmp_path_factory.mktemp("bundle") / "model.bundle"
+    export_bundle("models/tuned/random_forest_best.pkl", str(path),
+                  cascade_model_path="models/tuned/naive_bayes_best.pkl")
+    return path
+
+
+@pytest.fixture(scope="module")
+def config(bundle_path, tmp_path_factory):
+    """Configuration pointant vers le bundle exporté"""
+    config_path = tmp_path_factory.mktemp("config") / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'inference': {'bundle_path': str(bundle_path)}}))
+    return Config(str(config_path))
+
+
+@pytest.mark.parametrize("cascade", [False, True])
+def test_same_results_as_predictor(config, cascade):
+    """Test que le runtime donne les mêmes résultats que CropPredictor (backend compilé)"""
+    runtime = RuntimePredictor.from_config(config, model_path="models/tuned/random_forest_best.pkl",
+                                           cascade=cascade)
+    predictor = CropPredictor(backend='compiled', config=config, cascade=cascade, cache_size=0, batching=False)
+    predictor.load_model()
+    X = predictor.scaler.inverse_transform(np.load('data/X_test_scaled.npy')[:50])
+    
+    for row in X[:10]:
+        expected = predictor.predict(row, neighbors=0)
+        assert runtime.predict(row.tolist()) == expected
+    assert np.array_equal(runtime.predict_proba(X), predictor.predict_proba(X))
+    
+    with pytest.raises(ValueError):
+        runtime.predict([90, 42, 43, 20.8, 82, 6.5])
+
+
+def test_runtime_imports_numpy_only(bundle_path):
+    """Test que le runtime n'importe ni pandas, ni scikit-learn, ni scipy, ni LIME"""
+    code = ("import sys; from src.models.runtime import RuntimePredictor; "
+            f"RuntimePredictor({str(bundle_path)!r}).predict([90, 42, 43, 20.8, 82, 6.5, 202.9]); "
+            "print(sorted(m for m in ('pandas', 'sklearn', 'scipy', 'lime') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent.parent)
+    assert output.stdout.strip() == '[]'
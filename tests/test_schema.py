@@ -0,0 +1,104 @@
+"""
+Tests pour la validation des entrées
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from src.data.schema import InputSchema, ValidationError
+from src.models.predictor import CropPredictor
+from src.utils.config import Config
+
+
+VALID = [90, 42, 43, 20.8, 82, 6.5, 202.9]
+
+
+def test_error_codes():
+    """Test des codes d'erreur par valeur"""
+    schema = InputSchema(policy='reject')
+    rows = [
+        VALID,
+        [90, 42, None, 20.8, 82, 6.5, 202.9],
+        [90, 'abc', 43, 20.8, 82, 6.5, 202.9],
+        [90, 42, 43, float('inf'), 82, 6.5, 202.9],
+        [90, 42, 43, 20.8, 82, 14.0, 202.9],
+        ['90', '42', '43', '20.8', '82', '6.5', '202.9']
+    ]
+    result = schema.validate(rows)
+
+    assert result.valid.tolist() == [True, False, False, False, False, True]
+    assert [issue['code'] for issue in result.issues(1)] == ['missing']
+    assert [issue['code'] for issue in result.issues(2)] == ['non_numeric']
+    assert [issue['code'] for issue in result.issues(3)] == ['not_finite']
+    assert result.issues(4) == [{
+        'feature': 'ph', 'code': 'above_max', 'value': 14.0,
+        'message': "ph=14.0 au-dessus du maximum 10 (plage 3.5-10)"
+    }]
+    assert np.array_equal(result.values[5], np.array(VALID, dtype=float))
+
+
+def test_booleans_are_not_numbers():
+    """Test qu'un booléen est non numérique, avec ou sans autre valeur non numérique dans le batch"""
+    schema = InputSchema()
+    assert schema.policy == 'flag'
+    row = [True, 40, 40, 25, 80, 6.5, 200]
+
+    for rows in ([row], [row, ['x', 40, 40, 25, 80, 6.5, 200]], np.array([row], dtype=object)):
+        result = schema.validate(rows)
+        assert not result.valid[0] and [issue['code'] for issue in result.issues(0)] == ['non_numeric']
+    assert not schema.validate(pd.DataFrame([row], columns=schema.feature_names)).valid[0]
+
+
+@pytest.mark.parametrize("policy", ['reject', 'clip', 'flag'])
+def test_range_policies(policy):
+    """Test des politiques appliquées aux valeurs hors plage"""
+    schema = InputSchema(policy=policy)
+    row = [200, 42, 43, 20.8, 82, 2.0, 202.9]
+    result = schema.validate(np.array([row, VALID]))
+
+    assert result.valid.tolist() == [policy != 'reject', True]
+    assert result.flagged.tolist() == [policy != 'reject', False]
+    assert [issue['code'] for issue in result.issues(0)] == ['above_max', 'below_min']
+    if policy == 'clip':
+        assert result.values[0, 0] == 140 and result.values[0, 5] == 3.5
+    else:
+        assert result.values[0, 0] == 200 and result.values[0, 5] == 2.0
+
+    # Les valeurs illisibles sont rejetées quelle que soit la politique
+    assert not schema.validate([[None] + VALID[1:]]).valid[0]
+
+
+def test_validate_record():
+    """Test de la validation d'un enregistrement (formulaire, JSON)"""
+    schema = InputSchema()
+    names = schema.feature_names
+    assert schema.validate_record({name: str(value) for name, value in zip(names, VALID)}) == VALID
+
+    with pytest.raises(ValidationError) as excinfo:
+        schema.validate_record({'N': 90, 'P': '', 'K': 'x', 'temperature': 20.8, 'humidity': 82,
+                                'ph': 6.5, 'rainfall': 202.9})
+    assert [error['code'] for error in excinfo.value.errors] == ['missing', 'non_numeric']
+    assert isinstance(excinfo.value, ValueError)
+
+
+def test_predictor_flags_out_of_range_by_default():
+    """Test que la configuration par défaut signale les valeurs hors plage sans les rejeter"""
+    predictor = CropPredictor(cache_size=0, batching=False)
+    predictor.load_model()
+    result = predictor.predict([90, 42, 43, 20.8, 82, 6.5, -5])
+    assert 'crop' in result and result['warnings'][0]['feature'] == 'rainfall'
+
+
+def test_predictor_rejects_out_of_range(tmp_path):
+    """Test que le prédicteur rejette les valeurs hors plage (détail par feature)"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'validation': {'policy': 'reject'}}))
+    predictor = CropPredictor(cache_size=0, batching=False, config=Config(str(config_path)))
+    predictor.load_model()
+    with pytest.raises(ValidationError):
+        predictor.predict([90, 42, 43, 20.8, 82, 6.5, -5])
+
+    data = pd.DataFrame([VALID, [90, 42, 43, 20.8, 120, 6.5, 202.9]], columns=predictor.feature_names)
+    results = predictor.predict_batch(data)
+    assert 'crop' in results[0]
+    assert results[1]['index'] == 1 and results[1]['errors'][0]['feature'] == 'humidity'
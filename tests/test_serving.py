@@ -0,0 +1,123 @@
+"""
+Tests pour le serveur d'inférence partagé
+"""
+import numpy as np
+import pytest
+import yaml
+from src.models.registry import ModelRegistry
+from src.serving import InferenceClient, InferenceServer
+from src.utils.config import Config
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    """Serveur (forêt + Naive Bayes) sur un socket temporaire"""
+    directory = tmp_path_factory.mktemp("serving")
+    config_path = directory / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'registry': {
+        'models': {
+            'random_forest': {'backend': 'compiled'},
+            'naive_bayes': {'backend': 'compiled', 'cascade': True, 'cascade_min_probability': 0.0}
+        },
+        'routing': {'default': 'random_forest'}
+    }, 'validation': {'policy': 'reject'},
+        'inference': {'uncertainty': {'batch': True}, 'ood': {'batch': True}}}))
+    server = InferenceServer(ModelRegistry.from_config(Config(str(config_path))), str(directory / "s.sock"))
+    server.load(warmup=False)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_remote_matches_in_process(server):
+    """Test que le client renvoie le même résultat que le registre en processus"""
+    client = InferenceClient(server.socket_path, neighbors_k=3)
+    features = [90, 42, 43, 20.8, 82, 6.5, 202.9]
+    
+    for model in ['random_forest', 'naive_bayes']:
+        remote = client.predict(features, model=model)
+        local = server.registry.predict(features, model=model, neighbors=3)
+        for field in ['crop', 'confidence', 'top_3', 'all_probabilities', 'stage', 'model', 'model_version']:
+            assert remote[field] == local[field]
+        assert remote['neighbors'] == local['neighbors']
+    assert client.remote_calls == 2
+    client.close()
+
+
+def test_remote_batch(server):
+    """Test le chemin batch (plusieurs lignes par requête)"""
+    client = InferenceClient(server.socket_path, neighbors_k=0)
+    X = np.array([[90, 42, 43, 20.8, 82, 6.5, 202.9],
+                  [20, 10, 15, 25.5, 70, 5.8, 150.0],
+                  [60, 55, 44, 23.0, 82.3, 7.8, 263.9]])
+    
+    results = client.predict_many(X)
+    
+    assert len(results) == 3
+    for row, result in zip(X, results):
+        assert result['crop'] == server.registry.predict(row, neighbors=0)['crop']
+        assert 'neighbors' not in result
+    client.close()
+
+
+def test_remote_batch_matches_predict_batch(server):
+    """Test que le batch distant applique la validation, l'incertitude et la détection hors distribution"""
+    client = InferenceClient(server.socket_path)
+    X = np.array([[90, 42, 43, 20.8, 82, 6.5, 202.9],
+                  [90, 42, 43, 20.8, 82, 6.5, -5],
+                  [140, 5, 205, 44, 14, 3.5, 300]])
+    
+    results = client.predict_many(X, model='random_forest')
+    _, expected = server.registry.predict_batch(X, model='random_forest', neighbors=0)
+    
+    assert results[1]['errors'][0]['feature'] == 'rainfall' and 'crop' not in results[1]
+    assert results[2]['ood']['flagged'] and 'uncertainty' in results[0]
+    for result, row in zip(results, expected):
+        assert result == {**{k: v for k, v in row.items() if k != 'index'}, 'model': 'random_forest',
+                          'model_version': server.registry.version('random_forest')}
+    client.close()
+
+
+def test_fallback_without_server(tmp_path):
+    """Test le repli en processus quand le socket est absent"""
+    calls = []
+    
+    def fallback(features, key=None, model=None, neighbors=None):
+        calls.append(key)
+        return {'crop': 'rice'}
+    
+    client = InferenceClient(str(tmp_path / "absent.sock"), fallback=fallback)
+    
+    assert client.predict([90, 42, 43, 20.8, 82, 6.5, 202.9], key=7) == {'crop': 'rice'}
+    assert calls == [7]
+    assert client.fallback_calls == 1
+    
+    with pytest.raises(ConnectionError):
+        InferenceClient(str(tmp_path / "absent.sock")).predict([90, 42, 43, 20.8, 82, 6.5, 202.9])
+
+
+def test_request_limits():
+    """Test que les champs trop longs pour l'en-tête sont refusés ou tronqués proprement"""
+    from src.serving import protocol
+    features = np.zeros((1, 7))
+    
+    with pytest.raises(ValueError, match="modèle"):
+        protocol.encode_request(protocol.OP_PREDICT, features, model='m' * 256)
+    with pytest.raises(ValueError):
+        protocol.encode_request(protocol.OP_PREDICT, features, neighbors=protocol.MAX_ROWS + 1)
+    frame = protocol.encode_request(protocol.OP_PREDICT, features, model='é' * 127, key='é' * 200)
+    header = protocol.REQUEST_HEADER.unpack(frame[:protocol.REQUEST_HEADER.size])
+    start = protocol.REQUEST_HEADER.size + header[6]
+    assert frame[start:start + header[7]].decode('utf-8') == 'é' * 127
+
+
+def test_client_import_is_light():
+    """Test que le client n'importe ni pandas ni scikit-learn (CLI en mode démon)"""
+    import subprocess
+    import sys
+    from pathlib import Path
+    code = ("import sys; import src.serving.client; "
+            "print(any(m in sys.modules for m in ('pandas', 'sklearn', 'lime')))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent.parent)
+    assert output.stdout.strip() == 'False'
@@ -0,0 +1,55 @@
+"""
+Tests pour la lecture incrémentale des lots
+"""
+import io
+import json
+import pytest
+from src.data import streaming
+from src.data.streaming import StreamFormatError, detect_format, iter_record_chunks
+
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+ROW = [90, 42, 43, 20.8, 82, 6.5, 202.9]
+
+
+def _read(body: bytes, fmt: str, **kwargs):
+    return list(iter_record_chunks(io.BytesIO(body), fmt, FEATURES, **kwargs))
+
+
+@pytest.mark.parametrize("fmt", ['json', 'ndjson', 'csv'])
+def test_formats_are_equivalent(fmt, monkeypatch):
+    """Test que les trois formats donnent les mêmes blocs, indexés en continu"""
+    # Petit tampon: les éléments du tableau JSON sont coupés entre deux lectures
+    monkeypatch.setattr(streaming, '_READ_SIZE', 7)
+    records = [dict(zip(FEATURES, ROW), latitude=i) for i in range(5)]
+    if fmt == 'json':
+        body = json.dumps(records).encode()
+    elif fmt == 'ndjson':
+        body = '\n'.join(json.dumps(record) for record in records).encode()
+    else:
+        body = (','.join(records[0]) + '\n' + '\n'.join(
+            ','.join(str(v) for v in record.values()) for record in records)).encode()
+    
+    chunks = _read(body, fmt, chunk_size=2)
+    
+    assert [chunk.index.tolist() for chunk in chunks] == [[0, 1], [2, 3], [4]]
+    assert list(chunks[0].columns) == FEATURES + ['latitude']
+    assert chunks[2]['rainfall'].tolist() == [202.9]
+
+
+def test_positional_records_and_limits():
+    """Test les listes positionnelles, la limite de lignes et les erreurs de format"""
+    chunk, = _read(json.dumps([ROW, {'N': 'x'}]).encode(), 'json')
+    assert chunk.loc[0].tolist() == ROW
+    assert chunk.loc[1, 'N'] == 'x'
+    
+    with pytest.raises(StreamFormatError):
+        _read(json.dumps([ROW] * 3).encode(), 'json', chunk_size=1, max_rows=2)
+    with pytest.raises(StreamFormatError):
+        _read(b'[{"N": 1} {"N": 2}]', 'json')
+    with pytest.raises(StreamFormatError):
+        _read(b'{"N": 1}\n{x\n', 'ndjson')
+    
+    assert detect_format('text/csv; charset=utf-8') == 'csv'
+    assert detect_format('application/octet-stream', 'survey.jsonl') == 'ndjson'
+    with pytest.raises(StreamFormatError):
+        detect_format('text/plain')